@@ -0,0 +1,6 @@
+"""Benchmarks dos carregadores e calculadoras com dados sintéticos.
+
+Uso::
+
+    python -m benchmarks.executar --tamanhos 1000 50000 --saida benchmarks/resultados.json
+"""
@@ -0,0 +1,215 @@
+"""Mede carga, detecção de inconsistências, pontuação e tabela-resumo com dados sintéticos.
+
+Além dos tempos, registra a memória da planilha carregada: o quadro padrão do
+``pd.read_excel``/``pd.read_csv`` (também com os textos como ``object``)
+contra a representação compacta do carregador, e as máscaras de
+inconsistência em bits contra a matriz booleana.
+
+Os resultados vão para um arquivo JSON. Com ``--comparar`` o tempo de cada
+etapa é confrontado com uma execução anterior e o comando termina com código
+1 se alguma etapa ficar mais lenta que a tolerância.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import date
+
+from benchmarks import gerador
+
+# Planilhas maiores que isso são geradas em CSV (o xlsx tem limite de ~1M linhas e é lento de gravar)
+LIMITE_XLSX = 100_000
+
+
+def cronometrar(funcao, repeticoes=1):
+    """Menor tempo (em segundos) entre ``repeticoes`` execuções, e o último valor retornado."""
+    melhor = float("inf")
+    valor = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        valor = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, valor
+
+
+def medir_mpm(diretorio, linhas, taxa, repeticoes, registrar):
+    import pandas as pd
+
+    from cnj_indicadores import cache, calculo, fontes, incremental, inconsistencias, registro
+
+    extensao = "xlsx" if linhas <= LIMITE_XLSX else "csv"
+    caminho = os.path.join(diretorio, f"MPM_Servidores_2025_07_{linhas}.{extensao}")
+    df = gerador.gerar_mpm(linhas, "servidores", taxa)
+    if extensao == "xlsx":
+        df.to_excel(caminho, index=False)
+    else:
+        df.to_csv(caminho, index=False, sep=";")
+    del df
+
+    segundos, _ = cronometrar(lambda: fontes.carregar_planilha(caminho))
+    registrar("carga_conversao", linhas, segundos, formato=extensao)
+    segundos, tabela = cronometrar(lambda: fontes.carregar_planilha(caminho), repeticoes)
+    registrar("carga_cache_parquet", linhas, segundos)
+
+    if extensao == "xlsx":
+        segundos, padrao = cronometrar(lambda: pd.read_excel(caminho, engine="openpyxl"))
+    else:
+        segundos, padrao = cronometrar(lambda: pd.read_csv(caminho, sep=";"))
+    textos = {coluna: object for coluna in padrao.columns if pd.api.types.is_string_dtype(padrao[coluna].dtype)}
+    memoria = {
+        "bytes_padrao": fontes.uso_memoria(padrao),
+        "bytes_objeto": fontes.uso_memoria(padrao.astype(textos)),
+        "bytes_compacto": fontes.uso_memoria(tabela),
+    }
+    registrar("carga_pandas_padrao", linhas, segundos, **memoria)
+    print(
+        f"{'memoria':<28} {linhas:>10,} linhas  padrão {memoria['bytes_padrao'] / 1e6:.1f} MB  "
+        f"object {memoria['bytes_objeto'] / 1e6:.1f} MB  compacto {memoria['bytes_compacto'] / 1e6:.1f} MB "
+        f"({memoria['bytes_padrao'] / memoria['bytes_compacto']:.1f}x / {memoria['bytes_objeto'] / memoria['bytes_compacto']:.1f}x)",
+        file=sys.stderr,
+    )
+    del padrao
+
+    ativos = inconsistencias.filtrar_ativos(tabela)
+    segundos, analise = cronometrar(lambda: inconsistencias.detectar_inconsistencias(ativos), repeticoes)
+    registrar(
+        "deteccao_inconsistencias", linhas, segundos,
+        percentual=analise.inconsistentes / max(analise.total, 1) * 100,
+        bytes_mascaras=int(analise.bits.nbytes),
+        bytes_mascaras_bool=analise.total * len(analise.campos),
+    )
+
+    # Mês seguinte com 3% dos registros alterados: só eles passam pela detecção
+    _, estado, _ = incremental.reavaliar(ativos)
+    seguinte = gerador.alterar_registros(ativos, 0.03)
+    segundos, (_, _, reavaliadas) = cronometrar(lambda: incremental.reavaliar(seguinte, estado), repeticoes)
+    registrar("deteccao_incremental", linhas, segundos, reavaliadas=reavaliadas)
+
+    segundos, _ = cronometrar(lambda: calculo.avaliar(analise.total, analise.inconsistentes, 5.0, 20), repeticoes)
+    registrar("pontuacao", linhas, segundos)
+
+    indicador = registro.obter("Art. 12, II, c)")
+    parametros = {"data_referencia": date(2025, 7, 31)}
+    cache.cache_indicadores.limpar()
+    segundos, resultados = cronometrar(lambda: registro.calcular_lote([indicador], {"servidores": caminho}, parametros))
+    registrar("calculo_lote_frio", linhas, segundos)
+    segundos, resultados = cronometrar(lambda: registro.calcular_lote([indicador], {"servidores": caminho}, parametros), repeticoes)
+    registrar("calculo_lote_memoizado", linhas, segundos)
+
+    def montar_resumo():
+        return pd.DataFrame([
+            {
+                "Referência": ref,
+                "Total": resultado["total"],
+                "Inconsistências": resultado["inconsistentes"],
+                "Percentual": f"{resultado['percentual']:.2f}%",
+                "Pontos": f"{resultado['pontos']}/{resultado['pontos_max']}",
+                "Status": "✅" if resultado["aprovado"] else "❌",
+            }
+            for ref, resultado in resultados.items()
+        ])
+
+    segundos, _ = cronometrar(montar_resumo, repeticoes)
+    registrar("tabela_resumo", linhas, segundos)
+
+
+def medir_datajud(diretorio, processos, taxa, repeticoes, registrar):
+    from cnj_indicadores import datajud, eletronicos, saneamento
+
+    pasta = os.path.join(diretorio, f"datajud_{processos}")
+    os.makedirs(pasta, exist_ok=True)
+    # Dois arquivos (G1 e G2) para exercitar o pool de processos
+    metade = processos // 2
+    gerador.gerar_datajud(os.path.join(pasta, "TJXX_G1.jsonl.gz"), processos - metade, grau="G1", taxa_erro=taxa, semente=1)
+    gerador.gerar_datajud(os.path.join(pasta, "TJXX_G2.jsonl.gz"), metade, grau="G2", taxa_erro=taxa, semente=2)
+    arquivos = datajud.listar_exportacoes(pasta)
+
+    segundos, _ = cronometrar(lambda: datajud.resumir_exportacoes(arquivos))
+    registrar("datajud_resumo", processos, segundos)
+    segundos, tabela = cronometrar(lambda: datajud.carregar_processos(pasta))
+    registrar("datajud_tabela_processos", processos, segundos)
+    segundos, _ = cronometrar(lambda: saneamento.taxas_por_unidade(tabela), repeticoes)
+    registrar("saneamento_por_unidade", processos, segundos)
+    segundos, historico = cronometrar(lambda: eletronicos.atualizar_historico(pasta))
+    registrar("historico_particionado", processos, segundos)
+    segundos, _ = cronometrar(lambda: eletronicos.contar_formatos(historico, date(2025, 7, 31)), repeticoes)
+    registrar("eletronicos_mes_referencia", processos, segundos)
+
+
+def comparar(atual, anterior, tolerancia):
+    """Etapas que ficaram mais lentas que ``(1 + tolerancia)`` vezes o tempo anterior."""
+    anteriores = {(r["etapa"], r["linhas"]): r["segundos"] for r in anterior["resultados"]}
+    regressoes = []
+    for resultado in atual["resultados"]:
+        referencia = anteriores.get((resultado["etapa"], resultado["linhas"]))
+        if referencia and resultado["segundos"] > referencia * (1 + tolerancia):
+            regressoes.append((resultado["etapa"], resultado["linhas"], referencia, resultado["segundos"]))
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.executar", description=__doc__.splitlines()[0])
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[1_000, 10_000, 50_000], help="linhas das planilhas MPM")
+    parser.add_argument("--processos-datajud", type=int, nargs="*", default=[10_000, 100_000], help="processos nas exportações DataJud")
+    parser.add_argument("--taxa-nao-informado", type=float, default=0.05, help="fração de registros com campo inválido")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--saida", default=os.path.join("benchmarks", "resultados.json"))
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para detectar regressões")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="aumento de tempo aceito na comparação (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    resultados = []
+
+    def registrar(etapa, linhas, segundos, **extras):
+        resultados.append({
+            "etapa": etapa,
+            "linhas": linhas,
+            "segundos": round(segundos, 6),
+            "linhas_por_segundo": round(linhas / segundos) if segundos else None,
+            **extras,
+        })
+        print(f"{etapa:<28} {linhas:>10,} linhas  {segundos * 1000:>10.1f} ms", file=sys.stderr)
+
+    with tempfile.TemporaryDirectory(prefix="cnj-bench-") as diretorio:
+        # Cache isolado: as configurações são lidas na importação do pacote
+        os.environ["CNJ_DADOS_DIR"] = diretorio
+        os.environ["CNJ_CACHE_DIR"] = os.path.join(diretorio, ".cache")
+        for linhas in args.tamanhos:
+            medir_mpm(diretorio, linhas, args.taxa_nao_informado, args.repeticoes, registrar)
+        for processos in args.processos_datajud:
+            medir_datajud(diretorio, processos, args.taxa_nao_informado, args.repeticoes, registrar)
+
+    import numpy
+    import pandas
+
+    relatorio = {
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "ambiente": {
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+            "pandas": pandas.__version__,
+            "numpy": numpy.__version__,
+        },
+        "parametros": vars(args),
+        "resultados": resultados,
+    }
+    os.makedirs(os.path.dirname(args.saida) or ".", exist_ok=True)
+    with open(args.saida, "w", encoding="utf-8") as arquivo:
+        json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            regressoes = comparar(relatorio, json.load(arquivo), args.tolerancia)
+        for etapa, linhas, antes, agora in regressoes:
+            print(f"REGRESSÃO {etapa} ({linhas:,} linhas): {antes * 1000:.1f} ms -> {agora * 1000:.1f} ms", file=sys.stderr)
+        return 1 if regressoes else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""Geradores de planilhas MPM e exportações DataJud sintéticas."""
+
+import gzip
+import json
+
+import numpy as np
+import pandas as pd
+
+VARIANTES_NAO_INFORMADO = ["Não informado", "NÃO INFORMADO", "nao informado", " Não Informado ", "N/I", "", None]
+
+CARGOS_MAGISTRADOS = ["Juiz(a) Substituto(a)", "Juiz(a) de Direito", "Desembargador(a)"]
+CARGOS_SERVIDORES = ["Analista Judiciário", "Técnico Judiciário", "Oficial de Justiça", "Assessor(a)", "Auxiliar Judiciário"]
+VINCULOS_SERVIDORES = [
+    "Efetivo", "Removido", "Cedido de outro tribunal", "Requisitado de outro tribunal",
+    "Cedido de fora do judiciário", "Requisitado de fora do judiciário", "Comissionado sem vínculo",
+]
+UFS = ["SP", "RJ", "MG", "RS", "PR", "BA", "PE", "CE", "DF", "GO"]
+ESCOLARIDADES = ["Médio", "Superior", "Especialização", "Mestrado", "Doutorado"]
+
+
+def gerar_mpm(linhas, tipo="servidores", taxa_nao_informado=0.05, semente=0):
+    """Planilha MPM sintética; ``taxa_nao_informado`` é a fração de registros com um campo inválido."""
+    rng = np.random.default_rng(semente)
+    servidores = tipo == "servidores"
+    df = pd.DataFrame({
+        "Matrícula": np.arange(1, linhas + 1),
+        "Nome": [f"Pessoa {i}" for i in range(linhas)],
+        "CPF": [f"{n:011d}" for n in rng.integers(10**9, 10**11, linhas)],
+        "Sexo": rng.choice(["M", "F"], linhas),
+        "Data de Nascimento": pd.to_datetime("1960-01-01") + pd.to_timedelta(rng.integers(0, 15000, linhas), unit="D"),
+        "Cargo": rng.choice(CARGOS_SERVIDORES if servidores else CARGOS_MAGISTRADOS, linhas),
+        "Lotação": [f"Unidade {n:03d}" for n in rng.integers(0, max(linhas // 200, 5), linhas)],
+        "UF": rng.choice(UFS, linhas),
+        "Escolaridade": rng.choice(ESCOLARIDADES, linhas),
+        "Situação": rng.choice(["Ativo", "Inativo"], linhas, p=[0.95, 0.05]),
+    })
+    if servidores:
+        df["Vínculo"] = rng.choice(VINCULOS_SERVIDORES, linhas)
+
+    # Um campo inválido em cada registro sorteado
+    campos = [c for c in df.columns if c not in ("Matrícula", "Situação")]
+    sorteados = np.flatnonzero(rng.random(linhas) < taxa_nao_informado)
+    colunas = rng.integers(0, len(campos), len(sorteados))
+    for indice, campo in enumerate(campos):
+        linhas_campo = sorteados[colunas == indice]
+        if len(linhas_campo):
+            df[campo] = df[campo].astype(object)
+            df.loc[linhas_campo, campo] = rng.choice(np.array(VARIANTES_NAO_INFORMADO, dtype=object), len(linhas_campo))
+    return df
+
+
+def alterar_registros(df, fracao, semente=1):
+    """Cópia de ``df`` com uma fração dos registros alterados em um campo, como em um novo mês."""
+    rng = np.random.default_rng(semente)
+    alterado = df.copy()
+    linhas = rng.choice(len(df), int(len(df) * fracao), replace=False)
+    campos = [c for c in ("sexo", "uf", "escolaridade") if c in df.columns]
+    for indice, campo in enumerate(campos):
+        alvo = alterado.index[linhas[indice::len(campos)]]
+        # Colunas categóricas (carregador compacto) não aceitam valores fora das categorias
+        alterado[campo] = alterado[campo].astype(object)
+        alterado.loc[alvo, campo] = rng.choice(np.array(VARIANTES_NAO_INFORMADO[:5] + ["F", "SP", "Mestrado"], dtype=object), len(alvo))
+    return alterado
+
+
+def _numero_cnj(sequencial, ano, tribunal=26, orgao=100):
+    resto = f"{ano:04d}8{tribunal:02d}{orgao:04d}"
+    base = f"{sequencial % 10**7:07d}"
+    return f"{base}{98 - int(base + resto + '00') % 97:02d}{resto}"
+
+
+def gerar_datajud(caminho, processos, tribunal="TJXX", grau="G1", taxa_erro=0.05, unidades=500, semente=0):
+    """Grava uma exportação DataJud sintética em JSONL compactado com gzip."""
+    rng = np.random.default_rng(semente)
+    meses = rng.integers(1, 13, processos)
+    orgaos = rng.integers(1, unidades + 1, processos)
+    formatos = rng.choice([1, 2], processos, p=[0.9, 0.1])
+    com_erro = rng.random(processos) < taxa_erro
+    with gzip.open(caminho, "wt", encoding="utf-8") as arquivo:
+        for i in range(processos):
+            processo = {
+                "numeroProcesso": _numero_cnj(i, 2020 + i % 5),
+                "tribunal": tribunal,
+                "grau": grau,
+                "dataAjuizamento": f"{2020 + i % 5}-03-10T00:00:00.000Z",
+                "dataHoraUltimaAtualizacao": f"2025-{meses[i]:02d}-15T12:00:00.000Z",
+                "classe": {"codigo": 7, "nome": "Procedimento Comum Cível"},
+                "assuntos": [{"codigo": 10431, "nome": "Indenização por Dano Moral"}],
+                "orgaoJulgador": {"codigo": int(orgaos[i]), "nome": f"Vara {orgaos[i]}"},
+                "formato": {"codigo": int(formatos[i])},
+                "movimentos": [{"codigo": 26, "dataHora": "2025-01-01T00:00:00.000Z"}],
+            }
+            if com_erro[i]:
+                processo["assuntos"] = []
+            arquivo.write(json.dumps(processo, ensure_ascii=False))
+            arquivo.write("\n")
@@ -0,0 +1,5 @@
+"""Cálculo dos indicadores do Prêmio CNJ de Qualidade (Eixo Dados e Tecnologia).
+
+Os módulos deste pacote não dependem do Streamlit, para que possam ser usados
+tanto pelas interfaces ``cnj_interface_*.py`` quanto por scripts em lote.
+"""
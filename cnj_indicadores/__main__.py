@@ -0,0 +1,5 @@
+import sys
+
+from cnj_indicadores.lote import main
+
+sys.exit(main())
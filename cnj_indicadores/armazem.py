@@ -0,0 +1,153 @@
+"""Armazém de conjuntos de dados compartilhado por todas as sessões do processo.
+
+Cada planilha (ou tabela derivada) é mantida uma única vez como
+``pyarrow.Table`` somente leitura. As sessões recebem uma ``Referencia``,
+por onde obtêm fatias e seleções de colunas sem cópia. Enquanto houver
+referências abertas a entrada não é descartada; as demais saem por ordem de
+uso (LRU) quando o total ultrapassa o limite de memória. A referência é
+liberada ao ser fechada ou quando o objeto é coletado, por exemplo ao fim da
+sessão que a guardava em ``st.session_state``. Um ``DataFrame`` obtido com
+``Referencia.para_pandas`` compartilha os buffers da tabela e mantém a
+referência aberta enquanto existir.
+"""
+
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+from cnj_indicadores.perfil import modulo_tardio
+
+# Importado ao contar o primeiro acesso (o módulo de instrumentação importa este)
+instrumentacao = modulo_tardio("cnj_indicadores.instrumentacao")
+
+LIMITE_PADRAO = int(os.environ.get("CNJ_ARMAZEM_MB", "1024")) * 1024 * 1024
+
+
+class Referencia:
+    """Acesso somente leitura a uma tabela do armazém."""
+
+    def __init__(self, armazem, chave, tabela):
+        self.chave = chave
+        self.tabela = tabela
+        self._finalizador = weakref.finalize(self, armazem._liberar, chave)
+
+    @property
+    def aberta(self):
+        return self._finalizador.alive
+
+    def fatia(self, inicio, tamanho):
+        """Linhas ``[inicio, inicio + tamanho)``, sem cópia."""
+        return self.tabela.slice(inicio, tamanho)
+
+    def colunas(self, nomes):
+        """Seleção de colunas, sem cópia."""
+        return self.tabela.select(list(nomes))
+
+    def para_pandas(self, tipos=None):
+        """``DataFrame`` da tabela; a referência fica aberta até o ``DataFrame`` ser coletado.
+
+        Textos e números sem nulos usam os buffers da tabela, sem cópia; por
+        isso a tabela não pode sair do armazém enquanto o ``DataFrame`` existir.
+        ``tipos`` é repassado como ``types_mapper`` a ``pyarrow.Table.to_pandas``.
+        """
+        df = self.tabela.to_pandas(split_blocks=True, types_mapper=tipos)
+        weakref.finalize(df, self.fechar)
+        return df
+
+    def fechar(self):
+        self._finalizador()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.fechar()
+
+
+class ArmazemDados:
+    """Tabelas Arrow compartilhadas, com contagem de referências e descarte LRU."""
+
+    def __init__(self, limite_bytes=LIMITE_PADRAO):
+        self.limite_bytes = limite_bytes
+        self.uso_bytes = 0
+        self.acertos = 0
+        self.carregamentos = 0
+        # chave -> [tabela, tamanho, referências abertas]
+        self._entradas = OrderedDict()
+        self._trava = threading.RLock()
+        self._carregando = {}
+
+    def __contains__(self, chave):
+        return chave in self._entradas
+
+    def abrir(self, chave, carregar):
+        """Referência à tabela da chave, carregada por ``carregar()`` uma única vez."""
+        with self._trava:
+            if chave not in self._entradas:
+                trava_chave = self._carregando.setdefault(chave, threading.Lock())
+            else:
+                trava_chave = None
+                self.acertos += 1
+                instrumentacao.contar("armazem_acertos")
+                entrada = self._entradas[chave]
+                entrada[2] += 1
+                self._entradas.move_to_end(chave)
+                return Referencia(self, chave, entrada[0])
+
+        with trava_chave:
+            with self._trava:
+                entrada = self._entradas.get(chave)
+                if entrada is not None:
+                    entrada[2] += 1
+                    return Referencia(self, chave, entrada[0])
+            try:
+                tabela = carregar()
+                with self._trava:
+                    self.carregamentos += 1
+                    instrumentacao.contar("armazem_carregamentos")
+                    self._entradas[chave] = [tabela, int(tabela.nbytes), 1]
+                    self.uso_bytes += int(tabela.nbytes)
+                    self._descartar_excedente()
+            finally:
+                with self._trava:
+                    self._carregando.pop(chave, None)
+        return Referencia(self, chave, tabela)
+
+    def _liberar(self, chave):
+        with self._trava:
+            entrada = self._entradas.get(chave)
+            if entrada is not None:
+                entrada[2] -= 1
+                self._descartar_excedente()
+
+    def _descartar_excedente(self):
+        # Só entradas sem referências abertas podem sair, das menos usadas para as mais usadas
+        for chave in list(self._entradas):
+            if self.uso_bytes <= self.limite_bytes:
+                break
+            _, tamanho, referencias = self._entradas[chave]
+            if referencias <= 0:
+                del self._entradas[chave]
+                self.uso_bytes -= tamanho
+
+    def limpar(self):
+        """Descarta as entradas sem referências abertas."""
+        with self._trava:
+            for chave in [chave for chave, entrada in self._entradas.items() if entrada[2] <= 0]:
+                self.uso_bytes -= self._entradas.pop(chave)[1]
+
+    def estatisticas(self):
+        with self._trava:
+            return {
+                "entradas": len(self._entradas),
+                "uso_bytes": self.uso_bytes,
+                "limite_bytes": self.limite_bytes,
+                "referencias": sum(entrada[2] for entrada in self._entradas.values()),
+                "acertos": self.acertos,
+                "carregamentos": self.carregamentos,
+            }
+
+
+# Instância única do processo, compartilhada pelas sessões do Streamlit
+armazem_dados = ArmazemDados()
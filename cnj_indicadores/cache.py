@@ -0,0 +1,124 @@
+"""Cache LRU de resultados, compartilhado por todas as sessões do processo.
+
+As chaves combinam o hash da fonte, a referência do indicador e os parâmetros
+do cálculo (meta, pontuação máxima...). Quando o tamanho estimado dos valores
+ultrapassa o limite, as entradas usadas há mais tempo são descartadas.
+"""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+from cnj_indicadores.perfil import modulo_tardio
+
+np = modulo_tardio("numpy")
+pd = modulo_tardio("pandas")
+# Importado ao contar o primeiro acesso (o módulo de instrumentação importa este)
+instrumentacao = modulo_tardio("cnj_indicadores.instrumentacao")
+LIMITE_PADRAO = int(os.environ.get("CNJ_CACHE_MB", "256")) * 1024 * 1024
+
+
+def tamanho_estimado(valor):
+    """Estimativa em bytes da memória ocupada por ``valor``."""
+    if isinstance(valor, np.ndarray):
+        return int(valor.nbytes)
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        uso = valor.memory_usage(deep=True)
+        return int(uso.sum() if isinstance(valor, pd.DataFrame) else uso)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamanho_estimado(k) + tamanho_estimado(v) for k, v in valor.items())
+    if isinstance(valor, (list, tuple, set, frozenset)):
+        return sys.getsizeof(valor) + sum(tamanho_estimado(v) for v in valor)
+    if hasattr(valor, "__dict__") and not isinstance(valor, type):
+        return sys.getsizeof(valor) + tamanho_estimado(vars(valor))
+    return sys.getsizeof(valor)
+
+
+class CacheLRU:
+    """Cache LRU com descarte por tamanho, seguro para uso entre threads."""
+
+    def __init__(self, limite_bytes=LIMITE_PADRAO):
+        self.limite_bytes = limite_bytes
+        self.uso_bytes = 0
+        self.acertos = 0
+        self.falhas = 0
+        self._entradas = OrderedDict()
+        self._trava = threading.RLock()
+        self._calculando = {}
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def __contains__(self, chave):
+        return chave in self._entradas
+
+    def obter(self, chave, padrao=None):
+        with self._trava:
+            if chave not in self._entradas:
+                return padrao
+            self._entradas.move_to_end(chave)
+            return self._entradas[chave][0]
+
+    def guardar(self, chave, valor):
+        tamanho = tamanho_estimado(valor)
+        with self._trava:
+            if chave in self._entradas:
+                self.uso_bytes -= self._entradas.pop(chave)[1]
+            # Valores maiores que o próprio limite não são guardados
+            if tamanho > self.limite_bytes:
+                return
+            self._entradas[chave] = (valor, tamanho)
+            self.uso_bytes += tamanho
+            while self.uso_bytes > self.limite_bytes:
+                _, (_, liberado) = self._entradas.popitem(last=False)
+                self.uso_bytes -= liberado
+
+    def obter_ou_calcular(self, chave, calcular):
+        """Retorna o valor da chave, calculando-o uma única vez mesmo com sessões concorrentes."""
+        with self._trava:
+            if chave in self._entradas:
+                self.acertos += 1
+                instrumentacao.contar("cache_acertos")
+                self._entradas.move_to_end(chave)
+                return self._entradas[chave][0]
+            self.falhas += 1
+            instrumentacao.contar("cache_falhas")
+            trava_chave = self._calculando.setdefault(chave, threading.Lock())
+
+        with trava_chave:
+            # Outra sessão pode ter calculado o valor enquanto esperávamos
+            with self._trava:
+                if chave in self._entradas:
+                    return self._entradas[chave][0]
+            try:
+                valor = calcular()
+                self.guardar(chave, valor)
+            finally:
+                with self._trava:
+                    self._calculando.pop(chave, None)
+        return valor
+
+    def limpar(self):
+        with self._trava:
+            self._entradas.clear()
+            self.uso_bytes = 0
+
+    def estatisticas(self):
+        with self._trava:
+            return {
+                "entradas": len(self._entradas),
+                "uso_bytes": self.uso_bytes,
+                "limite_bytes": self.limite_bytes,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+            }
+
+
+def chave_indicador(digest, ref, **parametros):
+    """Chave de cache de um cálculo: hash da fonte, referência do indicador e parâmetros."""
+    return (digest, ref, tuple(sorted(parametros.items())))
+
+
+# Instância única do processo, compartilhada pelas sessões do Streamlit
+cache_indicadores = CacheLRU()
@@ -0,0 +1,57 @@
+"""Funções de cálculo e pontuação compartilhadas pelas calculadoras do registro."""
+
+from dataclasses import replace
+
+from cnj_indicadores import categorias, inconsistencias, incremental
+from cnj_indicadores.cache import cache_indicadores, chave_indicador
+from cnj_indicadores.fontes import carregar_planilha, hash_arquivo
+
+
+def pontuar(percentual, meta, pontos_max, sentido="maximo"):
+    """Situação em relação à meta e pontuação (tudo ou nada) de um percentual."""
+    aprovado = percentual <= meta if sentido == "maximo" else percentual >= meta
+    return {
+        "percentual": percentual,
+        "aprovado": aprovado,
+        "pontos": pontos_max if aprovado else 0,
+        "pontos_max": pontos_max,
+    }
+
+
+def avaliar(total, inconsistentes, meta, pontos_max):
+    """Percentual de inconsistência, situação em relação à meta e pontuação."""
+    percentual = (inconsistentes / total * 100) if total > 0 else 0
+    resultado = pontuar(percentual, meta, pontos_max)
+    resultado["total"] = total
+    resultado["inconsistentes"] = inconsistentes
+    resultado["formula"] = f"({inconsistentes} ÷ {total}) × 100 = {percentual:.2f}%"
+    return resultado
+
+
+def analisar_fonte(caminho):
+    """Inconsistências dos registros ativos da fonte, calculadas uma vez por conteúdo de arquivo.
+
+    Fora do cache, só os registros alterados desde a última planilha do mesmo
+    tipo são reavaliados (ver ``incremental``). O resultado traz também a
+    categoria de vínculo de cada registro.
+    """
+    def analisar():
+        df = inconsistencias.filtrar_ativos(carregar_planilha(caminho))
+        return replace(incremental.analisar_incremental(caminho, df), categoria=categorias.codigos(df))
+
+    digest = hash_arquivo(caminho)
+    return cache_indicadores.obter_ou_calcular(chave_indicador(digest, "inconsistencias"), analisar)
+
+
+def avaliar_categorias(contagem, consideradas, meta, pontos_max):
+    """Como :func:`avaliar`, só com os registros das categorias ``consideradas``.
+
+    ``contagem`` é a matriz de ``categorias.contar``; o resultado inclui a
+    tabela por categoria e quantos registros ficaram fora das consideradas.
+    """
+    tabela = categorias.resumir(contagem, consideradas)
+    elegiveis = tabela[tabela["considerada"]]
+    resultado = avaliar(int(elegiveis["total"].sum()), int(elegiveis["inconsistentes"].sum()), meta, pontos_max)
+    resultado["categorias"] = tabela
+    resultado["fora_categorias"] = int(tabela.loc[~tabela["considerada"], "total"].sum())
+    return resultado
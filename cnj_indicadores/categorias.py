@@ -0,0 +1,164 @@
+"""Classificação dos servidores por categoria de vínculo (Art. 12, II, c).
+
+A categoria vem do texto da coluna de vínculo (ou, na falta dela, do cargo).
+Para cedidos e requisitados contam a direção (só os recebidos pelo tribunal
+entram no indicador; os cedidos pelo tribunal a outros órgãos ficam em
+"outros") e a origem (outro tribunal ou fora do Judiciário).
+
+As regras são avaliadas sobre os valores distintos da coluna, como na
+detecção de inconsistências. Os totais por categoria são obtidos em uma única
+passada sobre os códigos dos registros (``np.bincount``), sem filtrar a
+planilha categoria a categoria.
+"""
+
+import re
+
+from cnj_indicadores import inconsistencias
+from cnj_indicadores.fontes import normalizar_texto
+from cnj_indicadores.perfil import modulo_tardio
+
+np = modulo_tardio("numpy")
+pd = modulo_tardio("pandas")
+
+# Categoria -> rótulo exibido, na ordem das tabelas
+CATEGORIAS = {
+    "efetivos_removidos": "Efetivos/removidos",
+    "cedidos_outro_tribunal": "Cedidos/requisitados de outro tribunal",
+    "cedidos_fora_judiciario": "Cedidos/requisitados de fora do Judiciário",
+    "cedidos_origem_nao_informada": "Cedidos/requisitados sem origem informada",
+    "comissionados_sem_vinculo": "Comissionados sem vínculo",
+    "nao_informado": "Vínculo não informado",
+    "outros": "Outros (inclui cedidos a outros órgãos)",
+}
+
+# Categorias consideradas pelo Art. 12, II, c). Cedidos e requisitados sem a
+# origem no texto também entram (a origem só muda a linha da tabela), e os
+# registros sem vínculo informado permanecem: já são inconsistentes e não há
+# como saber se estão fora
+CATEGORIAS_SERVIDORES = (
+    "efetivos_removidos", "cedidos_outro_tribunal", "cedidos_fora_judiciario",
+    "cedidos_origem_nao_informada", "comissionados_sem_vinculo", "nao_informado",
+)
+
+# Categorias que não identificam o vínculo do registro
+SEM_VINCULO = ("nao_informado", "outros")
+
+# Colunas lidas para classificar, em ordem de preferência (nomes normalizados)
+COLUNAS_VINCULO = ("vinculo", "tipo_de_vinculo", "tipo_vinculo", "forma_de_provimento", "cargo")
+
+# Trechos do texto normalizado de cada regra, avaliadas na ordem de ``classificar_texto``
+SEM_VINCULO_EFETIVO = ("sem vinculo",)
+# Servidor do tribunal cedido ou requisitado por outro órgão (saída)
+CESSAO_SAIDA = (
+    "cedido para", "cedida para", "cedidos para", "cedido a outro", "cedida a outro",
+    "requisitado por", "requisitada por", "efetivo cedido", "efetiva cedida",
+    "em exercicio em outro", "em exercicio externo",
+)
+# Servidor de outro órgão cedido ou requisitado ao tribunal (entrada)
+CESSAO_ENTRADA = ("cedid", "requisitad")
+# Origem dos cedidos/requisitados recebidos (expressões sobre o texto normalizado);
+# a primeira que casar vale. Siglas de tribunais podem vir com a UF ou a região (TJSP, TRT2)
+ORIGENS = [
+    ("cedidos_fora_judiciario", re.compile(
+        r"fora do (poder )?judiciario|outros? poder|executivo|legislativo|ministerio|prefeitura|municipi|governo|extern"
+    )),
+    ("cedidos_outro_tribunal", re.compile(
+        r"tribuna|judiciario|conselho nacional de justica"
+        r"|\b(tj|tjm|trf|trt|tre|stf|stj|tst|tse|stm|cnj|cjf|csjt)[a-z]{0,2}(?![a-z])"
+    )),
+]
+EFETIVOS_REMOVIDOS = ("efetiv", "removid")
+
+
+def _contem(texto, trechos):
+    return any(trecho in texto for trecho in trechos)
+
+
+def classificar_texto(valor):
+    """Categoria de um valor de vínculo."""
+    texto = normalizar_texto(valor)
+    if texto in inconsistencias.VALORES_NAO_INFORMADO:
+        return "nao_informado"
+    if _contem(texto, SEM_VINCULO_EFETIVO):
+        return "comissionados_sem_vinculo"
+    if _contem(texto, CESSAO_SAIDA):
+        return "outros"
+    if _contem(texto, CESSAO_ENTRADA):
+        return next(
+            (categoria for categoria, expressao in ORIGENS if expressao.search(texto)),
+            "cedidos_origem_nao_informada",
+        )
+    if _contem(texto, EFETIVOS_REMOVIDOS):
+        return "efetivos_removidos"
+    return "outros"
+
+
+def coluna_vinculo(df):
+    """Primeira coluna de ``COLUNAS_VINCULO`` presente em ``df``, ou ``None``."""
+    return next((coluna for coluna in COLUNAS_VINCULO if coluna in df.columns), None)
+
+
+def classificar(df):
+    """Categoria de cada registro de ``df`` (``pd.Categorical`` com as categorias de ``CATEGORIAS``)."""
+    coluna = coluna_vinculo(df)
+    categorias = list(CATEGORIAS)
+    if coluna is None:
+        return pd.Categorical.from_codes(np.full(len(df), categorias.index("outros")), categorias)
+    codigos, unicos = pd.factorize(df[coluna], use_na_sentinel=True)
+    por_valor = np.array([categorias.index(classificar_texto(valor)) for valor in unicos] + [categorias.index("nao_informado")])
+    return pd.Categorical.from_codes(por_valor[codigos], categorias)
+
+
+def codigos(df):
+    """Códigos (``int8``, posições em ``CATEGORIAS``) da categoria de cada registro.
+
+    Retorna ``None`` quando a planilha não informa o vínculo: sem nenhuma das
+    ``COLUNAS_VINCULO`` ou sem nenhum registro classificado em uma categoria
+    de vínculo (ex.: só o nome do cargo, sem a forma de provimento).
+    """
+    if coluna_vinculo(df) is None:
+        return None
+    resultado = np.asarray(classificar(df).codes, dtype=np.int8)
+    if np.isin(resultado, [list(CATEGORIAS).index(categoria) for categoria in SEM_VINCULO]).all():
+        return None
+    return resultado
+
+
+def informa_vinculo(contagem):
+    """Se algum registro de ``contagem`` (ver :func:`contar`) tem o vínculo identificado."""
+    identificadas = [i for i, categoria in enumerate(CATEGORIAS) if categoria not in SEM_VINCULO]
+    return bool(contagem[identificadas, 0].any())
+
+
+def contar(codigos_registros, inconsistentes):
+    """Registros e inconsistentes por categoria: matriz (categorias x 2) de uma única contagem.
+
+    Cada registro cai na caixa ``2 * código + inconsistente``, de modo que um
+    só ``np.bincount`` agrupa as duas contagens de todas as categorias.
+    """
+    caixas = np.asarray(codigos_registros, dtype=np.int64) * 2 + np.asarray(inconsistentes, dtype=np.int64)
+    contagem = np.bincount(caixas, minlength=2 * len(CATEGORIAS)).reshape(len(CATEGORIAS), 2)
+    return np.column_stack([contagem.sum(axis=1), contagem[:, 1]])
+
+
+def resumir(contagem, consideradas=CATEGORIAS_SERVIDORES):
+    """Tabela por categoria (registros, inconsistentes, percentual e se entra no indicador)."""
+    tabela = pd.DataFrame({
+        "categoria": list(CATEGORIAS.values()),
+        "total": contagem[:, 0].astype("int64"),
+        "inconsistentes": contagem[:, 1].astype("int64"),
+        "considerada": [categoria in consideradas for categoria in CATEGORIAS],
+    }, index=list(CATEGORIAS))
+    tabela["percentual"] = (tabela["inconsistentes"] / tabela["total"].where(tabela["total"] > 0) * 100).fillna(0.0)
+    return tabela
+
+
+def para_exibicao(tabela):
+    """Tabela de :func:`resumir` com rótulos e percentuais formatados para as interfaces."""
+    return pd.DataFrame({
+        "Categoria": tabela["categoria"],
+        "Registros": tabela["total"],
+        "Inconsistências": tabela["inconsistentes"],
+        "Percentual": tabela["percentual"].map("{:.2f}%".format),
+        "Considerada": tabela["considerada"].map({True: "✅", False: "—"}),
+    }).reset_index(drop=True)
@@ -0,0 +1,197 @@
+"""Comparação entre tribunais e meses a partir de um cubo de resultados.
+
+O cubo (tribunal x indicador x mês) é montado a partir do banco de
+resultados (:mod:`cnj_indicadores.persistencia`) e gravado em Parquet,
+ordenado por indicador, mês e tribunal, com um grupo de linhas por
+indicador. Os metadados do arquivo guardam o índice ``indicador -> mês ->
+[início, fim)`` das linhas, de modo que rankings e mapas de calor são fatias
+da tabela (sem cópia), sem recalcular os indicadores de cada tribunal.
+"""
+
+import functools
+import json
+import os
+
+from cnj_indicadores import fontes, graficos, persistencia, registro
+from cnj_indicadores.armazem import armazem_dados
+from cnj_indicadores.perfil import modulo_tardio
+
+np = modulo_tardio("numpy")
+pd = modulo_tardio("pandas")
+pa = modulo_tardio("pyarrow")
+pq = modulo_tardio("pyarrow.parquet")
+
+CAMINHO_PADRAO = os.environ.get("CNJ_CUBO", os.path.join(fontes.DIRETORIO_DADOS, "cubo_resultados.parquet"))
+
+# Versão do formato do cubo: mudar quando as colunas ou o índice mudarem
+VERSAO_CUBO = 1
+
+
+@functools.lru_cache(maxsize=None)
+def esquema():
+    """Esquema Arrow do cubo, montado no primeiro uso."""
+    return pa.schema([
+        ("ref", pa.dictionary(pa.int16(), pa.string())),
+        ("mes", pa.dictionary(pa.int16(), pa.string())),
+        ("tribunal", pa.dictionary(pa.int32(), pa.string())),
+        ("percentual", pa.float64()),
+        ("aprovado", pa.bool_()),
+        ("pontos", pa.int16()),
+        ("pontos_max", pa.int16()),
+        ("total", pa.int32()),
+        ("inconsistentes", pa.int32()),
+        ("salvo_em", pa.string()),
+    ])
+
+
+def montar_cubo(linhas):
+    """Tabela Arrow ordenada do cubo, com o índice nos metadados, a partir de linhas do banco."""
+    df = pd.DataFrame(linhas, columns=list(persistencia.COLUNAS))
+    df["mes"] = df["data_referencia"].str[:7]
+    # Mais de uma gravação no mesmo mês: vale a mais recente
+    df = df.sort_values("salvo_em").drop_duplicates(["ref", "mes", "tribunal"], keep="last")
+    df = df.sort_values(["ref", "mes", "tribunal"], ignore_index=True)
+    df["aprovado"] = df["aprovado"].astype("boolean")
+
+    # Início de cada bloco (indicador, mês) na tabela ordenada
+    refs, meses = df["ref"].to_numpy(), df["mes"].to_numpy()
+    novo_bloco = np.ones(len(df), dtype=bool)
+    novo_bloco[1:] = (refs[1:] != refs[:-1]) | (meses[1:] != meses[:-1])
+    limites = np.flatnonzero(novo_bloco)
+    indice = {}
+    for inicio, fim in zip(limites, list(limites[1:]) + [len(df)]):
+        indice.setdefault(df.at[inicio, "ref"], {})[df.at[inicio, "mes"]] = [int(inicio), int(fim)]
+
+    tabela = pa.Table.from_pandas(df[esquema().names], schema=esquema(), preserve_index=False)
+    metadados = {
+        "versao": VERSAO_CUBO,
+        "indice": indice,
+        "meses": sorted(df["mes"].unique().tolist()),
+        "tribunais": sorted(df["tribunal"].unique().tolist()),
+    }
+    return tabela.replace_schema_metadata({"cubo": json.dumps(metadados, ensure_ascii=False)})
+
+
+def gravar_cubo(tabela, destino=None):
+    """Grava o cubo com um grupo de linhas por indicador (substituição atômica)."""
+    destino = destino or CAMINHO_PADRAO
+    os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+    temporario = fontes.caminho_temporario(destino)
+    indice = json.loads(tabela.schema.metadata[b"cubo"])["indice"]
+    with pq.ParquetWriter(temporario, tabela.schema) as escritor:
+        for meses in indice.values():
+            inicio = min(limites[0] for limites in meses.values())
+            fim = max(limites[1] for limites in meses.values())
+            escritor.write_table(tabela.slice(inicio, fim - inicio))
+        if not indice:
+            escritor.write_table(tabela)
+    os.replace(temporario, destino)
+    return destino
+
+
+def construir_cubo(destino=None, repositorio=None):
+    """Monta o cubo a partir do banco de resultados e o grava em ``destino``."""
+    repositorio = repositorio or persistencia.repositorio_resultados
+    tabela = montar_cubo(repositorio.listar_ultimos())
+    gravar_cubo(tabela, destino)
+    return tabela
+
+
+class Cubo:
+    """Consultas por fatia do cubo de resultados.
+
+    Com ``referencia`` (do armazém), a tabela conta como em uso enquanto o cubo existir.
+    """
+
+    def __init__(self, tabela, referencia=None):
+        self.tabela = tabela
+        self.referencia = referencia
+        metadados = json.loads(tabela.schema.metadata[b"cubo"])
+        self.indice = metadados["indice"]
+        self.meses = metadados["meses"]
+        self.tribunais = metadados["tribunais"]
+
+    @property
+    def refs(self):
+        return [indicador.ref for indicador in registro.indicadores() if indicador.ref in self.indice]
+
+    def __len__(self):
+        return self.tabela.num_rows
+
+    def fatia(self, ref, mes=None):
+        """Linhas do indicador (em um mês ou em todos), sem copiar a tabela."""
+        meses = self.indice.get(ref, {})
+        if mes is not None:
+            limites = [meses[mes]] if mes in meses else []
+        else:
+            limites = list(meses.values())
+        if not limites:
+            return self.tabela.slice(0, 0).to_pandas()
+        inicio = min(limite[0] for limite in limites)
+        fim = max(limite[1] for limite in limites)
+        return self.tabela.slice(inicio, fim - inicio).to_pandas()
+
+    def ranking(self, ref, mes):
+        """Tribunais do melhor ao pior resultado no indicador e mês."""
+        df = self.fatia(ref, mes)
+        melhor_menor = registro.obter(ref).sentido == "maximo"
+        df = df.sort_values(["percentual", "tribunal"], ascending=[melhor_menor, True], ignore_index=True)
+        df.insert(0, "posicao", np.arange(1, len(df) + 1))
+        return df[["posicao", "tribunal", "percentual", "aprovado", "pontos", "pontos_max", "total", "inconsistentes"]]
+
+    def mapa_calor(self, ref):
+        """Percentual por tribunal (linhas) e mês (colunas)."""
+        df = self.fatia(ref)
+        return df.pivot(index="tribunal", columns="mes", values="percentual").reindex(columns=self.meses)
+
+    def pontuacao(self, mes):
+        """Pontos de cada tribunal somados entre os indicadores do mês, do maior para o menor."""
+        partes = [self.fatia(ref, mes) for ref in self.indice if mes in self.indice[ref]]
+        if not partes:
+            return pd.DataFrame(columns=["posicao", "tribunal", "pontos", "pontos_max", "indicadores"])
+        df = pd.concat(partes, ignore_index=True)
+        df["tribunal"] = df["tribunal"].astype(str)
+        total = df.groupby("tribunal", observed=True).agg(
+            pontos=("pontos", "sum"), pontos_max=("pontos_max", "sum"), indicadores=("ref", "size")
+        ).reset_index()
+        total = total.sort_values(["pontos", "tribunal"], ascending=[False, True], ignore_index=True)
+        total.insert(0, "posicao", np.arange(1, len(total) + 1))
+        return total
+
+    def especificacao_mapa_calor(self, ref):
+        """Gráfico Vega-Lite do mapa de calor do indicador."""
+        indicador = registro.obter(ref)
+        df = self.fatia(ref)
+        return graficos.especificacao_mapa_calor(
+            df["tribunal"].astype(str), df["mes"].astype(str), df["percentual"],
+            titulo=indicador.rotulo, inverter=indicador.sentido == "minimo",
+        )
+
+
+def abrir_cubo(caminho=None):
+    """Cubo gravado em ``caminho``, lido uma vez por versão do arquivo e compartilhado entre sessões.
+
+    Retorna ``None`` se o arquivo não existe ou foi gravado em outro formato.
+    """
+    caminho = os.path.abspath(caminho or CAMINHO_PADRAO)
+    try:
+        estado = os.stat(caminho)
+    except OSError:
+        return None
+    chave = ("cubo", caminho, estado.st_size, estado.st_mtime_ns)
+    referencia = armazem_dados.abrir(chave, lambda: pq.read_table(caminho, memory_map=True))
+    metadados = json.loads((referencia.tabela.schema.metadata or {}).get(b"cubo", b"{}"))
+    if metadados.get("versao") != VERSAO_CUBO:
+        referencia.fechar()
+        return None
+    return Cubo(referencia.tabela, referencia)
+
+
+def desatualizado(caminho=None, banco=None):
+    """Se o banco de resultados foi alterado depois da última gravação do cubo."""
+    caminho = caminho or CAMINHO_PADRAO
+    banco = banco or persistencia.CAMINHO_PADRAO
+    if not os.path.isfile(caminho):
+        return True
+    alteracoes = [os.path.getmtime(arquivo) for arquivo in (banco, f"{banco}-wal") if os.path.isfile(arquivo)]
+    return bool(alteracoes) and max(alteracoes) > os.path.getmtime(caminho)
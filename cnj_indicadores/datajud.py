@@ -0,0 +1,489 @@
+"""Ingestão das exportações em lote do DataJud (Art. 12, I).
+
+As exportações são arquivos JSON/JSONL, opcionalmente compactados com gzip,
+um por tribunal/grau. Cada arquivo é lido em fluxo (registro a registro) por
+um processo do pool, que devolve apenas contadores agregados por tribunal,
+grau e mês. O resultado é uma tabela-resumo pequena, gravada em Parquet no
+cache e identificada pela assinatura (nome, tamanho, data) dos arquivos.
+Registros malformados (linha inválida, arquivo truncado) são contados como
+ilegíveis, com erro de preenchimento, sem interromper a leitura do arquivo.
+"""
+
+import gzip
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from cnj_indicadores import fontes, tarefas
+from cnj_indicadores.armazem import armazem_dados
+from cnj_indicadores.perfil import modulo_tardio
+
+np = modulo_tardio("numpy")
+pd = modulo_tardio("pandas")
+pq = modulo_tardio("pyarrow.parquet")
+
+DIRETORIO_DATAJUD = os.environ.get("CNJ_DATAJUD_DIR", os.path.join(fontes.DIRETORIO_DADOS, "datajud"))
+
+# Limite de processos paralelos (padrão: todos os núcleos)
+PROCESSOS = int(os.environ.get("CNJ_PROCESSOS", "0")) or None
+
+# Graus que devem enviar remessas mensais, por ramo (prefixo da sigla do tribunal; o mais
+# longo vale). CNJ_GRAUS_DATAJUD (ex.: "G1,G2") substitui a lista para todos os tribunais
+GRAUS_POR_RAMO = {
+    "TJM": ("G1", "G2"),
+    "TJ": ("G1", "G2", "JE", "TR"),
+    "TRF": ("G1", "G2", "JE", "TR", "TRU"),
+    "TRT": ("G1", "G2"),
+    "TRE": ("G1", "G2"),
+    "STJ": ("SUP",),
+    "TST": ("SUP",),
+    "TSE": ("SUP",),
+    "STM": ("SUP",),
+}
+GRAUS_CONFIGURADOS = tuple(grau.strip() for grau in os.environ.get("CNJ_GRAUS_DATAJUD", "").split(",") if grau.strip())
+
+EXTENSOES = (".json", ".jsonl", ".ndjson", ".json.gz", ".jsonl.gz", ".ndjson.gz")
+
+# Bits de erro por processo (campos obrigatórios ausentes ou inválidos)
+ERRO_NUMERO = 1
+ERRO_CLASSE = 2
+ERRO_ASSUNTO = 4
+ERRO_ORGAO = 8
+ERRO_AJUIZAMENTO = 16
+ERRO_MOVIMENTOS = 32
+ERRO_FORMATO = 64
+ERRO_ILEGIVEL = 128
+
+DESCRICAO_ERROS = {
+    ERRO_NUMERO: "Número do processo inválido",
+    ERRO_CLASSE: "Classe ausente",
+    ERRO_ASSUNTO: "Assunto ausente",
+    ERRO_ORGAO: "Órgão julgador ausente",
+    ERRO_AJUIZAMENTO: "Data de ajuizamento ausente",
+    ERRO_MOVIMENTOS: "Sem movimentos",
+    ERRO_FORMATO: "Formato (eletrônico/físico) ausente",
+    ERRO_ILEGIVEL: "Registro ilegível (JSON malformado)",
+}
+
+# Códigos do campo "formato" no DataJud
+FORMATO_ELETRONICO = 1
+FORMATO_FISICO = 2
+
+COLUNAS_PROCESSOS = ["tribunal", "grau", "ano_mes", "orgao_codigo", "orgao_nome", "formato", "erros"]
+COLUNAS_RESUMO = [
+    "tribunal", "grau", "ano_mes", "processos", "movimentos", "com_erro", "eletronicos", "fisicos", "ilegiveis",
+]
+
+# Versão do resumo gravado em cache: mudar quando as colunas mudarem
+VERSAO_RESUMO = 2
+
+_TAMANHO_LEITURA = 1024 * 1024
+
+# Elemento de array sem fechamento depois deste tamanho: o restante do arquivo é ilegível
+_LIMITE_ELEMENTO = 64 * 1024 * 1024
+
+# Início do array de processos de uma resposta da API (``{"hits": {..., "hits": [``)
+_INICIO_HITS = re.compile(r'^\s*\{.*?"hits"\s*:\s*\{.*?"hits"\s*:\s*\[', re.DOTALL)
+
+
+def listar_exportacoes(diretorio=None):
+    """Arquivos de exportação do DataJud encontrados (recursivamente) no diretório."""
+    diretorio = diretorio or DIRETORIO_DATAJUD
+    encontrados = []
+    for raiz, _, nomes in os.walk(diretorio):
+        for nome in nomes:
+            if nome.lower().endswith(EXTENSOES):
+                encontrados.append(os.path.join(raiz, nome))
+    return sorted(encontrados)
+
+
+def assinatura_exportacoes(diretorio):
+    """Identificador do conjunto de exportações, baseado em nome, tamanho e data de cada arquivo."""
+    digest = hashlib.sha256()
+    for caminho in listar_exportacoes(diretorio):
+        estado = os.stat(caminho)
+        digest.update(f"{os.path.relpath(caminho, diretorio)}|{estado.st_size}|{estado.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+def _abrir(caminho):
+    if caminho.lower().endswith(".gz"):
+        return gzip.open(caminho, "rt", encoding="utf-8-sig", errors="replace")
+    return open(caminho, encoding="utf-8-sig", errors="replace")
+
+
+class _Varredura:
+    """Busca do fim de um elemento de array (chaves, colchetes e aspas balanceados).
+
+    A posição, a profundidade e o estado dentro de texto são mantidos entre
+    as chamadas: quando o elemento continua no próximo bloco, a busca é
+    retomada de onde parou, sem reler o início do elemento.
+    """
+
+    def __init__(self, posicao):
+        self.posicao = posicao
+        self.profundidade = 0
+        self.em_texto = self.escape = False
+
+    def fim(self, buffer):
+        """Fim do elemento em ``buffer``, ou -1 se ele continua além do buffer."""
+        profundidade, em_texto, escape = self.profundidade, self.em_texto, self.escape
+        for indice in range(self.posicao, len(buffer)):
+            caractere = buffer[indice]
+            if em_texto:
+                if escape:
+                    escape = False
+                elif caractere == "\\":
+                    escape = True
+                elif caractere == '"':
+                    em_texto = False
+            elif caractere == '"':
+                em_texto = True
+            elif caractere in "{[":
+                profundidade += 1
+            elif caractere in "}]":
+                if profundidade == 0:
+                    return indice
+                profundidade -= 1
+                if profundidade == 0:
+                    return indice + 1
+            elif caractere == "," and profundidade == 0:
+                return indice
+        self.posicao = len(buffer)
+        self.profundidade, self.em_texto, self.escape = profundidade, em_texto, escape
+        return -1
+
+
+def _iterar_array(arquivo, buffer, posicao):
+    """Decodifica em fluxo os elementos do array JSON iniciado antes de ``buffer[posicao]``.
+
+    Elementos malformados geram ``None``; em um arquivo truncado, o trecho
+    final incompleto também. Um elemento que atravessa blocos é decodificado
+    uma única vez, quando a varredura encontra o seu fim.
+    """
+    decodificador = json.JSONDecoder()
+    while True:
+        # Pular espaços e vírgulas entre elementos
+        while True:
+            while posicao < len(buffer) and buffer[posicao] in " \t\r\n,":
+                posicao += 1
+            if posicao < len(buffer):
+                break
+            bloco = arquivo.read(_TAMANHO_LEITURA)
+            if not bloco:
+                return
+            buffer, posicao = bloco, 0
+        if buffer[posicao] == "]":
+            return
+        try:
+            objeto, fim = decodificador.raw_decode(buffer, posicao)
+        except json.JSONDecodeError:
+            varredura = _Varredura(posicao)
+            fim = varredura.fim(buffer)
+            while fim < 0:
+                bloco = arquivo.read(_TAMANHO_LEITURA)
+                if not bloco or len(buffer) - posicao > _LIMITE_ELEMENTO:
+                    yield None
+                    return
+                # O buffer só é recortado aqui, ao completar o elemento com o próximo bloco
+                buffer = buffer[posicao:] + bloco
+                varredura.posicao -= posicao
+                posicao = 0
+                fim = varredura.fim(buffer)
+            try:
+                objeto, _ = decodificador.raw_decode(buffer[posicao:fim])
+            except json.JSONDecodeError:
+                # Elemento completo, mas inválido: contado e pulado
+                objeto = None
+        yield objeto
+        posicao = fim
+
+
+def _desembrulhar(objeto):
+    # Respostas da API pública trazem o processo em "_source"
+    if isinstance(objeto, dict) and "_source" in objeto:
+        return objeto["_source"]
+    return objeto
+
+
+def _decodificar_linha(linha):
+    try:
+        return _desembrulhar(json.loads(linha))
+    except json.JSONDecodeError:
+        return None
+
+
+def iterar_registros(caminho):
+    """Gera os processos de um arquivo de exportação, sem carregá-lo inteiro.
+
+    São lidos em fluxo arquivos JSONL (um processo por linha), arrays JSON e
+    respostas da API com os processos em ``hits.hits``. Cada registro
+    malformado (linha inválida, elemento truncado) gera ``None`` e a leitura
+    continua.
+    """
+    with _abrir(caminho) as arquivo:
+        inicio = arquivo.read(_TAMANHO_LEITURA)
+        conteudo = inicio.lstrip()
+        if not conteudo:
+            return
+        if conteudo[0] == "[":
+            for objeto in _iterar_array(arquivo, inicio, inicio.index("[") + 1):
+                yield _desembrulhar(objeto)
+            return
+        hits = _INICIO_HITS.match(inicio)
+        if hits is not None:
+            for objeto in _iterar_array(arquivo, inicio, hits.end()):
+                yield _desembrulhar(objeto)
+            return
+        if len(inicio) < _TAMANHO_LEITURA and "\n" in conteudo.strip():
+            # Arquivo pequeno: pode ser um único processo em várias linhas
+            try:
+                documento = json.loads(inicio)
+            except json.JSONDecodeError:
+                pass
+            else:
+                yield _desembrulhar(documento)
+                return
+
+        pendente = inicio
+        for bloco in iter(lambda: arquivo.read(_TAMANHO_LEITURA), ""):
+            pendente += bloco
+            linhas = pendente.split("\n")
+            pendente = linhas.pop()
+            for linha in linhas:
+                if linha.strip():
+                    yield _decodificar_linha(linha)
+        for linha in pendente.split("\n"):
+            if linha.strip():
+                yield _decodificar_linha(linha)
+
+
+def numero_cnj_valido(numero):
+    """Confere os dígitos verificadores do número único (NNNNNNN-DD.AAAA.J.TR.OOOO)."""
+    digitos = "".join(c for c in str(numero or "") if c.isdigit())
+    if len(digitos) != 20:
+        return False
+    sequencial, verificador, resto = digitos[:7], digitos[7:9], digitos[9:]
+    return int(verificador) == 98 - int(sequencial + resto + "00") % 97
+
+
+def ano_mes(valor):
+    """Converte datas do DataJud ("2025-07-31T..." ou "20250731000000") em "2025-07"."""
+    digitos = "".join(c for c in str(valor or "")[:10] if c.isdigit())
+    if len(digitos) < 6:
+        return None
+    return f"{digitos[:4]}-{digitos[4:6]}"
+
+
+def _tem_codigo(valor):
+    if isinstance(valor, list):
+        return any(_tem_codigo(item) for item in valor)
+    return isinstance(valor, dict) and valor.get("codigo") not in (None, "")
+
+
+def erros_processo(processo):
+    """Bitmask com os erros de preenchimento de um processo (``None``: registro ilegível)."""
+    if not isinstance(processo, dict):
+        return ERRO_ILEGIVEL
+    erros = 0
+    if not numero_cnj_valido(processo.get("numeroProcesso")):
+        erros |= ERRO_NUMERO
+    if not _tem_codigo(processo.get("classe")):
+        erros |= ERRO_CLASSE
+    if not _tem_codigo(processo.get("assuntos")):
+        erros |= ERRO_ASSUNTO
+    if not _tem_codigo(processo.get("orgaoJulgador")):
+        erros |= ERRO_ORGAO
+    if not processo.get("dataAjuizamento"):
+        erros |= ERRO_AJUIZAMENTO
+    if not processo.get("movimentos"):
+        erros |= ERRO_MOVIMENTOS
+    if not _tem_codigo(processo.get("formato")):
+        erros |= ERRO_FORMATO
+    return erros
+
+
+def codigo_formato(processo):
+    formato = processo.get("formato")
+    try:
+        return int(formato.get("codigo")) if isinstance(formato, dict) else None
+    except (TypeError, ValueError):
+        return None
+
+
+def resumir_arquivo(caminho):
+    """Contadores por (tribunal, grau, mês) de um arquivo de exportação."""
+    contadores = defaultdict(lambda: [0, 0, 0, 0, 0, 0])
+    for processo in iterar_registros(caminho):
+        erros = erros_processo(processo)
+        processo = processo if isinstance(processo, dict) else {}
+        mes = ano_mes(processo.get("dataHoraUltimaAtualizacao")) or ano_mes(processo.get("dataAjuizamento"))
+        chave = (str(processo.get("tribunal") or ""), str(processo.get("grau") or ""), mes or "")
+        contador = contadores[chave]
+        formato = codigo_formato(processo)
+        contador[0] += 1
+        contador[1] += len(processo.get("movimentos") or ())
+        contador[2] += erros != 0
+        contador[3] += formato == FORMATO_ELETRONICO
+        contador[4] += formato == FORMATO_FISICO
+        contador[5] += (erros & ERRO_ILEGIVEL) != 0
+    return dict(contadores)
+
+
+def extrair_arquivo(caminho):
+    """Tabela compacta com uma linha por processo do arquivo.
+
+    Textos repetidos (tribunal, grau, mês, nome do órgão) ficam como
+    categorias; órgão, formato e erros são inteiros de tamanho fixo.
+    """
+    tribunais, graus, meses, orgaos, nomes, formatos, erros = [], [], [], [], [], [], []
+    for processo in iterar_registros(caminho):
+        erros.append(erros_processo(processo))
+        processo = processo if isinstance(processo, dict) else {}
+        orgao = processo.get("orgaoJulgador") if isinstance(processo.get("orgaoJulgador"), dict) else {}
+        try:
+            codigo_orgao = int(orgao.get("codigo"))
+        except (TypeError, ValueError):
+            codigo_orgao = -1
+        tribunais.append(str(processo.get("tribunal") or ""))
+        graus.append(str(processo.get("grau") or ""))
+        meses.append(ano_mes(processo.get("dataHoraUltimaAtualizacao")) or ano_mes(processo.get("dataAjuizamento")) or "")
+        orgaos.append(codigo_orgao)
+        nomes.append(str(orgao.get("nome") or ""))
+        formatos.append(codigo_formato(processo) or 0)
+    return pd.DataFrame({
+        "tribunal": pd.Categorical(tribunais),
+        "grau": pd.Categorical(graus),
+        "ano_mes": pd.Categorical(meses),
+        "orgao_codigo": np.array(orgaos, dtype=np.int64),
+        "orgao_nome": pd.Categorical(nomes),
+        "formato": np.array(formatos, dtype=np.int8),
+        "erros": np.array(erros, dtype=np.uint16),
+    })
+
+
+def executar_em_paralelo(funcao, caminhos, processos=None):
+    """Aplica ``funcao`` a cada arquivo, distribuindo os arquivos entre processos.
+
+    Os maiores arquivos são enviados primeiro para equilibrar a carga. Com
+    ``processos=1`` (ou um único arquivo) tudo roda no processo atual. Os
+    processos são iniciados por ``spawn``: o servidor tem outras threads
+    (sessões, tarefas em segundo plano) e um ``fork`` copiaria travas em uso.
+    """
+    caminhos = sorted(caminhos, key=os.path.getsize, reverse=True)
+    processos = processos or PROCESSOS or os.cpu_count() or 1
+    resultados = []
+
+    def informar():
+        # Dentro de uma tarefa em segundo plano: andamento e ponto de cancelamento
+        tarefas.informar(mensagem=f"DataJud: {len(resultados)} de {len(caminhos)} arquivos processados")
+
+    informar()
+    if processos == 1 or len(caminhos) <= 1:
+        for caminho in caminhos:
+            resultados.append(funcao(caminho))
+            informar()
+        return resultados
+    executor = ProcessPoolExecutor(
+        max_workers=min(processos, len(caminhos)), mp_context=multiprocessing.get_context("spawn")
+    )
+    try:
+        for resultado in executor.map(funcao, caminhos):
+            resultados.append(resultado)
+            informar()
+    except BaseException:
+        # Cancelamento (ou erro): não espera os arquivos em andamento nos processos
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
+    return resultados
+
+
+def resumir_exportacoes(caminhos, processos=None):
+    """Tabela-resumo mensal de um conjunto de arquivos, processados em paralelo."""
+    total = defaultdict(lambda: [0, 0, 0, 0, 0, 0])
+    for parcial in executar_em_paralelo(resumir_arquivo, caminhos, processos):
+        for chave, valores in parcial.items():
+            acumulado = total[chave]
+            for i, valor in enumerate(valores):
+                acumulado[i] += valor
+    linhas = [(*chave, *valores) for chave, valores in total.items()]
+    resumo = pd.DataFrame(linhas, columns=COLUNAS_RESUMO)
+    return resumo.sort_values(["tribunal", "grau", "ano_mes"], ignore_index=True)
+
+
+def carregar_resumo(diretorio, processos=None):
+    """Resumo mensal das exportações do diretório, reaproveitando o cache em Parquet."""
+    assinatura = assinatura_exportacoes(diretorio)
+    destino = os.path.join(fontes.DIRETORIO_CACHE, f"datajud-resumo-v{VERSAO_RESUMO}-{assinatura[:32]}.parquet")
+    if os.path.isfile(destino):
+        return pd.read_parquet(destino)
+    resumo = resumir_exportacoes(listar_exportacoes(diretorio), processos)
+    os.makedirs(fontes.DIRETORIO_CACHE, exist_ok=True)
+    temporario = fontes.caminho_temporario(destino)
+    resumo.to_parquet(temporario, index=False)
+    os.replace(temporario, destino)
+    return resumo
+
+
+def carregar_processos(diretorio, processos=None):
+    """Tabela por processo de todas as exportações do diretório, com cache em Parquet."""
+    assinatura = assinatura_exportacoes(diretorio)
+    destino = os.path.join(fontes.DIRETORIO_CACHE, f"datajud-processos-{assinatura[:32]}.parquet")
+    if os.path.isfile(destino):
+        # A tabela Arrow fica no armazém compartilhado, em uso enquanto o DataFrame do cálculo existir
+        referencia = armazem_dados.abrir(("datajud-processos", assinatura), lambda: pq.read_table(destino, memory_map=True))
+        return referencia.para_pandas()
+    partes = executar_em_paralelo(extrair_arquivo, listar_exportacoes(diretorio), processos)
+    tabela = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=COLUNAS_PROCESSOS)
+    # O concat converte em texto categorias que diferem entre arquivos
+    for coluna in ("tribunal", "grau", "ano_mes", "orgao_nome"):
+        tabela[coluna] = tabela[coluna].astype("category")
+    os.makedirs(fontes.DIRETORIO_CACHE, exist_ok=True)
+    temporario = fontes.caminho_temporario(destino)
+    tabela.to_parquet(temporario, index=False)
+    os.replace(temporario, destino)
+    return tabela
+
+
+def meses_janela(referencia, quantidade=12):
+    """Os ``quantidade`` meses ("AAAA-MM") terminados no mês da data de referência."""
+    ano, mes = referencia.year, referencia.month
+    meses = []
+    for _ in range(quantidade):
+        meses.append(f"{ano:04d}-{mes:02d}")
+        ano, mes = (ano - 1, 12) if mes == 1 else (ano, mes - 1)
+    return sorted(meses)
+
+
+def graus_esperados(tribunal):
+    """Graus com remessa mensal esperada do tribunal (sigla), ou ``None`` para um ramo desconhecido."""
+    if GRAUS_CONFIGURADOS:
+        return GRAUS_CONFIGURADOS
+    sigla = str(tribunal or "").upper()
+    ramos = [ramo for ramo in GRAUS_POR_RAMO if sigla.startswith(ramo)]
+    return GRAUS_POR_RAMO[max(ramos, key=len)] if ramos else None
+
+
+def cobertura_remessas(resumo, referencia, quantidade=12, graus=None):
+    """Pares (grau, mês) esperados na janela e os que não tiveram remessa ao DataJud.
+
+    Os graus esperados são ``graus`` ou, por padrão, os do ramo de cada tribunal
+    do resumo (:func:`graus_esperados`): um grau que não enviou nada na janela
+    conta como faltante em todos os meses. Só para tribunais de ramo
+    desconhecido valem os graus presentes nos dados.
+    """
+    meses = meses_janela(referencia, quantidade)
+    if graus is None:
+        graus = set()
+        for tribunal, linhas in resumo.groupby("tribunal", observed=True, sort=False)["grau"]:
+            graus.update(graus_esperados(tribunal) or (grau for grau in linhas.unique() if grau))
+    enviados = resumo[(resumo["processos"] > 0) & resumo["ano_mes"].isin(meses)]
+    pares_enviados = set(zip(enviados["grau"], enviados["ano_mes"]))
+    esperados = [(grau, mes) for grau in sorted(graus) for mes in meses]
+    faltantes = [par for par in esperados if par not in pares_enviados]
+    return esperados, faltantes
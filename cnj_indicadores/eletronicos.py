@@ -0,0 +1,80 @@
+"""Processos eletrônicos x físicos (Art. 12, IV) sobre o histórico particionado.
+
+A tabela de processos do DataJud é gravada em Parquet particionado por
+``ano=AAAA/mes=MM``. A consulta de um mês filtra pelas colunas de partição,
+de modo que apenas os arquivos do período de referência são lidos, e só a
+coluna ``formato`` é materializada.
+"""
+
+import os
+import shutil
+
+from cnj_indicadores import datajud, fontes
+from cnj_indicadores.perfil import modulo_tardio
+
+np = modulo_tardio("numpy")
+pa = modulo_tardio("pyarrow")
+ds = modulo_tardio("pyarrow.dataset")
+
+# Cada conjunto de exportações tem o seu histórico, identificado pela assinatura
+DIRETORIO_HISTORICO = os.environ.get("CNJ_HISTORICO_DIR", os.path.join(fontes.DIRETORIO_CACHE, "historico_datajud"))
+
+_ARQUIVO_ASSINATURA = "_assinatura"
+
+
+def _particionamento():
+    return ds.partitioning(pa.schema([("ano", pa.int16()), ("mes", pa.int8())]), flavor="hive")
+
+
+def gravar_historico(processos, destino):
+    """Grava a tabela de processos particionada por ano e mês de referência."""
+    meses = processos["ano_mes"].astype(str)
+    validos = meses.str.len() == 7
+    tabela = processos.loc[validos].drop(columns=["ano_mes"]).reset_index(drop=True)
+    tabela["ano"] = meses[validos].str[:4].astype(np.int16).to_numpy()
+    tabela["mes"] = meses[validos].str[5:7].astype(np.int8).to_numpy()
+    ds.write_dataset(
+        pa.Table.from_pandas(tabela, preserve_index=False),
+        destino,
+        format="parquet",
+        partitioning=_particionamento(),
+        existing_data_behavior="delete_matching",
+    )
+
+
+def atualizar_historico(diretorio_exportacoes, raiz=None):
+    """Garante o histórico particionado das exportações atuais e retorna seu caminho."""
+    assinatura = datajud.assinatura_exportacoes(diretorio_exportacoes)
+    destino = os.path.join(raiz or DIRETORIO_HISTORICO, assinatura[:32])
+    # O arquivo de assinatura é gravado por último: sua presença indica histórico completo
+    if os.path.isfile(os.path.join(destino, _ARQUIVO_ASSINATURA)):
+        return destino
+
+    temporario = fontes.caminho_temporario(destino)
+    gravar_historico(datajud.carregar_processos(diretorio_exportacoes), temporario)
+    # Sem processos com mês válido o write_dataset não cria o diretório
+    os.makedirs(temporario, exist_ok=True)
+    with open(os.path.join(temporario, _ARQUIVO_ASSINATURA), "w", encoding="utf-8") as arquivo:
+        arquivo.write(assinatura)
+    try:
+        os.replace(temporario, destino)
+    except OSError:
+        # Outro processo publicou o mesmo histórico primeiro
+        shutil.rmtree(temporario, ignore_errors=True)
+    return destino
+
+
+def contar_formatos(historico, data_referencia):
+    """Quantidade de processos eletrônicos, físicos e sem formato no mês de referência."""
+    dataset = ds.dataset(historico, format="parquet", partitioning=_particionamento(), exclude_invalid_files=True)
+    if "formato" not in dataset.schema.names:
+        # Histórico vazio (exportações sem processos com mês válido)
+        return {"eletronicos": 0, "fisicos": 0, "sem_formato": 0}
+    filtro = (ds.field("ano") == data_referencia.year) & (ds.field("mes") == data_referencia.month)
+    formatos = dataset.to_table(columns=["formato"], filter=filtro).column("formato").to_numpy()
+    contagem = np.bincount(formatos.astype(np.int64).clip(0, 3), minlength=4)
+    return {
+        "eletronicos": int(contagem[datajud.FORMATO_ELETRONICO]),
+        "fisicos": int(contagem[datajud.FORMATO_FISICO]),
+        "sem_formato": int(len(formatos) - contagem[datajud.FORMATO_ELETRONICO] - contagem[datajud.FORMATO_FISICO]),
+    }
@@ -0,0 +1,191 @@
+"""Comparação entre instantâneos mensais das planilhas MPM.
+
+Cada instantâneo é indexado pela chave do registro (matrícula ou CPF) e guarda
+um hash por campo. A comparação entre dois meses é uma junção por hash
+(``pd.Index.get_indexer``), linear no número de registros, e reaproveita as
+máscaras de inconsistência já calculadas para cada arquivo.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from cnj_indicadores import calculo, inconsistencias
+from cnj_indicadores.cache import cache_indicadores, chave_indicador
+from cnj_indicadores.fontes import carregar_planilha, hash_arquivo
+from cnj_indicadores.perfil import modulo_tardio
+
+np = modulo_tardio("numpy")
+pd = modulo_tardio("pandas")
+
+def _texto_hash(valor):
+    # 12.0 e "12" devem ter o mesmo hash, independentemente do tipo inferido no mês
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip()
+
+
+def hash_coluna(serie):
+    """Hash (uint64) do texto de cada valor, calculado sobre os valores distintos, e máscara dos nulos.
+
+    O hash dos nulos é 0, mas qualquer uint64 pode sair de ``hash_array``: a
+    comparação distingue os nulos pela máscara, não pelo hash.
+    """
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=True)
+    hashes = pd.util.hash_array(np.array([_texto_hash(v) for v in unicos], dtype=object))
+    return np.append(hashes, np.uint64(0))[codigos], codigos < 0
+
+
+@dataclass
+class Instantaneo:
+    """Registros ativos de um mês: chaves, hashes e nulos por campo e inconsistências."""
+
+    chaves: np.ndarray
+    hashes: np.ndarray
+    nulos: np.ndarray
+    resultado: inconsistencias.ResultadoInconsistencias
+
+    @property
+    def campos(self):
+        return self.resultado.campos
+
+    def __len__(self):
+        return len(self.chaves)
+
+
+def indexar(df, resultado=None):
+    """Monta o instantâneo dos registros de ``df`` (já filtrados para os ativos)."""
+    chave = inconsistencias.coluna_chave(df)
+    if chave is None:
+        raise ValueError(f"Planilha sem coluna de identificação ({', '.join(inconsistencias.COLUNAS_CHAVE)}).")
+    if resultado is None:
+        resultado = inconsistencias.detectar_inconsistencias(df)
+    hashes = np.empty((len(df), len(resultado.campos)), dtype=np.uint64)
+    nulos = np.empty((len(df), len(resultado.campos)), dtype=bool)
+    for i, campo in enumerate(resultado.campos):
+        hashes[:, i], nulos[:, i] = hash_coluna(df[campo])
+    chaves = np.array([_texto_hash(v) for v in df[chave].to_numpy()], dtype=object)
+    return Instantaneo(chaves=chaves, hashes=hashes, nulos=nulos, resultado=resultado)
+
+
+def instantaneo_fonte(caminho):
+    """Instantâneo de um arquivo MPM, calculado uma vez por conteúdo de arquivo."""
+    digest = hash_arquivo(caminho)
+    return cache_indicadores.obter_ou_calcular(
+        chave_indicador(digest, "instantaneo"),
+        lambda: indexar(inconsistencias.filtrar_ativos(carregar_planilha(caminho)), calculo.analisar_fonte(caminho)),
+    )
+
+
+@dataclass
+class Delta:
+    """Diferenças entre dois instantâneos (``anterior`` -> ``atual``)."""
+
+    incluidos: np.ndarray
+    excluidos: np.ndarray
+    alterados: np.ndarray
+    corrigidos: pd.Series
+    quebrados: pd.Series
+    inconsistentes_anterior: int
+    inconsistentes_atual: int
+    total_anterior: int
+    total_atual: int
+
+    @property
+    def resumo(self):
+        return {
+            "incluidos": len(self.incluidos),
+            "excluidos": len(self.excluidos),
+            "alterados": len(self.alterados),
+            "campos_corrigidos": int(self.corrigidos.sum()),
+            "campos_quebrados": int(self.quebrados.sum()),
+        }
+
+    def tabela_campos(self):
+        """Campos corrigidos e quebrados entre os meses, por campo."""
+        tabela = pd.DataFrame({"corrigidos": self.corrigidos, "quebrados": self.quebrados})
+        tabela["saldo"] = tabela["corrigidos"] - tabela["quebrados"]
+        return tabela[(tabela["corrigidos"] > 0) | (tabela["quebrados"] > 0)].sort_values("saldo")
+
+
+def _posicoes_unicas(chaves):
+    # Chaves repetidas no mesmo mês: vale a primeira ocorrência
+    indice = pd.Index(chaves)
+    unicas = ~indice.duplicated()
+    return indice[unicas], np.flatnonzero(unicas)
+
+
+def parear(anterior, atual):
+    """Posições ``(no_anterior, no_atual)`` dos registros presentes nos dois meses."""
+    indice_anterior, posicoes_anterior = _posicoes_unicas(anterior.chaves)
+    indice_atual, posicoes_atual = _posicoes_unicas(atual.chaves)
+    encontrados = indice_anterior.get_indexer(indice_atual)
+    pareados = encontrados >= 0
+    return posicoes_anterior[encontrados[pareados]], posicoes_atual[pareados]
+
+
+def comparar(anterior, atual):
+    """Registros incluídos, excluídos e alterados, e campos corrigidos ou quebrados."""
+    no_anterior, no_atual = parear(anterior, atual)
+
+    presentes_anterior = np.zeros(len(anterior), dtype=bool)
+    presentes_anterior[no_anterior] = True
+    presentes_atual = np.zeros(len(atual), dtype=bool)
+    presentes_atual[no_atual] = True
+
+    # Só os campos verificados nos dois meses são comparáveis
+    campos = [campo for campo in atual.campos if campo in anterior.campos]
+    colunas_anterior = [anterior.campos.index(campo) for campo in campos]
+    colunas_atual = [atual.campos.index(campo) for campo in campos]
+
+    hashes_anterior = anterior.hashes[no_anterior][:, colunas_anterior]
+    hashes_atual = atual.hashes[no_atual][:, colunas_atual]
+    nulos_anterior = anterior.nulos[no_anterior][:, colunas_anterior]
+    nulos_atual = atual.nulos[no_atual][:, colunas_atual]
+    alterados = ((hashes_anterior != hashes_atual) | (nulos_anterior != nulos_atual)).any(axis=1)
+
+    mascara_anterior = anterior.resultado.linhas(no_anterior)[:, colunas_anterior]
+    mascara_atual = atual.resultado.linhas(no_atual)[:, colunas_atual]
+
+    return Delta(
+        incluidos=atual.chaves[~presentes_atual],
+        excluidos=anterior.chaves[~presentes_anterior],
+        alterados=atual.chaves[no_atual[alterados]],
+        corrigidos=pd.Series((mascara_anterior & ~mascara_atual).sum(axis=0), index=campos, dtype="int64"),
+        quebrados=pd.Series((~mascara_anterior & mascara_atual).sum(axis=0), index=campos, dtype="int64"),
+        inconsistentes_anterior=anterior.resultado.inconsistentes,
+        inconsistentes_atual=atual.resultado.inconsistentes,
+        total_anterior=len(anterior),
+        total_atual=len(atual),
+    )
+
+
+def comparar_fontes(caminho_anterior, caminho_atual):
+    """Delta entre dois arquivos MPM, memoizado pelo conteúdo dos dois arquivos."""
+    chave = chave_indicador((hash_arquivo(caminho_anterior), hash_arquivo(caminho_atual)), "delta")
+    return cache_indicadores.obter_ou_calcular(
+        chave,
+        lambda: comparar(instantaneo_fonte(caminho_anterior), instantaneo_fonte(caminho_atual)),
+    )
+
+
+def tendencia(caminhos):
+    """Totais e inconsistências de uma sequência de arquivos (do mais antigo ao mais recente).
+
+    Cada mês é comparado ao anterior; as colunas de delta ficam vazias no primeiro.
+    """
+    linhas = []
+    anterior = None
+    for caminho in caminhos:
+        atual = instantaneo_fonte(caminho)
+        linha = {
+            "fonte": caminho,
+            "total": len(atual),
+            "inconsistentes": atual.resultado.inconsistentes,
+            "percentual": atual.resultado.inconsistentes / len(atual) * 100 if len(atual) else 0.0,
+        }
+        if anterior is not None:
+            linha.update(comparar_fontes(anterior, caminho).resumo)
+        linhas.append(linha)
+        anterior = caminho
+    return pd.DataFrame(linhas)
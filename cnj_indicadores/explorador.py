@@ -0,0 +1,118 @@
+"""Consulta paginada dos registros inconsistentes de uma planilha MPM.
+
+Os filtros (campo, categoria de vínculo, lotação) são aplicados sobre as
+máscaras já calculadas e sobre códigos inteiros, sem materializar a planilha.
+Só as linhas da página pedida são lidas do cache em Parquet.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from cnj_indicadores import calculo, categorias, inconsistencias
+from cnj_indicadores.cache import cache_indicadores, chave_indicador
+from cnj_indicadores.fontes import abrir_tabela, hash_arquivo
+from cnj_indicadores.perfil import modulo_tardio
+
+np = modulo_tardio("numpy")
+pd = modulo_tardio("pandas")
+pa = modulo_tardio("pyarrow")
+
+COLUNA_LOTACAO = "lotacao"
+COLUNA_CAMPOS = "campos_inconsistentes"
+COLUNA_CATEGORIA = "categoria"
+
+TAMANHO_PAGINA = 50
+
+
+@dataclass
+class IndiceRegistros:
+    """Dados para filtrar os registros ativos de uma planilha sem relê-la.
+
+    ``linhas_planilha`` leva cada registro ativo (na ordem de ``analise``) à
+    sua linha na planilha; ``categoria`` e ``lotacao`` são códigos inteiros
+    dos rótulos em ``categorias.CATEGORIAS`` e ``lotacoes``.
+    """
+
+    analise: inconsistencias.ResultadoInconsistencias
+    linhas_planilha: np.ndarray
+    categoria: np.ndarray
+    lotacao: np.ndarray
+    lotacoes: list
+
+
+def _colunas(tabela, nomes):
+    return tabela.select([nome for nome in nomes if nome in tabela.column_names]).to_pandas()
+
+
+def indexar_fonte(caminho):
+    """Índice dos registros ativos da planilha, calculado uma vez por conteúdo de arquivo."""
+    def montar():
+        with abrir_tabela(caminho) as referencia:
+            situacao = _colunas(referencia.tabela, [inconsistencias.COLUNA_SITUACAO])
+            apoio = _colunas(referencia.tabela, (COLUNA_LOTACAO,))
+        linhas_planilha = np.flatnonzero(inconsistencias.mascara_ativos(situacao))
+
+        apoio = apoio.iloc[linhas_planilha]
+        if COLUNA_LOTACAO in apoio.columns:
+            codigos, unicos = pd.factorize(apoio[COLUNA_LOTACAO], sort=True)
+            lotacoes = [str(valor) for valor in unicos]
+        else:
+            codigos, lotacoes = np.full(len(linhas_planilha), -1), []
+        analise = calculo.analisar_fonte(caminho)
+        # Sem coluna de vínculo todos os registros ficam em "outros"
+        categoria = analise.categoria
+        if categoria is None:
+            categoria = np.full(analise.total, list(categorias.CATEGORIAS).index("outros"), dtype=np.int8)
+        return IndiceRegistros(
+            analise=analise,
+            linhas_planilha=linhas_planilha,
+            categoria=categoria,
+            lotacao=np.asarray(codigos),
+            lotacoes=lotacoes,
+        )
+
+    return cache_indicadores.obter_ou_calcular(chave_indicador(hash_arquivo(caminho), "explorador"), montar)
+
+
+def filtrar(indice, campos=None, categorias_selecionadas=None, lotacoes=None):
+    """Posições (nos registros ativos) dos registros inconsistentes que atendem aos filtros.
+
+    ``campos`` restringe aos registros com inconsistência em algum dos campos;
+    filtros vazios ou ``None`` não restringem.
+    """
+    analise = indice.analise
+    if campos:
+        colunas = [analise.campos.index(campo) for campo in campos if campo in analise.campos]
+        selecionados = analise.mascara_campos(colunas)
+    else:
+        selecionados = analise.mascara_linhas.copy()
+    if categorias_selecionadas:
+        codigos = [list(categorias.CATEGORIAS).index(categoria) for categoria in categorias_selecionadas]
+        selecionados &= np.isin(indice.categoria, codigos)
+    if lotacoes:
+        codigos = [indice.lotacoes.index(lotacao) for lotacao in lotacoes if lotacao in indice.lotacoes]
+        selecionados &= np.isin(indice.lotacao, codigos)
+    return np.flatnonzero(selecionados)
+
+
+def detalhar(caminho, indice, posicoes):
+    """Registros da planilha nas ``posicoes`` (ativos), com a categoria e os campos inconsistentes."""
+    with abrir_tabela(caminho) as referencia:
+        registros = referencia.tabela.take(pa.array(indice.linhas_planilha[posicoes], type=pa.int64())).to_pandas()
+    campos = np.array(indice.analise.campos, dtype=object)
+    mascara = indice.analise.linhas(posicoes)
+    rotulos = np.array(list(categorias.CATEGORIAS.values()), dtype=object)
+    registros.insert(0, COLUNA_CATEGORIA, rotulos[indice.categoria[posicoes]])
+    registros.insert(0, COLUNA_CAMPOS, [", ".join(campos[linha]) for linha in mascara])
+    return registros
+
+
+def total_paginas(quantidade, tamanho=TAMANHO_PAGINA):
+    return max((quantidade + tamanho - 1) // tamanho, 1)
+
+
+def pagina(caminho, indice, posicoes, numero, tamanho=TAMANHO_PAGINA):
+    """Registros da página ``numero`` (a partir de 1) das ``posicoes`` filtradas."""
+    inicio = (numero - 1) * tamanho
+    return detalhar(caminho, indice, posicoes[inicio:inicio + tamanho])
@@ -0,0 +1,178 @@
+"""Relatórios para download: resumo dos indicadores e registros inconsistentes.
+
+O detalhe por registro é lido da planilha em cache (Parquet com memory map)
+em blocos e gravado por escritores de memória constante: xlsx em modo
+``write_only``, CSV bloco a bloco e Parquet um grupo de linhas por bloco.
+CSV e Parquet vão em um zip com um arquivo por tabela. O relatório é gravado
+em um arquivo temporário, sem montar as tabelas inteiras na memória. O
+Streamlit não serve downloads a partir de arquivos: o ``st.download_button``
+guarda o conteúdo em memória no armazenamento de mídia do servidor, por isso
+:func:`conteudo_relatorio` lê o arquivo pronto (já compactado) e o apaga, e o
+pico de memória fica no tamanho do relatório final.
+"""
+
+import io
+import tempfile
+import zipfile
+
+from cnj_indicadores import registro
+from cnj_indicadores.perfil import modulo_tardio
+
+np = modulo_tardio("numpy")
+pd = modulo_tardio("pandas")
+pa = modulo_tardio("pyarrow")
+pq = modulo_tardio("pyarrow.parquet")
+explorador = modulo_tardio("cnj_indicadores.explorador")
+
+TAMANHO_BLOCO = 50_000
+
+# Formato -> (extensão do arquivo, tipo MIME)
+FORMATOS = {
+    "xlsx": (".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": (".zip", "application/zip"),
+    "parquet": (".zip", "application/zip"),
+}
+
+# Entradas com detalhe por registro
+ENTRADAS_DETALHE = ("magistrados", "servidores")
+
+
+def tabela_resumo(resultados):
+    """Uma linha por indicador calculado (``resultados`` indexado por ``ref``)."""
+    linhas = []
+    for ref, resultado in resultados.items():
+        linhas.append({
+            "Referência": ref,
+            "Indicador": resultado.get("nome") or registro.obter(ref).nome,
+            "Total": resultado.get("total"),
+            "Inconsistências": resultado.get("inconsistentes"),
+            "Percentual": round(resultado["percentual"], 4),
+            "Pontos": resultado["pontos"],
+            "Pontos máximos": resultado["pontos_max"],
+            "Aprovado": bool(resultado["aprovado"]),
+        })
+    tabela = pd.DataFrame(linhas, columns=[
+        "Referência", "Indicador", "Total", "Inconsistências", "Percentual", "Pontos", "Pontos máximos", "Aprovado",
+    ])
+    return tabela.astype({"Total": "Int64", "Inconsistências": "Int64"})
+
+
+def fontes_detalhe(resultados, caminhos):
+    """Planilhas usadas pelos indicadores calculados, por entrada (magistrados/servidores)."""
+    selecionadas = {}
+    for ref in resultados:
+        for entrada in registro.obter(ref).entradas:
+            if entrada in ENTRADAS_DETALHE and caminhos.get(entrada):
+                selecionadas[entrada] = caminhos[entrada]
+    return selecionadas
+
+
+def blocos_detalhe(caminho, tamanho_bloco=TAMANHO_BLOCO):
+    """Registros ativos inconsistentes da planilha, em blocos, com os campos afetados.
+
+    Gera ao menos um bloco (vazio, só com as colunas) para que o arquivo
+    exportado tenha cabeçalho mesmo sem inconsistências.
+    """
+    indice = explorador.indexar_fonte(caminho)
+    posicoes = explorador.filtrar(indice)
+    for inicio in range(0, max(len(posicoes), 1), tamanho_bloco):
+        yield explorador.detalhar(caminho, indice, posicoes[inicio:inicio + tamanho_bloco])
+
+
+def _celula(valor):
+    if valor is None or valor is pd.NA or valor is pd.NaT:
+        return None
+    if isinstance(valor, float) and np.isnan(valor):
+        return None
+    if isinstance(valor, np.generic):
+        return valor.item()
+    return valor
+
+
+def escrever_xlsx(arquivo, tabelas):
+    """Uma aba por tabela; ``tabelas`` é uma lista de ``(nome, blocos)``."""
+    from openpyxl import Workbook
+
+    livro = Workbook(write_only=True)
+    for nome, blocos in tabelas:
+        aba = livro.create_sheet(title=nome[:31])
+        cabecalho = False
+        for bloco in blocos:
+            if not cabecalho:
+                aba.append([str(coluna) for coluna in bloco.columns])
+                cabecalho = True
+            for linha in bloco.itertuples(index=False, name=None):
+                aba.append([_celula(valor) for valor in linha])
+    livro.save(arquivo)
+
+
+def escrever_csv(arquivo, tabelas):
+    """Zip com um CSV por tabela (separador ``;``, UTF-8 com BOM para o Excel)."""
+    with zipfile.ZipFile(arquivo, "w", compression=zipfile.ZIP_DEFLATED) as pacote:
+        for nome, blocos in tabelas:
+            with pacote.open(f"{nome}.csv", "w", force_zip64=True) as bruto:
+                texto = io.TextIOWrapper(bruto, encoding="utf-8-sig", newline="")
+                for i, bloco in enumerate(blocos):
+                    bloco.to_csv(texto, sep=";", index=False, header=i == 0)
+                texto.flush()
+                texto.detach()
+
+
+def escrever_parquet(arquivo, tabelas):
+    """Zip com um Parquet por tabela, um grupo de linhas por bloco."""
+    with zipfile.ZipFile(arquivo, "w", compression=zipfile.ZIP_STORED) as pacote:
+        for nome, blocos in tabelas:
+            with pacote.open(f"{nome}.parquet", "w", force_zip64=True) as bruto:
+                escritor = None
+                for bloco in blocos:
+                    if escritor is None:
+                        esquema = pa.Schema.from_pandas(bloco, preserve_index=False)
+                        escritor = pq.ParquetWriter(bruto, esquema)
+                    escritor.write_table(pa.Table.from_pandas(bloco, schema=esquema, preserve_index=False))
+                if escritor is not None:
+                    escritor.close()
+
+
+ESCRITORES = {
+    "xlsx": escrever_xlsx,
+    "csv": escrever_csv,
+    "parquet": escrever_parquet,
+}
+
+
+def gerar_relatorio(resultados, caminhos, formato="xlsx", detalhe=True):
+    """Grava o relatório em um arquivo temporário e o devolve aberto, posicionado no início.
+
+    O arquivo é apagado ao ser fechado. ``resultados`` é copiado na chamada:
+    as interfaces repassam o dicionário da sessão para exportar o estado do
+    momento do download.
+    """
+    resultados = dict(resultados)
+    tabelas = [("resumo", [tabela_resumo(resultados)])]
+    if detalhe:
+        for entrada, caminho in fontes_detalhe(resultados, caminhos).items():
+            tabelas.append((f"inconsistencias_{entrada}", blocos_detalhe(caminho)))
+
+    arquivo = tempfile.TemporaryFile(suffix=FORMATOS[formato][0])
+    try:
+        ESCRITORES[formato](arquivo, tabelas)
+    except BaseException:
+        arquivo.close()
+        raise
+    arquivo.seek(0)
+    return arquivo
+
+
+def conteudo_relatorio(resultados, caminhos, formato="xlsx", detalhe=True):
+    """Bytes do relatório de :func:`gerar_relatorio`, para o ``st.download_button``.
+
+    O download só aceita bytes, texto ou alguns tipos de arquivo (não o
+    arquivo temporário), e o arquivo é apagado assim que lido.
+    """
+    with gerar_relatorio(resultados, caminhos, formato, detalhe) as arquivo:
+        return arquivo.read()
+
+
+def nome_relatorio(formato, data_referencia=None):
+    sufixo = f"_{data_referencia:%Y_%m}" if data_referencia else ""
+    return f"relatorio_indicadores_cnj{sufixo}{FORMATOS[formato][0]}"
@@ -0,0 +1,325 @@
+"""Leitura das planilhas MPM com cache colunar em Parquet.
+
+Cada aba de ``MPM_Magistrados_AAAA_MM.xlsx`` / ``MPM_Servidores_AAAA_MM.xlsx``
+é convertida uma única vez para Parquet, em um arquivo identificado pelo hash
+do conteúdo da planilha. As execuções seguintes leem o Parquet com memory map,
+sem passar pelo openpyxl.
+"""
+
+import calendar
+import hashlib
+import json
+import os
+import re
+import unicodedata
+import uuid
+from datetime import date, datetime
+
+from cnj_indicadores.armazem import armazem_dados
+from cnj_indicadores.perfil import modulo_tardio
+
+pd = modulo_tardio("pandas")
+pa = modulo_tardio("pyarrow")
+pq = modulo_tardio("pyarrow.parquet")
+
+# Importado ao tipar colunas de datas (o módulo de inconsistências importa este)
+inconsistencias = modulo_tardio("cnj_indicadores.inconsistencias")
+
+# Diretórios padrão (podem ser trocados por variáveis de ambiente)
+DIRETORIO_DADOS = os.environ.get("CNJ_DADOS_DIR", "dados")
+DIRETORIO_CACHE = os.environ.get("CNJ_CACHE_DIR", os.path.join(DIRETORIO_DADOS, ".cache"))
+
+# Versão do formato do cache: mudar quando a conversão mudar
+VERSAO_CACHE = 3
+
+_DATA_ISO = re.compile(r"\d{4}-\d{2}-\d{2}(?: 00:00:00)?")
+
+PADRAO_FONTE = re.compile(r"^MPM_(Magistrados|Servidores)_(\d{4})_(\d{2})\.(xlsx|csv)$", re.IGNORECASE)
+
+_TAMANHO_BLOCO = 1024 * 1024
+
+
+def normalizar_texto(valor):
+    """Remove acentos, espaços extras e caixa de um texto."""
+    texto = unicodedata.normalize("NFKD", str(valor))
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(texto.split()).casefold()
+
+
+def normalizar_coluna(nome):
+    """Converte o cabeçalho da planilha em um nome de coluna estável (``Lotação`` -> ``lotacao``)."""
+    return re.sub(r"[^0-9a-z]+", "_", normalizar_texto(nome)).strip("_")
+
+
+def referencia_fonte(nome_arquivo):
+    """Retorna ``(tipo, ano, mes)`` a partir do nome do arquivo MPM, ou ``None``."""
+    encontrado = PADRAO_FONTE.match(os.path.basename(nome_arquivo))
+    if not encontrado:
+        return None
+    return encontrado.group(1).lower(), int(encontrado.group(2)), int(encontrado.group(3))
+
+
+def data_referencia(nome_arquivo):
+    """Último dia do mês de referência do arquivo (ex.: 2025_07 -> 31/07/2025)."""
+    referencia = referencia_fonte(nome_arquivo)
+    if referencia is None:
+        return None
+    _, ano, mes = referencia
+    return date(ano, mes, calendar.monthrange(ano, mes)[1])
+
+
+def listar_fontes(tipo, diretorio=None):
+    """Lista os arquivos MPM de um tipo ("Magistrados" ou "Servidores"), do mais recente ao mais antigo."""
+    diretorio = diretorio or DIRETORIO_DADOS
+    if not os.path.isdir(diretorio):
+        return []
+    encontrados = []
+    for nome in os.listdir(diretorio):
+        referencia = referencia_fonte(nome)
+        if referencia and referencia[0] == tipo.lower():
+            encontrados.append((referencia[1], referencia[2], nome))
+    return [nome for _, _, nome in sorted(encontrados, reverse=True)]
+
+
+def caminho_fonte(nome_arquivo, diretorio=None):
+    """Caminho completo de uma fonte, ou ``None`` se o arquivo não existe."""
+    caminho = os.path.join(diretorio or DIRETORIO_DADOS, nome_arquivo)
+    return caminho if os.path.isfile(caminho) else None
+
+
+def caminho_temporario(destino):
+    """Nome temporário exclusivo para gravar ``destino`` e depois renomeá-lo com ``os.replace``.
+
+    Evita que processos ou sessões gravando o mesmo arquivo usem o mesmo temporário.
+    """
+    return f"{destino}.{uuid.uuid4().hex[:12]}.tmp"
+
+
+def _caminho_registro(chave):
+    nome = hashlib.sha256(chave.encode()).hexdigest()[:32]
+    return os.path.join(DIRETORIO_CACHE, "indice", f"{nome}.json")
+
+
+def _ler_registro(chave):
+    """Valor gravado para ``chave`` no índice do cache, ou ``None``."""
+    try:
+        with open(_caminho_registro(chave), encoding="utf-8") as arquivo:
+            registro = json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+    return registro.get("valor") if isinstance(registro, dict) and registro.get("chave") == chave else None
+
+
+def _gravar_registro(chave, valor):
+    """Grava o valor de ``chave`` no índice do cache.
+
+    Cada chave tem o seu arquivo, substituído por inteiro com ``os.replace``:
+    processos e sessões que registram arquivos diferentes não disputam um
+    índice comum, e quem lê nunca encontra um registro pela metade.
+    """
+    destino = _caminho_registro(chave)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temporario = caminho_temporario(destino)
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump({"chave": chave, "valor": valor}, arquivo)
+    os.replace(temporario, destino)
+
+
+def hash_arquivo(caminho):
+    """SHA-256 do conteúdo do arquivo.
+
+    O resultado fica registrado no índice do cache junto com tamanho e data de
+    modificação, para que o arquivo não precise ser relido a cada execução.
+    """
+    caminho = os.path.abspath(caminho)
+    estado = os.stat(caminho)
+    assinatura = [estado.st_size, estado.st_mtime_ns]
+
+    registro = _ler_registro(caminho)
+    if registro and registro["assinatura"] == assinatura:
+        return registro["hash"]
+
+    digest = hashlib.sha256()
+    with open(caminho, "rb") as arquivo:
+        for bloco in iter(lambda: arquivo.read(_TAMANHO_BLOCO), b""):
+            digest.update(bloco)
+    resultado = digest.hexdigest()
+
+    _gravar_registro(caminho, {"assinatura": assinatura, "hash": resultado})
+    return resultado
+
+
+def _caminho_cache(digest, aba):
+    nome_aba = normalizar_coluna(aba) or "aba"
+    return os.path.join(DIRETORIO_CACHE, f"{digest[:32]}-v{VERSAO_CACHE}-{nome_aba}.parquet")
+
+
+def _tipar(df):
+    """Normaliza cabeçalhos e define tipos estáveis para gravação em Parquet."""
+    df = df.copy()
+    df.columns = [normalizar_coluna(coluna) or f"coluna_{i}" for i, coluna in enumerate(df.columns)]
+    for coluna in df.columns:
+        serie = df[coluna]
+        if serie.dtype == object:
+            datas = _datas(serie)
+            if datas is not None:
+                df[coluna] = datas
+                continue
+            # Colunas mistas (números e textos) viram texto para não perder "não informado"
+            df[coluna] = serie.map(lambda v: v if v is None or isinstance(v, str) else str(v), na_action="ignore").astype("string")
+    return compactar(df)
+
+
+def _datas(serie):
+    """Coluna de datas (``date32``) se os valores são datas sem hora ou marcas de "não informado".
+
+    Aceita datas lidas do Excel e textos no formato ISO (``2025-07-31``, como
+    os CSV as trazem). As marcas viram nulos, que a verificação de
+    inconsistências trata da mesma forma; com qualquer outro texto a coluna
+    continua como texto.
+    """
+    eh_data = serie.map(_eh_data, na_action="ignore").fillna(False).astype(bool)
+    if not eh_data.any():
+        return None
+    outros = serie[~eh_data].dropna().unique()
+    if any(normalizar_texto(valor) not in inconsistencias.VALORES_NAO_INFORMADO for valor in outros):
+        return None
+    datas = pd.to_datetime(serie.where(eh_data), errors="coerce")
+    validas = datas[eh_data]
+    if validas.isna().any() or (validas.dt.normalize() != validas).any():
+        return None
+    return datas.astype(pd.ArrowDtype(pa.date32()))
+
+
+def _eh_data(valor):
+    if isinstance(valor, str):
+        return _DATA_ISO.fullmatch(valor) is not None
+    return isinstance(valor, (date, datetime))
+
+
+def _inteiros(serie):
+    # Sem negativos, o tipo sem sinal comporta o dobro (matrículas até 65535 em 2 bytes)
+    return pd.to_numeric(serie, downcast="unsigned" if (serie >= 0).all() else "integer")
+
+
+def _eh_inteiro(serie):
+    # Só números escritos na forma canônica ("007" e "1.0" continuam texto), sem nulos
+    return not serie.isna().any() and bool(serie.str.fullmatch(r"-?[1-9][0-9]{0,17}|0").all())
+
+
+def _tamanho_textos(serie):
+    # Bytes de uma coluna de texto em Arrow: conteúdo mais um offset de 4 bytes por valor
+    return int(serie.str.len().fillna(0).sum()) + 4 * len(serie)
+
+
+def _compactar_textos(serie):
+    if _eh_inteiro(serie):
+        return _inteiros(serie.astype("int64"))
+    datas = _datas(serie)
+    if datas is not None:
+        return datas
+    distintos = serie.dropna().drop_duplicates()
+    bytes_codigo = pd.to_numeric(pd.Series([len(distintos)]), downcast="integer").dtype.itemsize
+    if bytes_codigo * len(serie) + _tamanho_textos(distintos) < _tamanho_textos(serie):
+        return serie.astype("category")
+    return serie.astype(pd.ArrowDtype(pa.string()))
+
+
+def compactar(df):
+    """Tipos compactos, todos representáveis em Arrow sem conversão ao ler o Parquet.
+
+    - inteiros, e textos que só contêm inteiros, no menor tipo que os comporta;
+    - datas sem hora como ``date32`` (4 bytes por registro);
+    - textos como dicionário (categóricas, códigos de 1 a 4 bytes) quando os
+      códigos mais os valores distintos ocupam menos que a coluna, o que vale
+      também para colunas de alta cardinalidade com valores longos;
+    - os demais textos como ``string`` do Arrow, com offsets de 32 bits.
+
+    As categóricas são gravadas no Parquet como colunas de dicionário e voltam
+    como categóricas ao serem lidas (ver :func:`carregar_planilha`).
+    """
+    df = df.copy()
+    for coluna in df.columns:
+        serie = df[coluna]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            continue
+        if pd.api.types.is_integer_dtype(serie.dtype):
+            df[coluna] = _inteiros(serie)
+        elif pd.api.types.is_datetime64_dtype(serie.dtype):
+            if (serie.dropna().dt.normalize() == serie.dropna()).all():
+                df[coluna] = serie.astype(pd.ArrowDtype(pa.date32()))
+        elif pd.api.types.is_string_dtype(serie.dtype) and len(serie):
+            df[coluna] = _compactar_textos(serie)
+    return df
+
+
+def uso_memoria(df):
+    """Memória ocupada por ``df`` em bytes, incluindo o conteúdo dos textos."""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def _gravar_parquet(df, destino):
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temporario = caminho_temporario(destino)
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), temporario)
+    os.replace(temporario, destino)
+
+
+def _converter(caminho, digest):
+    """Lê todas as abas do arquivo uma vez e grava cada uma no cache."""
+    if caminho.lower().endswith(".csv"):
+        abas = {"dados": pd.read_csv(caminho, sep=None, engine="python", dtype=str, encoding="utf-8-sig")}
+    else:
+        abas = pd.read_excel(caminho, sheet_name=None, engine="openpyxl")
+
+    nomes = []
+    for nome, df in abas.items():
+        _gravar_parquet(_tipar(df), _caminho_cache(digest, nome))
+        nomes.append(str(nome))
+
+    _gravar_registro(f"abas:{digest}", nomes)
+    return nomes
+
+
+def abas_fonte(caminho, digest=None):
+    """Nomes das abas do arquivo, convertendo-o para o cache se necessário.
+
+    ``digest`` é o :func:`hash_arquivo` já calculado pelo chamador.
+    """
+    digest = digest or hash_arquivo(caminho)
+    nomes = _ler_registro(f"abas:{digest}")
+    if nomes and all(os.path.isfile(_caminho_cache(digest, nome)) for nome in nomes):
+        return nomes
+    return _converter(caminho, digest)
+
+
+def abrir_tabela(caminho, aba=None):
+    """Referência (``armazem.Referencia``) a uma aba da fonte no armazém compartilhado.
+
+    A aba é lida do cache em Parquet uma única vez por processo, qualquer que
+    seja o número de sessões que a usam. Sem ``aba``, usa a primeira aba da
+    planilha.
+    """
+    digest = hash_arquivo(caminho)
+    nomes = abas_fonte(caminho, digest)
+    aba = nomes[0] if aba is None else str(aba)
+    if aba not in nomes:
+        raise KeyError(f"Aba '{aba}' não encontrada em {os.path.basename(caminho)}")
+    destino = _caminho_cache(digest, aba)
+    return armazem_dados.abrir(("planilha", digest, aba), lambda: pq.read_table(destino, memory_map=True))
+
+
+def _tipo_pandas(tipo):
+    # Textos sem dicionário continuam em Arrow (o tipo "str" do pandas copiaria para offsets de 64 bits)
+    if tipo == pa.string():
+        return pd.ArrowDtype(tipo)
+    return None
+
+
+def carregar_planilha(caminho, aba=None):
+    """Lê uma aba da fonte MPM como ``DataFrame`` sobre a tabela do armazém (ver :func:`abrir_tabela`).
+
+    A tabela conta como em uso (e não é descartada) enquanto o ``DataFrame`` existir.
+    Textos e datas ficam em colunas do Arrow e categóricas, nos tipos de :func:`compactar`.
+    """
+    return abrir_tabela(caminho, aba).para_pandas(_tipo_pandas)
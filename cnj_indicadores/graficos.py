@@ -0,0 +1,117 @@
+"""Especificações Vega-Lite dos gráficos das interfaces.
+
+Os gráficos são desenhados no navegador (``st.vega_lite_chart``) a partir de
+uma especificação JSON compacta, sem matplotlib. As especificações ficam em
+cache, indexadas pelos valores exibidos.
+"""
+
+import json
+from functools import lru_cache
+
+COR_OBTIDOS = "#28a745"
+COR_MAXIMOS = "#adb5bd"
+
+
+@lru_cache(maxsize=64)
+def _json_pontos(barras):
+    valores = [
+        {"indicador": nome, "serie": serie, "pontos": pontos}
+        for nome, obtidos, maximos in barras
+        for serie, pontos in (("Pontos Máximos", maximos), ("Pontos Obtidos", obtidos))
+    ]
+    especificacao = {
+        "$schema": "https://vega.github.io/schema/vega-lite/v5.json",
+        "title": "Pontuação por Indicador",
+        "data": {"values": valores},
+        "mark": {"type": "bar", "tooltip": True},
+        "encoding": {
+            "x": {"field": "indicador", "type": "nominal", "sort": None, "title": None, "axis": {"labelAngle": -45}},
+            "y": {"field": "pontos", "type": "quantitative", "title": "Pontos", "stack": None},
+            "color": {
+                "field": "serie",
+                "type": "nominal",
+                "title": None,
+                "scale": {"domain": ["Pontos Máximos", "Pontos Obtidos"], "range": [COR_MAXIMOS, COR_OBTIDOS]},
+                "legend": {"orient": "top"},
+            },
+            "opacity": {"condition": {"test": "datum.serie == 'Pontos Máximos'", "value": 0.5}, "value": 1},
+            "order": {"field": "serie", "sort": "ascending"},
+        },
+    }
+    return json.dumps(especificacao, ensure_ascii=False, separators=(",", ":"))
+
+
+def especificacao_pontos(resultados):
+    """Barras de pontos obtidos sobre os pontos máximos de cada indicador.
+
+    ``resultados`` é um dicionário indexado por ``ref`` com ``nome`` (opcional),
+    ``pontos`` e ``pontos_max``.
+    """
+    barras = tuple(
+        (resultado.get("nome") or ref, resultado["pontos"], resultado["pontos_max"])
+        for ref, resultado in resultados.items()
+    )
+    # Cópia nova a cada chamada: a especificação em cache não é alterada por quem a desenha
+    return json.loads(_json_pontos(barras))
+
+
+@lru_cache(maxsize=64)
+def _json_tendencia(pontos, titulo, meta):
+    camadas = [{
+        "mark": {"type": "line", "point": True, "tooltip": True},
+        "encoding": {
+            "x": {"field": "mes", "type": "ordinal", "title": None},
+            "y": {"field": "percentual", "type": "quantitative", "title": "% inconsistentes"},
+        },
+    }]
+    if meta is not None:
+        camadas.append({
+            "mark": {"type": "rule", "strokeDash": [4, 4], "color": "#dc3545"},
+            "encoding": {"y": {"datum": meta}},
+        })
+    especificacao = {
+        "$schema": "https://vega.github.io/schema/vega-lite/v5.json",
+        "title": titulo,
+        "data": {"values": [{"mes": mes, "percentual": round(percentual, 4)} for mes, percentual in pontos]},
+        "layer": camadas,
+    }
+    return json.dumps(especificacao, ensure_ascii=False, separators=(",", ":"))
+
+
+def especificacao_tendencia(meses, percentuais, titulo="Evolução mensal", meta=None):
+    """Linha do percentual de inconsistência por mês, com a meta tracejada (se informada)."""
+    return json.loads(_json_tendencia(tuple(zip(meses, map(float, percentuais))), titulo, meta))
+
+
+@lru_cache(maxsize=64)
+def _json_mapa_calor(celulas, titulo, inverter):
+    especificacao = {
+        "$schema": "https://vega.github.io/schema/vega-lite/v5.json",
+        "title": titulo,
+        "data": {"values": [
+            {"tribunal": tribunal, "mes": mes, "percentual": percentual} for tribunal, mes, percentual in celulas
+        ]},
+        "mark": {"type": "rect", "tooltip": True},
+        "encoding": {
+            "x": {"field": "mes", "type": "ordinal", "title": None},
+            "y": {"field": "tribunal", "type": "nominal", "title": None},
+            "color": {
+                "field": "percentual",
+                "type": "quantitative",
+                "title": "%",
+                # Verde para o melhor resultado: menor percentual, ou maior nos indicadores de mínimo
+                "scale": {"scheme": "redyellowgreen", "reverse": not inverter},
+            },
+        },
+    }
+    return json.dumps(especificacao, ensure_ascii=False, separators=(",", ":"))
+
+
+def especificacao_mapa_calor(tribunais, meses, percentuais, titulo="Comparação entre tribunais", inverter=False):
+    """Mapa de calor do percentual por tribunal e mês; ``inverter`` quando maior é melhor."""
+    # NaN (tribunal sem resultado no mês) vira nulo no JSON
+    celulas = tuple(
+        (tribunal, mes, None if percentual is None or percentual != percentual else round(float(percentual), 4))
+        for tribunal, mes, percentual in zip(tribunais, meses, percentuais)
+    )
+    return json.loads(_json_mapa_calor(celulas, titulo, inverter))
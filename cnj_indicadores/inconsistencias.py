@@ -0,0 +1,172 @@
+"""Detecção vetorizada de registros inconsistentes nas planilhas MPM.
+
+Cada coluna é fatorada uma única vez (``pd.factorize``): as regras são
+avaliadas apenas sobre os valores distintos e o resultado é espalhado para as
+linhas por indexação NumPy. Assim o custo por linha é constante, mesmo em
+colunas com dezenas de milhares de registros.
+"""
+
+from __future__ import annotations
+
+import functools
+from dataclasses import dataclass
+
+from cnj_indicadores.fontes import normalizar_texto
+from cnj_indicadores.perfil import modulo_tardio
+
+np = modulo_tardio("numpy")
+pd = modulo_tardio("pandas")
+
+# Importado ao contar por categoria (o módulo de categorias usa os valores "não informado" daqui)
+categorias = modulo_tardio("cnj_indicadores.categorias")
+
+# Valores tratados como ausência de informação (já normalizados, sem acento e em minúsculas)
+VALORES_NAO_INFORMADO = frozenset({
+    "", "-", "--", "?", "n/i", "n.i.", "n.i", "ni", "n/a", "na",
+    "nao informado", "nao informada", "nao informados", "nao consta",
+    "sem informacao", "nulo", "null", "none", "nan",
+})
+
+# Domínio de valores aceitos para colunas codificadas (nomes de coluna normalizados)
+DOMINIOS = {
+    "sexo": {"m", "f", "masculino", "feminino"},
+    "genero": {"m", "f", "masculino", "feminino", "outro", "outros"},
+    "uf": {
+        "ac", "al", "ap", "am", "ba", "ce", "df", "es", "go", "ma", "mt", "ms", "mg", "pa",
+        "pb", "pr", "pe", "pi", "rj", "rn", "rs", "ro", "rr", "sc", "sp", "se", "to",
+    },
+}
+
+# Colunas que não entram na verificação (texto livre)
+COLUNAS_IGNORADAS = frozenset({"observacao", "observacoes", "obs"})
+
+# Filtro de registros ativos
+COLUNA_SITUACAO = "situacao"
+SITUACOES_ATIVAS = frozenset({"ativo", "ativa", "ativos", "em exercicio"})
+
+# Colunas que identificam o registro entre meses, em ordem de preferência
+COLUNAS_CHAVE = ("matricula", "cpf")
+
+
+@functools.lru_cache(maxsize=None)
+def _bits_por_byte():
+    # Quantidade de bits 1 em cada valor de byte (contagem sobre máscaras compactadas)
+    return np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+
+
+@dataclass
+class ResultadoInconsistencias:
+    """Máscaras de inconsistência de um conjunto de registros.
+
+    As máscaras ficam compactadas em bits (``np.packbits``): ``bits`` tem uma
+    linha por campo verificado e um bit por registro, 1 indicando valor
+    ausente, "não informado" ou fora do domínio. ``mascara`` devolve a matriz
+    booleana (registros x campos) descompactada. ``categoria`` tem o código
+    da categoria de vínculo de cada registro (ver ``categorias.codigos``),
+    quando a planilha a informa.
+    """
+
+    campos: list
+    bits: np.ndarray
+    total: int
+    categoria: np.ndarray = None
+
+    @classmethod
+    def de_mascara(cls, campos, mascara):
+        """Resultado a partir da matriz booleana registros x campos."""
+        mascara = np.asarray(mascara, dtype=bool)
+        return cls(campos=list(campos), bits=np.packbits(mascara.T, axis=1), total=int(mascara.shape[0]))
+
+    @property
+    def mascara(self):
+        return np.unpackbits(self.bits, axis=1, count=self.total).T.astype(bool)
+
+    @property
+    def mascara_linhas(self):
+        return self.mascara_campos(range(len(self.campos)))
+
+    @property
+    def inconsistentes(self):
+        return int(self.mascara_linhas.sum())
+
+    @property
+    def por_campo(self):
+        return pd.Series(_bits_por_byte()[self.bits].sum(axis=1), index=self.campos, dtype="int64")
+
+    @property
+    def por_categoria(self):
+        """Matriz (categorias x 2) de registros e inconsistentes, ou ``None`` sem categorias."""
+        if self.categoria is None:
+            return None
+        return categorias.contar(self.categoria, self.mascara_linhas)
+
+    def mascara_campo(self, campo):
+        return np.unpackbits(self.bits[self.campos.index(campo)], count=self.total).astype(bool)
+
+    def mascara_campos(self, indices):
+        """Registros inválidos em algum dos campos nas posições ``indices``."""
+        bits = np.bitwise_or.reduce(self.bits[list(indices)], axis=0)
+        if np.ndim(bits) == 0:
+            return np.zeros(self.total, dtype=bool)
+        return np.unpackbits(bits, count=self.total).astype(bool)
+
+    def linhas(self, posicoes):
+        """Máscara booleana (registros x campos) só dos registros em ``posicoes``."""
+        posicoes = np.asarray(posicoes, dtype=np.int64)
+        deslocamento = (7 - (posicoes & 7)).astype(np.uint8)
+        return ((self.bits[:, posicoes >> 3] >> deslocamento) & 1).T.astype(bool)
+
+
+def _texto_valor(valor):
+    # Números inteiros lidos como float (ex.: 12.0) devem casar com o domínio "12"
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return normalizar_texto(valor)
+
+
+def mascara_coluna(serie, dominio=None):
+    """Máscara booleana dos valores inválidos de uma coluna."""
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=True)
+    invalidos = np.fromiter(
+        (
+            texto in VALORES_NAO_INFORMADO or (dominio is not None and texto not in dominio)
+            for texto in map(_texto_valor, unicos)
+        ),
+        dtype=bool,
+        count=len(unicos),
+    )
+    # O sentinela -1 (valor nulo) aponta para a posição extra, sempre inválida
+    return np.append(invalidos, True)[codigos]
+
+
+def mascara_ativos(df):
+    """``True`` nos registros ativos (em todos, quando a planilha não informa a situação)."""
+    if COLUNA_SITUACAO not in df.columns:
+        return np.ones(len(df), dtype=bool)
+    return ~mascara_coluna(df[COLUNA_SITUACAO], dominio=SITUACOES_ATIVAS)
+
+
+def filtrar_ativos(df):
+    """Mantém apenas os registros ativos, quando a planilha informa a situação."""
+    if COLUNA_SITUACAO not in df.columns:
+        return df
+    return df.loc[mascara_ativos(df)].reset_index(drop=True)
+
+
+def coluna_chave(df):
+    """Primeira coluna de ``COLUNAS_CHAVE`` presente em ``df``, ou ``None``."""
+    return next((coluna for coluna in COLUNAS_CHAVE if coluna in df.columns), None)
+
+
+def campos_verificados(df):
+    return [coluna for coluna in df.columns if coluna not in COLUNAS_IGNORADAS]
+
+
+def detectar_inconsistencias(df, campos=None, dominios=None):
+    """Avalia todos os campos de ``df`` e retorna as máscaras por registro e por campo."""
+    campos = list(campos) if campos is not None else campos_verificados(df)
+    dominios = DOMINIOS if dominios is None else dominios
+    mascara = np.empty((len(df), len(campos)), dtype=bool)
+    for i, campo in enumerate(campos):
+        mascara[:, i] = mascara_coluna(df[campo], dominios.get(campo))
+    return ResultadoInconsistencias.de_mascara(campos, mascara)
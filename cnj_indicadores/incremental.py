@@ -0,0 +1,153 @@
+"""Reavaliação incremental das inconsistências entre arquivos mensais.
+
+O resultado por registro (chave, hash da linha e máscara por campo) da última
+planilha avaliada fica gravado em Parquet, um estado por tipo de fonte e
+diretório. Quando chega um novo arquivo, só as linhas com chave nova ou hash
+diferente passam pela detecção; as demais reaproveitam a máscara gravada.
+Os agregados dos indicadores II b)/c) são somas dessa máscara.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+
+from cnj_indicadores import fontes, inconsistencias
+from cnj_indicadores.perfil import modulo_tardio
+
+np = modulo_tardio("numpy")
+pd = modulo_tardio("pandas")
+pa = modulo_tardio("pyarrow")
+pq = modulo_tardio("pyarrow.parquet")
+
+# Versão do formato do estado: mudar quando o conteúdo gravado mudar
+VERSAO_ESTADO = 1
+
+# Acima desta fração de linhas alteradas a detecção completa é mais barata
+FRACAO_MAXIMA_ALTERADAS = 0.5
+
+
+@dataclass
+class EstadoRegistros:
+    """Resultado por registro da última planilha avaliada."""
+
+    campos: list
+    chaves: np.ndarray
+    hashes: np.ndarray
+    mascara: np.ndarray
+
+
+def assinatura_regras():
+    """Hash das regras de detecção; um estado gravado com outras regras é descartado."""
+    regras = [
+        VERSAO_ESTADO,
+        sorted(inconsistencias.VALORES_NAO_INFORMADO),
+        {campo: sorted(valores) for campo, valores in sorted(inconsistencias.DOMINIOS.items())},
+        sorted(inconsistencias.COLUNAS_IGNORADAS),
+    ]
+    return hashlib.sha256(json.dumps(regras).encode()).hexdigest()[:16]
+
+
+def caminho_estado(caminho):
+    """Arquivo de estado da fonte: um por tipo (magistrados/servidores) e diretório de origem."""
+    referencia = fontes.referencia_fonte(caminho)
+    tipo = referencia[0] if referencia else fontes.normalizar_coluna(os.path.splitext(os.path.basename(caminho))[0])
+    diretorio = hashlib.sha256(os.path.dirname(os.path.abspath(caminho)).encode()).hexdigest()[:12]
+    return os.path.join(fontes.DIRETORIO_CACHE, "estado", f"{tipo}-{diretorio}.parquet")
+
+
+def hash_linhas(df, campos):
+    """Hash (uint64) do conteúdo de cada linha nos campos verificados."""
+    # Sem categorize: nas colunas de alta cardinalidade (nome, CPF) fatorar custa mais que o hash
+    return pd.util.hash_pandas_object(df[campos], index=False, categorize=False).to_numpy()
+
+
+def chaves_registros(df):
+    """Hash (uint64) da chave de cada registro, ou ``None`` se a planilha não tem coluna de identificação."""
+    chave = inconsistencias.coluna_chave(df)
+    if chave is None:
+        return None
+    textos = df[chave].astype("string").str.strip().to_numpy(dtype=object, na_value="")
+    return pd.util.hash_array(textos, categorize=False)
+
+
+def ler_estado(destino):
+    """Estado gravado em ``destino``, ou ``None`` se ausente ou gravado com outras regras."""
+    try:
+        tabela = pq.read_table(destino, memory_map=True)
+    except (OSError, pa.ArrowInvalid):
+        return None
+    metadados = tabela.schema.metadata or {}
+    if metadados.get(b"regras", b"").decode() != assinatura_regras():
+        return None
+    campos = json.loads(metadados[b"campos"])
+    mascara = np.empty((tabela.num_rows, len(campos)), dtype=bool)
+    for i, campo in enumerate(campos):
+        mascara[:, i] = tabela.column(f"m:{campo}").to_numpy()
+    return EstadoRegistros(
+        campos=campos,
+        chaves=tabela.column("chave").to_numpy(),
+        hashes=tabela.column("hash").to_numpy(),
+        mascara=mascara,
+    )
+
+
+def gravar_estado(estado, destino):
+    colunas = {"chave": pa.array(estado.chaves, type=pa.uint64()), "hash": pa.array(estado.hashes, type=pa.uint64())}
+    for i, campo in enumerate(estado.campos):
+        colunas[f"m:{campo}"] = pa.array(estado.mascara[:, i])
+    tabela = pa.table(colunas).replace_schema_metadata({
+        "regras": assinatura_regras(),
+        "campos": json.dumps(estado.campos),
+    })
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temporario = fontes.caminho_temporario(destino)
+    pq.write_table(tabela, temporario)
+    os.replace(temporario, destino)
+
+
+def reavaliar(df, estado=None):
+    """Máscaras de inconsistência de ``df``, reaproveitando as linhas inalteradas de ``estado``.
+
+    Retorna ``(resultado, novo_estado, reavaliadas)``. Sem estado compatível
+    (outros campos ou sem coluna de chave), todas as linhas são avaliadas.
+    """
+    campos = inconsistencias.campos_verificados(df)
+    chaves = chaves_registros(df)
+    if chaves is None:
+        return inconsistencias.detectar_inconsistencias(df, campos), None, len(df)
+
+    hashes = hash_linhas(df, campos)
+    reaproveitar = np.zeros(len(df), dtype=bool)
+    posicoes = np.full(len(df), -1)
+    if estado is not None and estado.campos == campos:
+        indice = pd.Index(estado.chaves)
+        unicas = ~indice.duplicated()
+        encontrados = indice[unicas].get_indexer(chaves)
+        posicoes = np.where(encontrados >= 0, np.flatnonzero(unicas)[encontrados], -1)
+        pareados = posicoes >= 0
+        reaproveitar[pareados] = estado.hashes[posicoes[pareados]] == hashes[pareados]
+
+    alteradas = np.flatnonzero(~reaproveitar)
+    if len(alteradas) > FRACAO_MAXIMA_ALTERADAS * len(df):
+        resultado = inconsistencias.detectar_inconsistencias(df, campos)
+    else:
+        mascara = np.empty((len(df), len(campos)), dtype=bool)
+        mascara[reaproveitar] = estado.mascara[posicoes[reaproveitar]] if reaproveitar.any() else False
+        if len(alteradas):
+            mascara[alteradas] = inconsistencias.detectar_inconsistencias(df.iloc[alteradas], campos).mascara
+        resultado = inconsistencias.ResultadoInconsistencias.de_mascara(campos, mascara)
+
+    novo_estado = EstadoRegistros(campos=campos, chaves=chaves, hashes=hashes, mascara=resultado.mascara)
+    return resultado, novo_estado, len(alteradas)
+
+
+def analisar_incremental(caminho, df):
+    """Detecta as inconsistências de ``df`` (registros ativos de ``caminho``) e atualiza o estado gravado."""
+    destino = caminho_estado(caminho)
+    resultado, novo_estado, _ = reavaliar(df, ler_estado(destino))
+    if novo_estado is not None:
+        gravar_estado(novo_estado, destino)
+    return resultado
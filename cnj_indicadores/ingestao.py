@@ -0,0 +1,140 @@
+"""Ingestão em fluxo de arquivos MPM enviados pela interface.
+
+CSVs são lidos em blocos de tamanho fixo e planilhas xlsx por um iterador de
+linhas somente leitura do openpyxl. Cada bloco passa pela detecção de
+inconsistências e só as contagens são acumuladas, de modo que o arquivo
+completo nunca é materializado como ``DataFrame``.
+"""
+
+import csv
+import io
+from collections import Counter
+from dataclasses import dataclass, field
+
+from cnj_indicadores.fontes import normalizar_coluna
+from cnj_indicadores.perfil import modulo_tardio
+
+pd = modulo_tardio("pandas")
+categorias = modulo_tardio("cnj_indicadores.categorias")
+inconsistencias = modulo_tardio("cnj_indicadores.inconsistencias")
+
+TAMANHO_BLOCO = 20_000
+
+
+@dataclass
+class ContagemIncremental:
+    """Totais de inconsistência acumulados bloco a bloco."""
+
+    total: int = 0
+    inconsistentes: int = 0
+    linhas_lidas: int = 0
+    contagem_campos: Counter = field(default_factory=Counter)
+    # Matriz (categorias x 2) de ``categorias.contar``, somada bloco a bloco
+    contagem_categorias: object = None
+
+    @property
+    def por_campo(self):
+        return pd.Series(dict(self.contagem_campos), dtype="int64")
+
+    @property
+    def por_categoria(self):
+        """Como ``ResultadoInconsistencias.por_categoria``: ``None`` se o arquivo não informa o vínculo."""
+        contagem = self.contagem_categorias
+        if contagem is None or not categorias.informa_vinculo(contagem):
+            return None
+        return contagem
+
+    def acumular(self, bloco):
+        self.linhas_lidas += len(bloco)
+        ativos = inconsistencias.filtrar_ativos(bloco)
+        resultado = inconsistencias.detectar_inconsistencias(ativos)
+        self.total += resultado.total
+        self.inconsistentes += resultado.inconsistentes
+        self.contagem_campos.update(resultado.por_campo.to_dict())
+        if categorias.coluna_vinculo(ativos) is not None:
+            contagem = categorias.contar(categorias.classificar(ativos).codes, resultado.mascara_linhas)
+            self.contagem_categorias = contagem if self.contagem_categorias is None else self.contagem_categorias + contagem
+
+
+def _normalizar_cabecalho(colunas):
+    return [normalizar_coluna(coluna) or f"coluna_{i}" for i, coluna in enumerate(colunas)]
+
+
+def _tamanho(arquivo):
+    posicao = arquivo.tell()
+    arquivo.seek(0, io.SEEK_END)
+    tamanho = arquivo.tell()
+    arquivo.seek(posicao)
+    return tamanho
+
+
+def _separador_csv(arquivo):
+    amostra = arquivo.read(64 * 1024)
+    arquivo.seek(0)
+    if isinstance(amostra, bytes):
+        amostra = amostra.decode("utf-8-sig", errors="ignore")
+    try:
+        return csv.Sniffer().sniff(amostra, delimiters=";,\t|").delimiter
+    except csv.Error:
+        return ";"
+
+
+def blocos_csv(arquivo, tamanho_bloco=TAMANHO_BLOCO):
+    """Gera ``(bloco, fracao_lida)`` para um CSV aberto em modo binário ou texto."""
+    tamanho = _tamanho(arquivo) or 1
+    leitor = pd.read_csv(
+        arquivo,
+        sep=_separador_csv(arquivo),
+        dtype=str,
+        encoding="utf-8-sig",
+        chunksize=tamanho_bloco,
+    )
+    with leitor:
+        for bloco in leitor:
+            bloco.columns = _normalizar_cabecalho(bloco.columns)
+            yield bloco, min(arquivo.tell() / tamanho, 1.0)
+
+
+def blocos_xlsx(arquivo, tamanho_bloco=TAMANHO_BLOCO):
+    """Gera ``(bloco, fracao_lida)`` percorrendo a planilha ativa em modo somente leitura."""
+    from openpyxl import load_workbook
+
+    livro = load_workbook(arquivo, read_only=True, data_only=True)
+    try:
+        planilha = livro.active
+        linhas = planilha.iter_rows(values_only=True)
+        cabecalho = _normalizar_cabecalho(next(linhas, ()))
+        # max_row vem da dimensão gravada no arquivo e pode estar ausente
+        total_linhas = max((planilha.max_row or 0) - 1, 0)
+
+        lidas = 0
+        pendentes = []
+        for linha in linhas:
+            pendentes.append(linha[:len(cabecalho)])
+            if len(pendentes) == tamanho_bloco:
+                lidas += len(pendentes)
+                yield pd.DataFrame(pendentes, columns=cabecalho), (min(lidas / total_linhas, 1.0) if total_linhas else None)
+                pendentes = []
+        if pendentes:
+            yield pd.DataFrame(pendentes, columns=cabecalho), 1.0
+    finally:
+        livro.close()
+
+
+def processar_fluxo(arquivo, nome, tamanho_bloco=TAMANHO_BLOCO, progresso=None):
+    """Conta as inconsistências de um arquivo CSV/xlsx sem carregá-lo inteiro.
+
+    ``progresso`` recebe ``(fracao, linhas_lidas)`` após cada bloco; ``fracao``
+    é ``None`` quando o tamanho total não é conhecido.
+    """
+    if nome.lower().endswith(".csv"):
+        blocos = blocos_csv(arquivo, tamanho_bloco)
+    else:
+        blocos = blocos_xlsx(arquivo, tamanho_bloco)
+
+    contagem = ContagemIncremental()
+    for bloco, fracao in blocos:
+        contagem.acumular(bloco)
+        if progresso is not None:
+            progresso(fracao, contagem.linhas_lidas)
+    return contagem
@@ -0,0 +1,213 @@
+"""Tempos de cada etapa de uma execução do script e acertos do cache.
+
+Ativada por execução com ``?instrumentar=1`` na URL ou para todo o processo
+com ``CNJ_INSTRUMENTAR=1``; com o valor ``log`` o resultado também é registrado
+em JSON, uma linha por execução, no logger ``cnj_indicadores.instrumentacao``. Sem instrumentação ativa
+``etapa`` e ``contar`` não fazem nada.
+
+As interfaces marcam as seções do script com ``marcar`` (repassado ao
+medidor de inicialização de :mod:`cnj_indicadores.perfil`, se informado); os
+módulos de cálculo abrem etapas internas (carga de cada fonte, cada
+calculadora) com ``etapa``, que aparecem aninhadas na seção em que ocorreram.
+
+Acertos e falhas do cache e do armazém são contados na execução em que
+ocorreram (``CacheLRU`` e ``ArmazemDados`` chamam :func:`contar`), e não pela
+diferença dos contadores do processo, que somariam os acessos de outras
+sessões no mesmo intervalo. Entradas e memória ocupada são do processo.
+
+O código que roda em segundo plano (:mod:`cnj_indicadores.tarefas`) registra
+as etapas em uma execução própria (:func:`coletar`), que a página acrescenta
+à sua com :func:`incorporar` quando a tarefa termina.
+"""
+
+import logging
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from cnj_indicadores.armazem import armazem_dados
+from cnj_indicadores.cache import cache_indicadores
+from cnj_indicadores.perfil import registrar_evento
+
+MODO_AMBIENTE = os.environ.get("CNJ_INSTRUMENTAR", "")
+
+logger = logging.getLogger(__name__)
+
+_execucao_atual = ContextVar("execucao_instrumentada", default=None)
+
+# Contadores de :func:`contar` exibidos como acessos ao cache e ao armazém, fora dos demais
+ACESSOS = ("cache_acertos", "cache_falhas", "armazem_acertos", "armazem_carregamentos")
+
+
+class Execucao:
+    """Etapas cronometradas e contadores de uma execução do script."""
+
+    def __init__(self, registrar_log=False, medidor=None):
+        self.registrar_log = registrar_log
+        self.medidor = medidor
+        # [nome, nível, início, duração]; a entrada é criada ao abrir a etapa para manter a ordem
+        self.etapas = []
+        self.contadores = Counter()
+        self._nivel = 0
+        self._secao = None
+        self._inicio = time.perf_counter()
+
+    def abrir(self, nome):
+        etapa = [nome, self._nivel, time.perf_counter(), None]
+        self.etapas.append(etapa)
+        self._nivel += 1
+        return etapa
+
+    def fechar(self, etapa):
+        etapa[3] = time.perf_counter() - etapa[2]
+        self._nivel -= 1
+
+    def _trocar_secao(self, secao):
+        if self._secao is not None:
+            self.fechar(self._secao)
+        self._secao = self.abrir(secao) if secao else None
+
+    def marcar(self, secao):
+        """Encerra a seção atual do script e inicia ``secao``."""
+        if self.medidor is not None:
+            self.medidor.marcar(secao)
+        self._trocar_secao(secao)
+
+    def relatorio(self):
+        self._trocar_secao(None)
+        cache = cache_indicadores.estatisticas()
+        armazem = armazem_dados.estatisticas()
+        return {
+            "total_ms": round((time.perf_counter() - self._inicio) * 1000, 1),
+            "etapas": [
+                {"etapa": nome, "nivel": nivel, "ms": round((duracao or 0.0) * 1000, 1)}
+                for nome, nivel, _, duracao in self.etapas
+            ],
+            "contadores": {evento: total for evento, total in self.contadores.items() if evento not in ACESSOS},
+            "cache": {
+                "acertos": self.contadores["cache_acertos"],
+                "falhas": self.contadores["cache_falhas"],
+                "entradas": cache["entradas"],
+                "uso_bytes": cache["uso_bytes"],
+            },
+            "armazem": {
+                "acertos": self.contadores["armazem_acertos"],
+                "carregamentos": self.contadores["armazem_carregamentos"],
+                "entradas": armazem["entradas"],
+                "referencias": armazem["referencias"],
+                "uso_bytes": armazem["uso_bytes"],
+            },
+        }
+
+    def exibir(self):
+        """Mostra o detalhamento ao fim da página (e grava o log, se pedido)."""
+        import streamlit as st
+
+        if self.medidor is not None:
+            self.medidor.exibir()
+        if _execucao_atual.get() is self:
+            _execucao_atual.set(None)
+        relatorio = self.relatorio()
+        if self.registrar_log:
+            registrar_evento(logger, "execucao", relatorio)
+
+        cache, armazem = relatorio["cache"], relatorio["armazem"]
+        with st.expander(f"🔬 Instrumentação da execução ({relatorio['total_ms']:.0f} ms)"):
+            st.dataframe(
+                [
+                    {"Etapa": " " * etapa["nivel"] + etapa["etapa"], "ms": etapa["ms"]}
+                    for etapa in relatorio["etapas"]
+                ],
+                hide_index=True,
+                use_container_width=True,
+            )
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Cache: acertos", cache["acertos"])
+            with col2:
+                st.metric("Cache: falhas", cache["falhas"])
+            with col3:
+                st.metric("Armazém: acertos", armazem["acertos"])
+            with col4:
+                st.metric("Armazém: carregamentos", armazem["carregamentos"])
+            st.caption(
+                f"No processo (todas as sessões) • Cache: {cache['entradas']} entradas, {cache['uso_bytes'] / 1024 / 1024:.1f} MB • "
+                f"Armazém: {armazem['entradas']} tabelas, {armazem['referencias']} referências abertas, "
+                f"{armazem['uso_bytes'] / 1024 / 1024:.1f} MB"
+            )
+            if relatorio["contadores"]:
+                st.caption(" • ".join(f"{evento}: {total}" for evento, total in sorted(relatorio["contadores"].items())))
+
+
+class _ExecucaoInativa:
+    def __init__(self, medidor=None):
+        self.medidor = medidor
+
+    def marcar(self, secao):
+        if self.medidor is not None:
+            self.medidor.marcar(secao)
+
+    def exibir(self):
+        if self.medidor is not None:
+            self.medidor.exibir()
+
+
+def iniciar(modo=None, medidor=None):
+    """Execução instrumentada do script atual, conforme ``modo`` (parâmetro da URL) ou o ambiente.
+
+    ``modo`` ``"1"`` ativa o painel; ``"log"`` ativa o painel e o log em JSON.
+    ``medidor`` recebe as mesmas marcas de seção e é exibido junto.
+    """
+    modo = modo or MODO_AMBIENTE
+    if modo in ("", "0"):
+        _execucao_atual.set(None)
+        return _ExecucaoInativa(medidor)
+    execucao = Execucao(registrar_log=modo == "log", medidor=medidor)
+    _execucao_atual.set(execucao)
+    return execucao
+
+
+@contextmanager
+def etapa(nome):
+    """Cronometra o bloco como etapa da execução instrumentada atual, se houver."""
+    execucao = _execucao_atual.get()
+    if execucao is None:
+        yield
+        return
+    registro = execucao.abrir(nome)
+    try:
+        yield
+    finally:
+        execucao.fechar(registro)
+
+
+def coletar():
+    """Execução própria, e atual no contexto em que é chamada, para código fora do script.
+
+    Uma tarefa em segundo plano pode terminar depois da execução da página que
+    a agendou (ou ser aproveitada por outra sessão); suas etapas ficam nesta
+    execução até a página que acompanha a tarefa chamar :func:`incorporar`.
+    """
+    execucao = Execucao()
+    _execucao_atual.set(execucao)
+    return execucao
+
+
+def incorporar(nome, origem, duracao):
+    """Acrescenta à execução atual, se houver, a etapa ``nome`` com as etapas e contadores de ``origem``."""
+    execucao = _execucao_atual.get()
+    if execucao is None or origem is None:
+        return
+    nivel = execucao._nivel
+    execucao.etapas.append([nome, nivel, origem._inicio, duracao])
+    execucao.etapas.extend([etapa, nivel + 1 + sub, inicio, tempo] for etapa, sub, inicio, tempo in origem.etapas)
+    execucao.contadores.update(origem.contadores)
+
+
+def contar(evento, quantidade=1):
+    """Soma ``quantidade`` ao contador ``evento`` da execução instrumentada atual, se houver."""
+    execucao = _execucao_atual.get()
+    if execucao is not None:
+        execucao.contadores[evento] += quantidade
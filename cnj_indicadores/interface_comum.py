@@ -0,0 +1,166 @@
+"""Partes comuns às interfaces: cálculos em segundo plano, valores manuais e exportação.
+
+Cada página agenda os cálculos de que precisa com :func:`calcular_em_segundo_plano`
+(cartões, resumo, exportação) e, ao final da execução, chama uma única vez
+:func:`acompanhar_calculos`, que consulta as tarefas pendentes, mostra o
+progresso com o botão de cancelar e refaz a página quando alguma termina.
+O relatório exportado é montado com o resultado da tarefa concluída, sem
+recalcular os indicadores no download.
+"""
+
+import uuid
+from functools import partial
+
+import streamlit as st
+
+from cnj_indicadores import exportacao, instrumentacao, registro, tarefas
+
+# Valores informados manualmente quando falta a planilha, por tipo de indicador
+VALORES_MANUAIS_PADRAO = {"magistrados": (150, 5), "servidores": (800, 30)}
+
+
+def iniciar_sessao():
+    """Estado da sessão usado pelos cálculos em segundo plano (chamada no início de cada execução).
+
+    ``id_sessao`` identifica a sessão entre as interessadas em cada tarefa,
+    ``calculos_cancelados`` guarda as chaves dos cálculos cancelados aqui e
+    ``tarefas_incorporadas`` as tarefas já incluídas na instrumentação. As
+    tarefas pendentes (``calculos_pendentes``) são reunidas de novo a cada execução.
+    """
+    if 'id_sessao' not in st.session_state:
+        st.session_state.id_sessao = uuid.uuid4().hex
+    if 'calculos_cancelados' not in st.session_state:
+        st.session_state.calculos_cancelados = set()
+    if 'tarefas_incorporadas' not in st.session_state:
+        st.session_state.tarefas_incorporadas = set()
+    if 'manuais' not in st.session_state:
+        st.session_state.manuais = {}
+    st.session_state.calculos_pendentes = {}
+
+
+def valores_manuais(indicadores, manuais):
+    """Valores informados em ``manuais`` (o dicionário da sessão), com os padrões onde nada foi informado."""
+    return {
+        indicador.ref: manuais.get(indicador.ref, VALORES_MANUAIS_PADRAO[indicador.tipo])
+        for indicador in indicadores if getattr(indicador.calculadora, "aceita_entrada_manual", False)
+    }
+
+
+def completar_manuais(resultados, indicadores, manuais):
+    """Cópia de ``resultados`` com os valores manuais onde falta a fonte.
+
+    O resultado de uma tarefa é compartilhado entre as sessões e não é alterado.
+    """
+    return registro.completar_manuais(dict(resultados), indicadores, valores_manuais(indicadores, manuais))
+
+
+def chave_calculo(selecionados, caminhos, parametros, enviados=None):
+    """Chave da tarefa de cálculo: indicadores, versões das fontes, parâmetros e arquivos enviados."""
+    return (
+        "calculo", tuple(sorted(parametros.items())),
+        tuple((indicador.ref, registro.assinatura_fontes(indicador, caminhos)) for indicador in selecionados),
+        tuple(sorted((entrada, enviado[0]) for entrada, enviado in (enviados or {}).items())),
+    )
+
+
+def calcular_em_segundo_plano(selecionados, caminhos, parametros, enviados=None, parciais=False, local=None):
+    """Resultados de ``registro.calcular_lote`` por uma tarefa em segundo plano, ou ``None`` sem eles.
+
+    Enquanto a tarefa não termina, ela fica entre as acompanhadas por
+    :func:`acompanhar_calculos` e o retorno é ``None`` (com ``parciais``, os
+    resultados já prontos); depois de cancelada, mostra o botão de calcular
+    novamente. ``local`` distingue esse botão quando o mesmo cálculo aparece
+    em mais de um lugar da página.
+    """
+    chave = chave_calculo(selecionados, caminhos, parametros, enviados)
+    if chave in st.session_state.calculos_cancelados:
+        st.warning("⛔ Cálculo cancelado.")
+        if st.button("🔄 Calcular novamente", key=f"recalcular_{local or selecionados[0].ref}_{len(selecionados)}"):
+            st.session_state.calculos_cancelados.discard(chave)
+            st.rerun()
+        return None
+
+    tarefa = tarefas.executor_tarefas.submeter(
+        "Cálculo de " + ", ".join(indicador.ref for indicador in selecionados),
+        registro.calcular_lote, selecionados, caminhos, parametros, em_memoria=enviados,
+        chave=chave, interessado=st.session_state.id_sessao,
+    )
+    with instrumentacao.etapa("aguardar cálculo"):
+        tarefa.aguardar(tarefas.ESPERA)
+    if tarefa.encerrada and tarefa.identificador not in st.session_state.tarefas_incorporadas:
+        st.session_state.tarefas_incorporadas.add(tarefa.identificador)
+        instrumentacao.incorporar(f"tarefa {tarefa.identificador} (segundo plano)", tarefa.instrumentacao, tarefa.duracao)
+
+    if tarefa.estado == tarefas.CONCLUIDA:
+        return tarefa.resultado
+    if tarefa.estado == tarefas.ERRO:
+        st.error(f"❌ Erro no cálculo: {tarefa.erro}")
+        return {}
+    if tarefa.estado == tarefas.CANCELADA:
+        st.session_state.calculos_cancelados.add(chave)
+        st.rerun()
+
+    # Com ``parciais`` a página também é refeita quando sai um resultado novo
+    parcial = dict(tarefa.parcial)
+    st.session_state.calculos_pendentes[tarefa.identificador] = (chave, len(parcial) if parciais else None)
+    if parciais:
+        return parcial
+    st.info("⏳ Calculando em segundo plano...")
+    return None
+
+
+@st.fragment(run_every=1)
+def _acompanhar(pendentes):
+    for identificador, (chave, exibidos) in pendentes.items():
+        tarefa = tarefas.executor_tarefas.obter(identificador)
+        if tarefa is not None and tarefa.estado == tarefas.CANCELADA:
+            # Cancelada aqui ou pela tabela de tarefas: não agendar de novo na próxima execução
+            st.session_state.calculos_cancelados.add(chave)
+        if tarefa is None or tarefa.encerrada or (exibidos is not None and len(tarefa.parcial) > exibidos):
+            st.rerun()
+
+    for identificador, (chave, _) in pendentes.items():
+        tarefa = tarefas.executor_tarefas.obter(identificador)
+        progresso_col1, progresso_col2 = st.columns([4, 1])
+        with progresso_col1:
+            st.progress(tarefa.progresso, text=f"{tarefa.mensagem or tarefa.descricao} ({tarefa.duracao:.0f} s)")
+        with progresso_col2:
+            if st.button("⛔ Cancelar", key=f"cancelar_{identificador}", use_container_width=True):
+                # Só deixa de aguardar: a tarefa continua se outra sessão a aguarda
+                tarefas.executor_tarefas.liberar(identificador, st.session_state.id_sessao)
+                st.session_state.calculos_cancelados.add(chave)
+                st.rerun()
+
+
+def acompanhar_calculos():
+    """Progresso dos cálculos pendentes desta execução (refaz a página quando algum termina).
+
+    Chamada uma única vez por execução, no nível da página, depois de todos
+    os cálculos agendados: só o acompanhamento é reexecutado a cada segundo.
+    """
+    if st.session_state.calculos_pendentes:
+        _acompanhar(dict(st.session_state.calculos_pendentes))
+
+
+def gerar_relatorio(resultados, indicadores, manuais, caminhos, formato):
+    """Relatório dos ``resultados`` de uma tarefa, com os valores manuais da sessão no momento do download."""
+    return exportacao.conteudo_relatorio(completar_manuais(resultados, indicadores, manuais), caminhos, formato)
+
+
+def exportar(indicadores, caminhos, parametros, enviados=None, rotulo="Baixar relatório", horizontal=False):
+    """Formato e botão de download do relatório de todos os ``indicadores``.
+
+    Usa o resultado da tarefa de cálculo de todos os indicadores (a mesma do
+    resumo geral); enquanto ela roda, o botão dá lugar ao aviso de cálculo.
+    """
+    formato = st.radio("Formato", list(exportacao.FORMATOS), horizontal=horizontal, key="formato_exportacao")
+    resultados = calcular_em_segundo_plano(indicadores, caminhos, parametros, enviados, local="exportacao")
+    if resultados is None:
+        return
+    st.download_button(
+        rotulo,
+        partial(gerar_relatorio, resultados, indicadores, st.session_state.manuais, caminhos, formato),
+        file_name=exportacao.nome_relatorio(formato, parametros.get("data_referencia")),
+        mime=exportacao.FORMATOS[formato][1],
+        use_container_width=True
+    )
@@ -0,0 +1,209 @@
+"""Cálculo em lote dos indicadores para vários tribunais, sem interface.
+
+Estrutura esperada do diretório de entrada (um subdiretório por tribunal)::
+
+    entrada/
+        TJXX/
+            MPM_Magistrados_2025_07.xlsx
+            MPM_Servidores_2025_07.xlsx
+            datajud/            (exportações JSON/JSONL, opcional)
+        TJYY/
+            ...
+
+Cada tribunal é calculado em um processo do pool, com as mesmas calculadoras
+do registro usadas pelas interfaces. O resultado é uma tabela única com uma
+linha por tribunal e indicador.
+
+Uso::
+
+    python -m cnj_indicadores entrada/ --saida resultados.csv
+
+Com ``--banco`` os resultados também são gravados no banco de resultados
+compartilhado com as interfaces (:mod:`cnj_indicadores.persistencia`); com
+``--cubo`` o cubo de comparação entre tribunais e meses
+(:mod:`cnj_indicadores.comparacao`) é remontado a partir desse banco.
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime
+
+from cnj_indicadores import comparacao, fontes, persistencia, registro
+from cnj_indicadores.perfil import modulo_tardio
+
+pd = modulo_tardio("pandas")
+
+FORMATOS = ("csv", "parquet", "json")
+
+COLUNAS = [
+    "tribunal", "ref", "indicador", "data_referencia", "percentual", "aprovado",
+    "pontos", "pontos_max", "total", "inconsistentes", "fontes", "hash_fontes", "erro",
+]
+
+
+def listar_tribunais(entrada):
+    """Subdiretórios do diretório de entrada, um por tribunal."""
+    return sorted(
+        nome for nome in os.listdir(entrada)
+        if os.path.isdir(os.path.join(entrada, nome)) and not nome.startswith(".")
+    )
+
+
+def fontes_tribunal(diretorio, mes=None):
+    """Caminhos das entradas de um tribunal; ``mes`` ("AAAA_MM") fixa as planilhas MPM."""
+    caminhos = {}
+    for tipo in ("Magistrados", "Servidores"):
+        disponiveis = fontes.listar_fontes(tipo, diretorio)
+        if mes:
+            disponiveis = [nome for nome in disponiveis if f"_{mes}." in nome]
+        caminhos[tipo.lower()] = os.path.join(diretorio, disponiveis[0]) if disponiveis else None
+    diretorio_datajud = os.path.join(diretorio, "datajud")
+    caminhos["datajud"] = diretorio_datajud if os.path.isdir(diretorio_datajud) else None
+    return caminhos
+
+
+def calcular_tribunal(entrada, tribunal, refs=None, mes=None, data_ref=None):
+    """Linhas de resultado de um tribunal (uma por indicador selecionado)."""
+    caminhos = fontes_tribunal(os.path.join(entrada, tribunal), mes)
+    if data_ref is None:
+        nome_mag = caminhos["magistrados"] or caminhos["servidores"]
+        data_ref = (fontes.data_referencia(nome_mag) if nome_mag else None) or date.today()
+    selecionados = [
+        indicador for indicador in registro.indicadores()
+        if indicador.implementado and (not refs or indicador.ref in refs)
+    ]
+
+    linhas = []
+    try:
+        resultados = registro.calcular_lote(selecionados, caminhos, {"data_referencia": data_ref})
+        erro = ""
+    except Exception as exc:  # um tribunal com arquivo corrompido não interrompe o lote
+        resultados = {}
+        erro = _descrever(exc)
+
+    for indicador in selecionados:
+        resultado = resultados.get(indicador.ref, {})
+        usadas = [registro.caminho_entrada(caminhos, entrada) for entrada in indicador.entradas]
+        erro_linha = erro or ("" if resultado else "fonte ausente")
+        try:
+            hash_fontes = registro.assinatura_fontes(indicador, caminhos)
+        except Exception as exc:  # fonte ilegível: o erro fica na linha do indicador
+            hash_fontes = None
+            erro_linha = erro or _descrever(exc)
+        linhas.append({
+            "tribunal": tribunal,
+            "ref": indicador.ref,
+            "indicador": indicador.nome,
+            "data_referencia": data_ref.isoformat(),
+            "percentual": resultado.get("percentual"),
+            "aprovado": resultado.get("aprovado"),
+            "pontos": resultado.get("pontos", 0),
+            "pontos_max": indicador.pontos_max,
+            "total": resultado.get("total"),
+            "inconsistentes": resultado.get("inconsistentes"),
+            "fontes": ";".join(sorted({os.path.basename(c) for c in usadas if c})),
+            "hash_fontes": hash_fontes,
+            "erro": erro_linha,
+        })
+    return linhas
+
+
+def _descrever(exc):
+    return f"{type(exc).__name__}: {exc}"
+
+
+def _inicializar_processo():
+    # O paralelismo fica entre tribunais; dentro de cada um, um processo só
+    from cnj_indicadores import datajud
+
+    datajud.PROCESSOS = 1
+
+
+def calcular_todos(entrada, tribunais=None, processos=None, refs=None, mes=None, data_ref=None, progresso=None):
+    """Calcula os indicadores de todos os tribunais em paralelo e retorna um ``DataFrame``."""
+    tribunais = tribunais or listar_tribunais(entrada)
+    linhas = []
+    with ProcessPoolExecutor(max_workers=processos, initializer=_inicializar_processo) as executor:
+        futuros = {
+            executor.submit(calcular_tribunal, entrada, tribunal, refs, mes, data_ref): tribunal
+            for tribunal in tribunais
+        }
+        for concluidos, futuro in enumerate(as_completed(futuros), start=1):
+            linhas.extend(futuro.result())
+            if progresso is not None:
+                progresso(futuros[futuro], concluidos, len(futuros))
+    tabela = pd.DataFrame(linhas, columns=COLUNAS).astype({"total": "Int64", "inconsistentes": "Int64"})
+    return tabela.sort_values(["tribunal", "ref"], ignore_index=True)
+
+
+def gravar(tabela, saida, formato=None):
+    formato = formato or os.path.splitext(saida)[1].lstrip(".").lower() or "csv"
+    if formato == "parquet":
+        tabela.to_parquet(saida, index=False)
+    elif formato == "json":
+        tabela.to_json(saida, orient="records", force_ascii=False, indent=2)
+    else:
+        tabela.to_csv(saida, index=False, sep=";", encoding="utf-8-sig")
+
+
+def salvar_banco(tabela, caminho=None):
+    """Grava no banco de resultados as linhas calculadas sem erro, em lotes; devolve quantas."""
+    repositorio = persistencia.RepositorioResultados(caminho or persistencia.CAMINHO_PADRAO)
+    validas = tabela[(tabela["erro"] == "") & tabela["hash_fontes"].notna()]
+    salvo_em = datetime.now().isoformat(timespec="seconds")
+    for linha in validas.astype(object).where(validas.notna(), None).to_dict("records"):
+        linha["aprovado"] = None if linha["aprovado"] is None else int(bool(linha["aprovado"]))
+        linha["salvo_em"] = salvo_em
+        repositorio.adicionar(linha)
+    repositorio.gravar_pendentes()
+    return len(validas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m cnj_indicadores",
+        description="Calcula os indicadores do Eixo Dados e Tecnologia para vários tribunais.",
+    )
+    parser.add_argument("entrada", help="diretório com um subdiretório por tribunal")
+    parser.add_argument("--saida", default="resultados.csv", help="arquivo de saída (.csv, .parquet ou .json)")
+    parser.add_argument("--formato", choices=FORMATOS, help="formato de saída (padrão: extensão de --saida)")
+    parser.add_argument("--processos", type=int, default=None, help="processos em paralelo (padrão: núcleos da máquina)")
+    parser.add_argument("--tribunal", action="append", dest="tribunais", help="calcular apenas este tribunal (repetível)")
+    parser.add_argument("--indicador", action="append", dest="refs", help="referência do indicador, ex.: 'Art. 12, I' (repetível)")
+    parser.add_argument("--mes", help="mês das planilhas MPM no formato AAAA_MM (padrão: o mais recente)")
+    parser.add_argument("--data-referencia", type=date.fromisoformat, help="data de referência AAAA-MM-DD")
+    parser.add_argument(
+        "--banco", nargs="?", const="", default=None,
+        help="gravar também no banco de resultados (padrão: CNJ_RESULTADOS_DB ou dados/resultados.sqlite)",
+    )
+    parser.add_argument(
+        "--cubo", nargs="?", const="", default=None,
+        help="remontar o cubo de comparação a partir do banco (padrão: CNJ_CUBO ou dados/cubo_resultados.parquet)",
+    )
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+
+    def informar(tribunal, concluidos, total):
+        print(f"[{concluidos}/{total}] {tribunal}", file=sys.stderr)
+
+    tabela = calcular_todos(
+        args.entrada, args.tribunais, args.processos, args.refs, args.mes, args.data_referencia, informar
+    )
+    gravar(tabela, args.saida, args.formato)
+    if args.banco is not None:
+        salvos = salvar_banco(tabela, args.banco)
+        print(f"{salvos} resultados gravados no banco", file=sys.stderr)
+    if args.cubo is not None:
+        repositorio = persistencia.RepositorioResultados(args.banco or persistencia.CAMINHO_PADRAO)
+        cubo = comparacao.construir_cubo(args.cubo or None, repositorio)
+        print(f"Cubo de comparação com {cubo.num_rows} resultados gravado", file=sys.stderr)
+    print(
+        f"{len(tabela)} resultados de {tabela['tribunal'].nunique()} tribunais gravados em {args.saida} "
+        f"({time.perf_counter() - inicio:.1f} s)",
+        file=sys.stderr,
+    )
+    return 0
@@ -0,0 +1,169 @@
+"""Perfil de inicialização das interfaces e importação tardia de módulos pesados.
+
+Com a variável de ambiente ``CNJ_PERFIL=1`` as interfaces medem o tempo de
+cada importação feita durante a execução (a primeira do processo é a que
+paga o custo das dependências) e o tempo entre as marcas de seção do script,
+mostram o resultado ao fim da página e o registram em JSON no logger
+``cnj_indicadores.perfil``.
+
+``modulo_tardio`` e ``funcao_tardia`` adiam a importação de um módulo até o
+primeiro uso, para que pandas, NumPy e pyarrow só sejam carregados quando um
+cálculo, tabela ou gráfico precisar deles.
+"""
+
+import builtins
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+ATIVO = os.environ.get("CNJ_PERFIL", "") not in ("", "0")
+
+logger = logging.getLogger(__name__)
+
+
+def registrar_evento(registro, evento, dados):
+    """Registra ``dados`` como uma linha JSON no nível INFO de ``registro``.
+
+    Sem nenhum handler configurado pela aplicação, as linhas vão para o
+    stderr; handlers e níveis configurados pelo monitoramento têm precedência.
+    """
+    if not registro.hasHandlers():
+        pacote = logging.getLogger("cnj_indicadores")
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        pacote.addHandler(handler)
+        if pacote.level == logging.NOTSET:
+            pacote.setLevel(logging.INFO)
+    registro.info("%s", json.dumps({"evento": evento, **dados}, ensure_ascii=False))
+
+
+def _importar(nome):
+    # Pela função __import__ (e não importlib) para que o medidor registre a importação
+    __import__(nome)
+    return sys.modules[nome]
+
+
+class _ModuloTardio:
+    """Módulo importado no primeiro acesso a um atributo."""
+
+    def __init__(self, nome):
+        self._nome = nome
+        self._modulo = None
+
+    def __getattr__(self, atributo):
+        if self._modulo is None:
+            self._modulo = _importar(self._nome)
+        return getattr(self._modulo, atributo)
+
+    def __repr__(self):
+        estado = "carregado" if self._modulo is not None else "não carregado"
+        return f"<módulo tardio {self._nome} ({estado})>"
+
+
+def modulo_tardio(nome):
+    """Substituto de ``import nome`` que só importa o módulo quando ele é usado."""
+    if nome in sys.modules:
+        return sys.modules[nome]
+    return _ModuloTardio(nome)
+
+
+def funcao_tardia(modulo, nome):
+    """Função que importa ``modulo`` e chama ``modulo.nome`` só quando é chamada."""
+    def chamar(*args, **kwargs):
+        return getattr(_importar(modulo), nome)(*args, **kwargs)
+
+    chamar.__name__ = nome
+    chamar.__qualname__ = f"{modulo}.{nome}"
+    return chamar
+
+
+class MedidorInicio:
+    """Tempos de importação e de seções de uma execução do script."""
+
+    def __init__(self):
+        self.importacoes = []
+        self.secoes = []
+        self._inicio = self._marca = time.perf_counter()
+        self._secao = "início"
+        self._nivel = threading.local()
+        self._importar_original = None
+
+    def instalar(self):
+        """Passa a medir as importações de módulos ainda não carregados."""
+        if self._importar_original is not None:
+            return self
+        original = self._importar_original = builtins.__import__
+
+        def importar(nome, globais=None, locais=None, lista=(), nivel=0):
+            if nivel or nome in sys.modules:
+                return original(nome, globais, locais, lista, nivel)
+            profundidade = getattr(self._nivel, "valor", 0)
+            self._nivel.valor = profundidade + 1
+            inicio = time.perf_counter()
+            try:
+                return original(nome, globais, locais, lista, nivel)
+            finally:
+                self._nivel.valor = profundidade
+                self.importacoes.append((nome, time.perf_counter() - inicio, profundidade, self._secao))
+
+        builtins.__import__ = importar
+        return self
+
+    def remover(self):
+        if self._importar_original is not None:
+            builtins.__import__ = self._importar_original
+            self._importar_original = None
+
+    def marcar(self, secao):
+        """Encerra a seção atual e inicia ``secao``."""
+        agora = time.perf_counter()
+        self.secoes.append((self._secao, agora - self._marca))
+        self._marca = agora
+        self._secao = secao
+
+    def relatorio(self, limite=25):
+        """Seções na ordem de execução e importações de primeiro nível, das mais lentas às mais rápidas."""
+        self.marcar("fim")
+        importacoes = sorted(
+            (item for item in self.importacoes if item[2] == 0), key=lambda item: item[1], reverse=True
+        )[:limite]
+        return {
+            "total_ms": round((time.perf_counter() - self._inicio) * 1000, 1),
+            "secoes": [{"secao": nome, "ms": round(segundos * 1000, 1)} for nome, segundos in self.secoes],
+            "importacoes": [
+                {"modulo": nome, "ms": round(segundos * 1000, 1), "secao": secao}
+                for nome, segundos, _, secao in importacoes
+            ],
+        }
+
+    def exibir(self):
+        """Mostra o relatório ao fim da página e o registra em JSON no log."""
+        import streamlit as st
+
+        self.remover()
+        relatorio = self.relatorio()
+        registrar_evento(logger, "perfil_inicio", relatorio)
+        with st.expander(f"⏱️ Perfil de inicialização ({relatorio['total_ms']:.0f} ms)"):
+            col1, col2 = st.columns(2)
+            with col1:
+                st.markdown("**Seções**")
+                st.dataframe(relatorio["secoes"], hide_index=True, use_container_width=True)
+            with col2:
+                st.markdown("**Importações**")
+                st.dataframe(relatorio["importacoes"], hide_index=True, use_container_width=True)
+
+
+class _MedidorInativo:
+    def marcar(self, secao):
+        pass
+
+    def exibir(self):
+        pass
+
+
+def iniciar():
+    """Medidor da execução atual: ativo com ``CNJ_PERFIL=1``, sem efeito caso contrário."""
+    return MedidorInicio().instalar() if ATIVO else _MedidorInativo()
@@ -0,0 +1,156 @@
+"""Resultados salvos dos indicadores, compartilhados entre sessões e analistas.
+
+Os resultados ficam em um banco SQLite local em modo WAL (várias leituras
+simultâneas a uma escrita), uma linha por tribunal, indicador, data de
+referência e hash das fontes usadas. A consulta do resumo usa o índice por
+tribunal e data de referência, de modo que reabrir o painel mostra os
+resultados salvos sem recalcular nada a partir das planilhas. As gravações
+são acumuladas e feitas em lotes, cada lote em uma única transação.
+"""
+
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from cnj_indicadores import fontes
+
+CAMINHO_PADRAO = os.environ.get("CNJ_RESULTADOS_DB", os.path.join(fontes.DIRETORIO_DADOS, "resultados.sqlite"))
+TRIBUNAL_PADRAO = os.environ.get("CNJ_TRIBUNAL", "")
+
+# Linhas acumuladas antes de uma gravação automática
+TAMANHO_LOTE = 500
+
+COLUNAS = (
+    "tribunal", "ref", "data_referencia", "hash_fontes", "indicador", "percentual", "aprovado",
+    "pontos", "pontos_max", "total", "inconsistentes", "fontes", "salvo_em",
+)
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS resultados (
+    tribunal TEXT NOT NULL,
+    ref TEXT NOT NULL,
+    data_referencia TEXT NOT NULL,
+    hash_fontes TEXT NOT NULL,
+    indicador TEXT NOT NULL,
+    percentual REAL,
+    aprovado INTEGER,
+    pontos INTEGER,
+    pontos_max INTEGER,
+    total INTEGER,
+    inconsistentes INTEGER,
+    fontes TEXT,
+    salvo_em TEXT NOT NULL,
+    PRIMARY KEY (tribunal, ref, data_referencia, hash_fontes)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS resultados_por_data ON resultados (tribunal, data_referencia, salvo_em);
+"""
+
+_INSERIR = (
+    f"INSERT OR REPLACE INTO resultados ({', '.join(COLUNAS)}) "
+    f"VALUES ({', '.join('?' for _ in COLUNAS)})"
+)
+
+
+def linha_resultado(tribunal, data_referencia, indicador, resultado, hash_fontes, nomes_fontes=()):
+    """Linha do banco para o resultado de um indicador."""
+    aprovado = resultado.get("aprovado")
+    return {
+        "tribunal": tribunal or "",
+        "ref": indicador.ref,
+        "data_referencia": data_referencia.isoformat(),
+        "hash_fontes": hash_fontes,
+        "indicador": indicador.nome,
+        "percentual": resultado.get("percentual"),
+        "aprovado": None if aprovado is None else int(bool(aprovado)),
+        "pontos": resultado.get("pontos"),
+        "pontos_max": indicador.pontos_max,
+        "total": resultado.get("total"),
+        "inconsistentes": resultado.get("inconsistentes"),
+        "fontes": ";".join(sorted(nomes_fontes)),
+        "salvo_em": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def como_resultado(linha):
+    """Resultado no formato usado pelas interfaces, a partir de uma linha do banco."""
+    return {
+        "nome": linha["indicador"],
+        "percentual": linha["percentual"],
+        "pontos": linha["pontos"],
+        "pontos_max": linha["pontos_max"],
+        "aprovado": bool(linha["aprovado"]),
+        "total": linha["total"],
+        "inconsistentes": linha["inconsistentes"],
+        "salvo_em": linha["salvo_em"],
+    }
+
+
+class RepositorioResultados:
+    """Banco de resultados com uma conexão por thread e gravação em lotes."""
+
+    def __init__(self, caminho=CAMINHO_PADRAO, tamanho_lote=TAMANHO_LOTE):
+        self.caminho = caminho
+        self.tamanho_lote = tamanho_lote
+        self._local = threading.local()
+        self._pendentes = []
+        self._trava = threading.Lock()
+
+    def _conexao(self):
+        # Conexões SQLite não são compartilhadas entre threads (uma por sessão do Streamlit)
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.caminho)), exist_ok=True)
+            conexao = sqlite3.connect(self.caminho, timeout=30)
+            conexao.row_factory = sqlite3.Row
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            conexao.executescript(ESQUEMA)
+            self._local.conexao = conexao
+        return conexao
+
+    def adicionar(self, linha):
+        """Acumula uma linha; o lote é gravado ao atingir ``tamanho_lote``."""
+        with self._trava:
+            self._pendentes.append(tuple(linha[coluna] for coluna in COLUNAS))
+            cheio = len(self._pendentes) >= self.tamanho_lote
+        if cheio:
+            self.gravar_pendentes()
+
+    def gravar_pendentes(self):
+        """Grava as linhas acumuladas em uma única transação e devolve quantas foram gravadas."""
+        with self._trava:
+            pendentes, self._pendentes = self._pendentes, []
+        if pendentes:
+            with self._conexao() as conexao:
+                conexao.executemany(_INSERIR, pendentes)
+        return len(pendentes)
+
+    def salvar(self, linhas):
+        """Grava ``linhas`` (e as pendentes) imediatamente."""
+        for linha in linhas:
+            self.adicionar(linha)
+        return self.gravar_pendentes()
+
+    def consultar(self, tribunal, data_referencia):
+        """Último resultado salvo de cada indicador para o tribunal e a data, indexado por ``ref``."""
+        cursor = self._conexao().execute(
+            "SELECT * FROM resultados WHERE tribunal = ? AND data_referencia = ? ORDER BY salvo_em",
+            (tribunal or "", data_referencia.isoformat()),
+        )
+        # Em ordem de gravação: a linha mais recente de cada indicador prevalece
+        return {linha["ref"]: como_resultado(linha) for linha in cursor}
+
+    def listar_ultimos(self):
+        """Última linha salva de cada tribunal, indicador e data de referência (todas as colunas)."""
+        cursor = self._conexao().execute(
+            "SELECT r.* FROM resultados r JOIN ("
+            "  SELECT tribunal, ref, data_referencia, MAX(salvo_em) AS salvo_em"
+            "  FROM resultados GROUP BY tribunal, ref, data_referencia"
+            ") u USING (tribunal, ref, data_referencia, salvo_em) ORDER BY salvo_em"
+        )
+        return [dict(linha) for linha in cursor]
+
+
+# Instância única do processo, compartilhada pelas sessões do Streamlit
+repositorio_resultados = RepositorioResultados()
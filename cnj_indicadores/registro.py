@@ -0,0 +1,377 @@
+"""Registro declarativo dos indicadores do Art. 12 e cálculo em lote.
+
+Cada indicador declara as entradas de que precisa (ex.: ``"magistrados"``) e
+uma calculadora. :func:`calcular_lote` resolve o conjunto de entradas dos
+indicadores selecionados, carrega cada uma uma única vez e calcula todos os
+indicadores em uma só passada, com memoização por hash das fontes.
+"""
+
+import hashlib
+from dataclasses import dataclass, field
+
+from cnj_indicadores import datajud, instrumentacao, tarefas
+from cnj_indicadores.cache import cache_indicadores, chave_indicador
+from cnj_indicadores.categorias import CATEGORIAS_SERVIDORES
+from cnj_indicadores.fontes import hash_arquivo
+from cnj_indicadores.perfil import funcao_tardia, modulo_tardio
+
+# Módulos de cálculo: importados só quando um indicador é calculado
+calculo = modulo_tardio("cnj_indicadores.calculo")
+eletronicos = modulo_tardio("cnj_indicadores.eletronicos")
+saneamento = modulo_tardio("cnj_indicadores.saneamento")
+
+# Totais do Eixo Dados e Tecnologia (inclui indicadores fora deste sistema)
+TOTAL_INDICADORES_EIXO = 11
+PONTOS_EIXO = 589
+
+
+@dataclass(frozen=True)
+class Indicador:
+    ref: str
+    nome: str
+    pontos_max: int
+    meta: float
+    tipo: str
+    descricao: str
+    obs: str = ""
+    # "maximo": aprovado com percentual <= meta; "minimo": aprovado com percentual >= meta
+    sentido: str = "maximo"
+    meta_descricao: str = ""
+    calculadora: object = field(default=None, compare=False)
+
+    @property
+    def rotulo(self):
+        return f"{self.ref} - {self.nome}"
+
+    @property
+    def implementado(self):
+        return self.calculadora is not None
+
+    @property
+    def entradas(self):
+        return tuple(self.calculadora.entradas) if self.calculadora else ()
+
+    @property
+    def texto_meta(self):
+        if self.meta_descricao:
+            return self.meta_descricao
+        return f"{'≤' if self.sentido == 'maximo' else '≥'} {self.meta:.0f}%"
+
+
+class CalculadoraCadastro:
+    """Art. 12, II, b) e c): percentual de registros ativos com inconsistência no MPM."""
+
+    # Os valores podem ser informados manualmente quando a planilha não está disponível
+    aceita_entrada_manual = True
+
+    def __init__(self, entrada, categorias=None):
+        self.entradas = (entrada,)
+        # Categorias de vínculo consideradas (``None``: todos os registros ativos)
+        self.categorias = categorias
+
+    def calcular(self, indicador, dados, parametros):
+        analise = dados[self.entradas[0]]
+        contagem = analise.por_categoria if self.categorias is not None else None
+        if contagem is None:
+            # Sem coluna de vínculo na planilha não há como separar as categorias
+            resultado = calculo.avaliar(analise.total, analise.inconsistentes, indicador.meta, indicador.pontos_max)
+        else:
+            resultado = calculo.avaliar_categorias(contagem, self.categorias, indicador.meta, indicador.pontos_max)
+        resultado["analise"] = analise
+        return resultado
+
+    def calcular_manual(self, indicador, total, inconsistentes):
+        return calculo.avaliar(total, inconsistentes, indicador.meta, indicador.pontos_max)
+
+    def metricas(self, resultado):
+        metricas = [
+            ("Total de registros ativos", f"{resultado['total']}"),
+            ("Registros com 'não informado'", f"{resultado['inconsistentes']}"),
+        ]
+        if resultado.get("categorias") is not None:
+            metricas.append(("Fora das categorias", f"{resultado['fora_categorias']}"))
+        return metricas
+
+
+class CalculadoraAlimentacao:
+    """Art. 12, I: remessas mensais ao DataJud, por grau, nos 12 meses até a data de referência."""
+
+    entradas = ("datajud",)
+
+    def calcular(self, indicador, dados, parametros):
+        resumo = dados["datajud"]
+        esperados, faltantes = datajud.cobertura_remessas(resumo, parametros["data_referencia"])
+        enviados = len(esperados) - len(faltantes)
+        percentual = (enviados / len(esperados) * 100) if esperados else 0
+        resultado = calculo.pontuar(percentual, indicador.meta, indicador.pontos_max, indicador.sentido)
+        resultado.update({
+            "total": int(resumo["processos"].sum()),
+            "inconsistentes": int(resumo["com_erro"].sum()),
+            "ilegiveis": int(resumo["ilegiveis"].sum()),
+            "meses_esperados": len(esperados),
+            "meses_enviados": enviados,
+            "faltantes": faltantes,
+            "formula": f"({enviados} ÷ {len(esperados)} remessas mensais por grau) × 100 = {percentual:.2f}%",
+        })
+        return resultado
+
+    def metricas(self, resultado):
+        metricas = [
+            ("Remessas mensais", f"{resultado['meses_enviados']}/{resultado['meses_esperados']}"),
+            ("Processos enviados", f"{resultado['total']}"),
+            ("Com erro de preenchimento", f"{resultado['inconsistentes']}"),
+        ]
+        if resultado.get("ilegiveis"):
+            metricas.append(("Registros ilegíveis", f"{resultado['ilegiveis']}"))
+        return metricas
+
+
+class CalculadoraSaneamento:
+    """Art. 12, III: percentual de unidades judiciárias sem erros de preenchimento no DataJud."""
+
+    entradas = ("processos_datajud",)
+
+    def calcular(self, indicador, dados, parametros):
+        ranking = saneamento.taxas_por_unidade(dados["processos_datajud"])
+        saneadas = int((ranking["taxa_erro"] <= saneamento.TOLERANCIA_ERRO).sum())
+        percentual = saneamento.percentual_saneadas(ranking)
+        resultado = calculo.pontuar(percentual, indicador.meta, indicador.pontos_max, indicador.sentido)
+        resultado.update({
+            "total": len(ranking),
+            "inconsistentes": len(ranking) - saneadas,
+            "ranking": ranking,
+            "formula": f"({saneadas} unidades saneadas ÷ {len(ranking)}) × 100 = {percentual:.2f}%",
+        })
+        return resultado
+
+    def metricas(self, resultado):
+        return [
+            ("Unidades", f"{resultado['total']}"),
+            ("Unidades com erro", f"{resultado['inconsistentes']}"),
+        ]
+
+
+class CalculadoraEletronicos:
+    """Art. 12, IV: percentual de processos eletrônicos no mês da data de referência."""
+
+    entradas = ("historico_datajud",)
+
+    def calcular(self, indicador, dados, parametros):
+        contagem = eletronicos.contar_formatos(dados["historico_datajud"], parametros["data_referencia"])
+        total = contagem["eletronicos"] + contagem["fisicos"]
+        percentual = (contagem["eletronicos"] / total * 100) if total > 0 else 0
+        resultado = calculo.pontuar(percentual, indicador.meta, indicador.pontos_max, indicador.sentido)
+        resultado.update(contagem)
+        resultado.update({
+            "total": total,
+            "inconsistentes": contagem["fisicos"],
+            "formula": f"({contagem['eletronicos']} eletrônicos ÷ {total}) × 100 = {percentual:.2f}%",
+        })
+        return resultado
+
+    def metricas(self, resultado):
+        return [
+            ("Eletrônicos", f"{resultado['eletronicos']}"),
+            ("Físicos", f"{resultado['fisicos']}"),
+            ("Sem formato", f"{resultado['sem_formato']}"),
+        ]
+
+
+# Para cada tipo de entrada: função que identifica a versão da fonte (para o
+# cache) e função que a carrega a partir do caminho
+CARREGADORES = {
+    "magistrados": (hash_arquivo, funcao_tardia("cnj_indicadores.calculo", "analisar_fonte")),
+    "servidores": (hash_arquivo, funcao_tardia("cnj_indicadores.calculo", "analisar_fonte")),
+    "datajud": (datajud.assinatura_exportacoes, datajud.carregar_resumo),
+    "processos_datajud": (datajud.assinatura_exportacoes, datajud.carregar_processos),
+    "historico_datajud": (datajud.assinatura_exportacoes, funcao_tardia("cnj_indicadores.eletronicos", "atualizar_historico")),
+}
+
+# Entradas lidas da mesma fonte que outra entrada
+ORIGEM_ENTRADA = {
+    "processos_datajud": "datajud",
+    "historico_datajud": "datajud",
+}
+
+_REGISTRO = {}
+
+
+def registrar(indicador):
+    """Inclui (ou substitui) um indicador no registro, mantendo a ordem de inclusão."""
+    _REGISTRO[indicador.ref] = indicador
+    return indicador
+
+
+def indicadores():
+    return list(_REGISTRO.values())
+
+
+def obter(ref):
+    return _REGISTRO[ref]
+
+
+def entradas_necessarias(selecionados):
+    """Conjunto de entradas exigidas pelos indicadores selecionados."""
+    return sorted({entrada for indicador in selecionados for entrada in indicador.entradas})
+
+
+def caminho_entrada(caminhos, entrada):
+    """Caminho da fonte de uma entrada, considerando entradas que compartilham a mesma fonte."""
+    return caminhos.get(ORIGEM_ENTRADA.get(entrada, entrada))
+
+
+def assinatura_fontes(indicador, caminhos, carregadores=None):
+    """Hash das versões das fontes usadas pelo indicador, ou ``None`` se faltar alguma."""
+    carregadores = CARREGADORES if carregadores is None else carregadores
+    partes = []
+    for entrada in indicador.entradas:
+        caminho = caminho_entrada(caminhos, entrada)
+        if caminho is None:
+            return None
+        partes.append(f"{entrada}={carregadores[entrada][0](caminho)}")
+    return hashlib.sha256("\n".join(partes).encode()).hexdigest()
+
+
+def calcular_lote(selecionados, caminhos, parametros=None, carregadores=None, em_memoria=None):
+    """Calcula os indicadores selecionados a partir das fontes em ``caminhos``.
+
+    ``caminhos`` associa cada entrada ao caminho da fonte (ou ``None``). Cada
+    entrada é carregada no máximo uma vez, e só quando algum indicador que a
+    usa não está no cache; indicadores sem calculadora ou com alguma entrada
+    ausente ficam fora do resultado, indexado por ``ref``. ``parametros``
+    (ex.: ``data_referencia``) são repassados às calculadoras e fazem parte da
+    chave do cache. ``em_memoria`` associa entradas já carregadas (ex.:
+    arquivos enviados) a um par ``(identificador, dados)`` e tem precedência
+    sobre ``caminhos``.
+    """
+    parametros = parametros or {}
+    carregadores = CARREGADORES if carregadores is None else carregadores
+    em_memoria = em_memoria or {}
+    dados = {}
+    digests = {}
+    origens = {}
+    for entrada in entradas_necessarias(selecionados):
+        if entrada in em_memoria:
+            digests[entrada], dados[entrada] = em_memoria[entrada]
+            continue
+        caminho = caminho_entrada(caminhos, entrada)
+        if caminho is None:
+            continue
+        identificar, _ = carregadores[entrada]
+        digests[entrada] = identificar(caminho)
+        origens[entrada] = caminho
+
+    def carregar(entrada):
+        if entrada not in dados:
+            tarefas.informar(mensagem=f"Carregando {entrada}")
+            with instrumentacao.etapa(f"carregar {entrada}"):
+                dados[entrada] = carregadores[entrada][1](origens[entrada])
+            instrumentacao.contar("fontes_carregadas")
+        return dados[entrada]
+
+    def calcular(indicador):
+        entradas = {entrada: carregar(entrada) for entrada in indicador.entradas}
+        with instrumentacao.etapa(f"calcular {indicador.ref}"):
+            return indicador.calculadora.calcular(indicador, entradas, parametros)
+
+    resultados = {}
+    calculaveis = [
+        indicador for indicador in selecionados
+        if indicador.implementado and all(entrada in digests for entrada in indicador.entradas)
+    ]
+    for concluidos, indicador in enumerate(calculaveis):
+        # Em segundo plano (ver ``tarefas``): andamento, resultados parciais e ponto de cancelamento
+        tarefas.informar(concluidos / len(calculaveis), f"Calculando {indicador.ref}")
+        chave = chave_indicador(
+            tuple(digests[entrada] for entrada in indicador.entradas),
+            indicador.ref,
+            meta=indicador.meta,
+            pontos_max=indicador.pontos_max,
+            **parametros,
+        )
+        resultados[indicador.ref] = cache_indicadores.obter_ou_calcular(
+            chave, lambda indicador=indicador: calcular(indicador)
+        )
+        tarefas.informar(parcial={indicador.ref: resultados[indicador.ref]})
+    return resultados
+
+
+def completar_manuais(resultados, selecionados, valores_manuais):
+    """Inclui os indicadores sem fonte que aceitam entrada manual, com os valores informados.
+
+    ``valores_manuais`` associa o ``ref`` do indicador a ``(total, inconsistentes)``.
+    """
+    for indicador in selecionados:
+        calculadora = indicador.calculadora
+        if indicador.ref in resultados or indicador.ref not in valores_manuais:
+            continue
+        if getattr(calculadora, "aceita_entrada_manual", False):
+            total, inconsistentes = valores_manuais[indicador.ref]
+            resultados[indicador.ref] = calculadora.calcular_manual(indicador, total, inconsistentes)
+    return resultados
+
+
+registrar(Indicador(
+    ref="Art. 12, II, b)",
+    nome="Cadastro de Magistrados(as)",
+    pontos_max=20,
+    meta=5.0,
+    tipo="magistrados",
+    descricao="Verifica se há até 5% de magistrados(as) ativos com registro de inconsistência ou ausência de informação no sistema MPM.",
+    obs="Campos com 'não informado' são considerados inválidos.",
+    calculadora=CalculadoraCadastro("magistrados"),
+))
+registrar(Indicador(
+    ref="Art. 12, II, c)",
+    nome="Cadastro de Servidores(as)",
+    pontos_max=20,
+    meta=5.0,
+    tipo="servidores",
+    descricao="Verifica se há até 5% de servidores(as) ativos com registros inconsistentes no MPM.",
+    obs="Considera os cargos: efetivos/removidos, cedidos/requisitados de outro tribunal, cedidos/requisitados de fora do judiciário e comissionados sem vínculo.",
+    calculadora=CalculadoraCadastro("servidores", categorias=CATEGORIAS_SERVIDORES),
+))
+registrar(Indicador(
+    ref="Art. 12, I",
+    nome="Alimentar DataJud",
+    pontos_max=174,
+    meta=100.0,
+    tipo="datajud",
+    descricao="Alimentação da Base Nacional de Dados do Poder Judiciário (DataJud).",
+    obs="Remessas mensais de todos os graus nos 12 meses até a data de referência.",
+    sentido="minimo",
+    calculadora=CalculadoraAlimentacao(),
+))
+registrar(Indicador(
+    ref="Art. 12, III",
+    nome="Saneamento DataJud por Unidade",
+    pontos_max=30,
+    meta=100.0,
+    tipo="saneamento",
+    descricao="Saneamento do DataJud por Unidade Judiciária.",
+    obs="Unidades sem processos com erro de preenchimento (número, classe, assunto, órgão, datas, movimentos, formato).",
+    sentido="minimo",
+    calculadora=CalculadoraSaneamento(),
+))
+registrar(Indicador(
+    ref="Art. 12, IV",
+    nome="Processos Eletrônicos",
+    pontos_max=50,
+    meta=100.0,
+    tipo="eletronicos",
+    descricao="Tramitar as ações judiciais de forma eletrônica.",
+    obs="Processos do DataJud atualizados no mês de referência, por formato (eletrônico/físico).",
+    sentido="minimo",
+    calculadora=CalculadoraEletronicos(),
+))
+registrar(Indicador(
+    ref="Art. 12, V",
+    nome="iGovTIC-JUD",
+    pontos_max=60,
+    meta=100.0,
+    tipo="igovtic",
+    descricao="Índice de Governança, Gestão e Infraestrutura de TIC do Poder Judiciário.",
+    obs="Em desenvolvimento",
+    sentido="minimo",
+    meta_descricao="Satisfatório",
+))
@@ -0,0 +1,57 @@
+"""Saneamento do DataJud por unidade judiciária (Art. 12, III).
+
+As taxas de erro de todas as unidades saem de uma única passada sobre a
+tabela de processos: os códigos de órgão julgador são fatorados em inteiros
+e as contagens por unidade (total, com erro e por tipo de erro) são obtidas
+com ``np.bincount`` sobre o bitmask de erros.
+"""
+
+from cnj_indicadores import datajud
+from cnj_indicadores.perfil import modulo_tardio
+
+np = modulo_tardio("numpy")
+pd = modulo_tardio("pandas")
+
+# Taxa de erro (%) até a qual a unidade é considerada saneada
+TOLERANCIA_ERRO = 0.0
+
+
+def taxas_por_unidade(processos):
+    """Ranking das unidades, da maior para a menor taxa de erro.
+
+    Processos sem órgão julgador identificado não entram no ranking.
+    """
+    codigos_orgao = processos["orgao_codigo"].to_numpy()
+    atribuidos = codigos_orgao >= 0
+    # Sem ordenação, os códigos são numerados na ordem da primeira ocorrência
+    codigos, unidades = pd.factorize(codigos_orgao[atribuidos])
+    erros = processos["erros"].to_numpy()[atribuidos]
+    quantidade = len(unidades)
+
+    ranking = pd.DataFrame({
+        "orgao_codigo": unidades,
+        "processos": np.bincount(codigos, minlength=quantidade),
+        "com_erro": np.bincount(codigos, weights=erros != 0, minlength=quantidade).astype(np.int64),
+    })
+    for bit, descricao in datajud.DESCRICAO_ERROS.items():
+        ranking[descricao] = np.bincount(codigos, weights=(erros & bit) != 0, minlength=quantidade).astype(np.int64)
+
+    # Nome da unidade: o informado na primeira ocorrência de cada código
+    primeira_ocorrencia = np.flatnonzero(np.diff(np.maximum.accumulate(codigos), prepend=-1) > 0)
+    nomes = processos["orgao_nome"]
+    if isinstance(nomes.dtype, pd.CategoricalDtype):
+        posicoes = nomes.cat.codes.to_numpy()[atribuidos][primeira_ocorrencia]
+        nomes_unidades = np.where(posicoes >= 0, np.asarray(nomes.cat.categories, dtype=object)[posicoes], "")
+    else:
+        nomes_unidades = nomes.to_numpy()[atribuidos][primeira_ocorrencia]
+    ranking.insert(1, "orgao_nome", nomes_unidades)
+
+    ranking["taxa_erro"] = ranking["com_erro"] / ranking["processos"] * 100
+    return ranking.sort_values(["taxa_erro", "processos"], ascending=[False, False], ignore_index=True)
+
+
+def percentual_saneadas(ranking, tolerancia=TOLERANCIA_ERRO):
+    """Percentual de unidades com taxa de erro dentro da tolerância."""
+    if ranking.empty:
+        return 0.0
+    return float((ranking["taxa_erro"] <= tolerancia).mean() * 100)
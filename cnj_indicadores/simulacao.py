@@ -0,0 +1,170 @@
+"""Simulação de correções nos cadastros MPM (Art. 12, II, b) e c)).
+
+A partir das máscaras de inconsistência já calculadas, monta uma vez por
+arquivo índices ordenados do impacto das correções: quantas edições de campo
+custa validar cada registro, quantos registros ficam válidos corrigindo cada
+campo e cada lotação, e os totais acumulados nessa ordem. As perguntas "quantas
+correções faltam para a meta?" e "qual seria o percentual corrigindo N?" são
+respondidas por busca nesses vetores, sem refazer a detecção.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from cnj_indicadores import categorias, explorador, inconsistencias
+from cnj_indicadores.cache import cache_indicadores, chave_indicador
+from cnj_indicadores.fontes import hash_arquivo, normalizar_texto
+from cnj_indicadores.perfil import modulo_tardio
+
+np = modulo_tardio("numpy")
+pd = modulo_tardio("pandas")
+
+SEM_LOTACAO = "(sem lotação)"
+
+
+@dataclass
+class Simulacao:
+    """Índices de impacto das correções de uma planilha.
+
+    ``custos_acumulados[n - 1]`` é o mínimo de edições de campo para validar
+    ``n`` registros (os de menos campos inválidos primeiro). ``campos`` e
+    ``lotacoes`` estão em ordem decrescente de impacto; ``acumulado_campos[j]``
+    e ``acumulado_lotacoes[j]`` são os registros validados ao corrigir os
+    ``j`` primeiros.
+    """
+
+    total: int
+    inconsistentes: int
+    custos_acumulados: np.ndarray
+    campos: list
+    impacto_campos: np.ndarray
+    invalidos_campos: np.ndarray
+    acumulado_campos: np.ndarray
+    lotacoes: list
+    impacto_lotacoes: np.ndarray
+    acumulado_lotacoes: np.ndarray
+
+    def percentual(self, corrigidos=0):
+        """Percentual de inconsistência após validar ``corrigidos`` registros."""
+        restantes = max(self.inconsistentes - corrigidos, 0)
+        return (restantes / self.total * 100) if self.total > 0 else 0
+
+    def necessarios(self, meta):
+        """Registros que ainda precisam ser validados para o percentual ficar ≤ ``meta``."""
+        # Tolerância para metas como 5% de 300 registros (15,000000000000002)
+        permitidos = int(np.floor(meta * self.total / 100 + 1e-9))
+        return max(self.inconsistentes - permitidos, 0)
+
+    def edicoes(self, registros):
+        """Mínimo de edições de campo para validar ``registros`` registros."""
+        registros = min(registros, self.inconsistentes)
+        return int(self.custos_acumulados[registros - 1]) if registros > 0 else 0
+
+    def minimo_para_meta(self, meta):
+        """Menor correção que leva o percentual a ≤ ``meta``, por registros, campos e lotações."""
+        registros = self.necessarios(meta)
+        return {
+            "registros": registros,
+            "edicoes": self.edicoes(registros),
+            "campos": int(np.searchsorted(self.acumulado_campos, registros)),
+            "lotacoes": int(np.searchsorted(self.acumulado_lotacoes, registros)),
+        }
+
+    def tabela_campos(self):
+        """Campos na ordem de correção, com o impacto individual e o acumulado."""
+        acumulado = self.acumulado_campos[1:]
+        return pd.DataFrame({
+            "campo": self.campos,
+            "invalidos": self.invalidos_campos,
+            "validados_sozinho": self.impacto_campos,
+            "validados_acumulado": acumulado,
+            "percentual_apos": [self.percentual(corrigidos) for corrigidos in acumulado],
+        })
+
+    def tabela_lotacoes(self):
+        """Lotações na ordem de correção, com os registros inconsistentes e o acumulado."""
+        acumulado = self.acumulado_lotacoes[1:]
+        return pd.DataFrame({
+            "lotacao": self.lotacoes,
+            "inconsistentes": self.impacto_lotacoes,
+            "validados_acumulado": acumulado,
+            "percentual_apos": [self.percentual(corrigidos) for corrigidos in acumulado],
+        })
+
+
+def _acumulado(ordem_registros, quantidade):
+    # Registros validados depois de corrigir os j primeiros itens: ordem_registros
+    # é a posição do último item de que cada registro inconsistente depende
+    return np.concatenate([[0], np.cumsum(np.bincount(ordem_registros, minlength=quantidade))])
+
+
+def preparar(analise, lotacao=None, lotacoes=None, elegiveis=None):
+    """Índices de impacto a partir de ``analise`` (``ResultadoInconsistencias``).
+
+    ``lotacao`` tem o código em ``lotacoes`` de cada registro (-1 sem
+    lotação) e ``elegiveis`` restringe a simulação à população do indicador.
+    """
+    mascara = np.unpackbits(analise.bits, axis=1, count=analise.total).astype(bool)
+    if elegiveis is not None:
+        mascara = mascara[:, elegiveis]
+    custos = mascara.sum(axis=0)
+    inconsistentes = custos > 0
+
+    # Campos: impacto isolado (registros inválidos só nele), desempate pelo total de inválidos
+    invalidos = mascara.sum(axis=1)
+    impacto = mascara[:, custos == 1].sum(axis=1)
+    ordem = np.lexsort((-invalidos, -impacto))
+    posicao_campo = np.zeros(mascara.shape[1], dtype=np.int64)
+    for posicao, campo in enumerate(ordem):
+        posicao_campo[mascara[campo]] = posicao
+
+    # Lotações: cada uma valida os seus registros inconsistentes
+    if lotacao is None:
+        lotacao = np.full(analise.total, -1)
+    lotacao = np.asarray(lotacao)
+    if elegiveis is not None:
+        lotacao = lotacao[elegiveis]
+    # Lotações "não informado" (em qualquer grafia) ficam junto dos registros sem lotação
+    nomes = list(lotacoes or []) + [SEM_LOTACAO]
+    grupos = np.array([
+        len(nomes) - 1 if normalizar_texto(nome) in inconsistencias.VALORES_NAO_INFORMADO else posicao
+        for posicao, nome in enumerate(nomes)
+    ], dtype=np.int64)
+    codigos = grupos[np.where(lotacao < 0, len(nomes) - 1, lotacao)[inconsistentes]]
+    por_lotacao = np.bincount(codigos, minlength=len(nomes))
+    ordem_lotacoes = np.argsort(-por_lotacao, kind="stable")
+    ordem_lotacoes = ordem_lotacoes[por_lotacao[ordem_lotacoes] > 0]
+    posicao_lotacao = np.empty(len(nomes), dtype=np.int64)
+    posicao_lotacao[ordem_lotacoes] = np.arange(len(ordem_lotacoes))
+
+    return Simulacao(
+        total=int(mascara.shape[1]),
+        inconsistentes=int(inconsistentes.sum()),
+        custos_acumulados=np.cumsum(np.sort(custos[inconsistentes])),
+        campos=[analise.campos[campo] for campo in ordem],
+        impacto_campos=impacto[ordem],
+        invalidos_campos=invalidos[ordem],
+        acumulado_campos=_acumulado(posicao_campo[inconsistentes], len(ordem)),
+        lotacoes=[nomes[codigo] for codigo in ordem_lotacoes],
+        impacto_lotacoes=por_lotacao[ordem_lotacoes],
+        acumulado_lotacoes=_acumulado(posicao_lotacao[codigos], len(ordem_lotacoes)),
+    )
+
+
+def simular_fonte(caminho, consideradas=None):
+    """Simulação da planilha, calculada uma vez por conteúdo de arquivo.
+
+    ``consideradas`` são as categorias de vínculo do indicador (ver
+    ``registro.CalculadoraCadastro``); ``None`` considera todos os registros ativos.
+    """
+    def montar():
+        indice = explorador.indexar_fonte(caminho)
+        elegiveis = None
+        if consideradas is not None and indice.analise.categoria is not None:
+            codigos = [list(categorias.CATEGORIAS).index(categoria) for categoria in consideradas]
+            elegiveis = np.isin(indice.analise.categoria, codigos)
+        return preparar(indice.analise, indice.lotacao, indice.lotacoes, elegiveis)
+
+    chave = chave_indicador(hash_arquivo(caminho), "simulacao", consideradas=consideradas)
+    return cache_indicadores.obter_ou_calcular(chave, montar)
@@ -0,0 +1,233 @@
+"""Execução de cálculos longos em segundo plano, com progresso e cancelamento.
+
+As tarefas rodam em um pool de threads do processo, compartilhado por todas
+as sessões do Streamlit, e ficam registradas em uma tabela com estado,
+progresso e resultado. A página agenda a tarefa, termina a execução do script
+e acompanha o andamento por consulta periódica, sem travar os demais
+controles. Tarefas com a mesma ``chave`` (ex.: o mesmo cálculo pedido por duas
+sessões) são executadas uma única vez; cada sessão que aguarda a tarefa fica
+registrada como interessada, e uma sessão que desiste dela só a cancela se
+nenhuma outra ainda a aguarda (:meth:`ExecutorTarefas.liberar`).
+
+O código executado dentro de uma tarefa informa o andamento com
+:func:`informar`, que também interrompe a tarefa (``TarefaCancelada``) quando
+o cancelamento foi pedido. Fora de uma tarefa ``informar`` não faz nada.
+
+Cada tarefa roda em uma cópia do contexto de quem a agendou, com as etapas
+de instrumentação reunidas em ``Tarefa.instrumentacao`` (ver
+``instrumentacao.coletar``), para a página exibi-las quando a tarefa termina.
+"""
+
+import contextvars
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+
+from cnj_indicadores import instrumentacao
+
+TRABALHADORES = int(os.environ.get("CNJ_TAREFAS", "2"))
+
+# Tarefas encerradas permanecem na tabela por este tempo (segundos)
+RETENCAO = 600
+
+# Espera da página pela tarefa antes de seguir com os resultados parciais (segundos)
+ESPERA = float(os.environ.get("CNJ_ESPERA_TAREFA", "0.5"))
+
+NA_FILA = "na_fila"
+EXECUTANDO = "executando"
+CONCLUIDA = "concluida"
+ERRO = "erro"
+CANCELADA = "cancelada"
+
+ROTULOS = {
+    NA_FILA: "⏳ Na fila",
+    EXECUTANDO: "⚙️ Executando",
+    CONCLUIDA: "✅ Concluída",
+    ERRO: "❌ Erro",
+    CANCELADA: "⛔ Cancelada",
+}
+
+_tarefa_atual = ContextVar("tarefa_atual", default=None)
+
+
+class TarefaCancelada(Exception):
+    """Levantada por :func:`informar` quando o cancelamento da tarefa foi pedido."""
+
+
+class Tarefa:
+    """Registro de uma tarefa na tabela: estado, progresso e resultado."""
+
+    def __init__(self, identificador, descricao, chave=None):
+        self.identificador = identificador
+        self.descricao = descricao
+        self.chave = chave
+        self.estado = NA_FILA
+        self.progresso = 0.0
+        self.mensagem = ""
+        self.resultado = None
+        self.erro = None
+        # Resultados já disponíveis antes do fim (ex.: indicadores calculados)
+        self.parcial = {}
+        # Sessões que aguardam a tarefa (ver ExecutorTarefas.liberar)
+        self.interessados = set()
+        self.criada_em = time.time()
+        self.inicio = None
+        self.fim = None
+        # Etapas e contadores registrados durante a execução (instrumentacao.Execucao)
+        self.instrumentacao = None
+        self._cancelamento = threading.Event()
+        self._encerramento = threading.Event()
+
+    @property
+    def encerrada(self):
+        return self.estado in (CONCLUIDA, ERRO, CANCELADA)
+
+    @property
+    def cancelamento_pedido(self):
+        return self._cancelamento.is_set()
+
+    @property
+    def duracao(self):
+        if self.inicio is None:
+            return 0.0
+        return (self.fim or time.time()) - self.inicio
+
+    def cancelar(self):
+        """Pede o cancelamento; a tarefa para no próximo :func:`informar` (ou antes de começar).
+
+        Vale para todos os interessados: as páginas usam :meth:`ExecutorTarefas.liberar`.
+        """
+        self._cancelamento.set()
+
+    def aguardar(self, tempo=None):
+        """Espera o fim da tarefa por até ``tempo`` segundos; ``True`` se ela terminou."""
+        return self._encerramento.wait(tempo)
+
+    def _encerrar(self, estado):
+        self.estado = estado
+        self.fim = time.time()
+        self._encerramento.set()
+
+
+class ExecutorTarefas:
+    """Pool de threads com a tabela de tarefas do processo."""
+
+    def __init__(self, trabalhadores=TRABALHADORES, retencao=RETENCAO):
+        self.trabalhadores = trabalhadores
+        self.retencao = retencao
+        self._executor = None
+        self._tarefas = OrderedDict()
+        self._identificadores = itertools.count(1)
+        self._trava = threading.Lock()
+
+    def _pool(self):
+        # Criado na primeira tarefa, para não iniciar threads em quem só importa o módulo
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.trabalhadores, thread_name_prefix="cnj-tarefa")
+        return self._executor
+
+    def _descartar_antigas(self):
+        limite = time.time() - self.retencao
+        for identificador in [i for i, t in self._tarefas.items() if t.encerrada and t.fim < limite]:
+            del self._tarefas[identificador]
+
+    def submeter(self, descricao, funcao, *args, chave=None, interessado=None, **kwargs):
+        """Agenda ``funcao(*args, **kwargs)`` e devolve a ``Tarefa``.
+
+        Com ``chave``, uma tarefa com a mesma chave ainda na fila, em execução
+        ou concluída com sucesso (e sem cancelamento pedido) é devolvida no
+        lugar de uma nova. ``interessado`` (ex.: o identificador da sessão) é
+        acrescentado aos interessados da tarefa, nova ou reaproveitada.
+        """
+        with self._trava:
+            self._descartar_antigas()
+            if chave is not None:
+                for tarefa in reversed(self._tarefas.values()):
+                    if (
+                        tarefa.chave == chave and tarefa.estado in (NA_FILA, EXECUTANDO, CONCLUIDA)
+                        and not tarefa.cancelamento_pedido
+                    ):
+                        if interessado is not None:
+                            tarefa.interessados.add(interessado)
+                        return tarefa
+            tarefa = Tarefa(next(self._identificadores), descricao, chave)
+            if interessado is not None:
+                tarefa.interessados.add(interessado)
+            self._tarefas[tarefa.identificador] = tarefa
+            # Cópia do contexto: o que a tarefa define nele não vaza para as próximas da mesma thread
+            self._pool().submit(contextvars.copy_context().run, self._executar, tarefa, funcao, args, kwargs)
+        return tarefa
+
+    def _executar(self, tarefa, funcao, args, kwargs):
+        if tarefa.cancelamento_pedido:
+            tarefa._encerrar(CANCELADA)
+            return
+        _tarefa_atual.set(tarefa)
+        tarefa.instrumentacao = instrumentacao.coletar()
+        tarefa.estado = EXECUTANDO
+        tarefa.inicio = time.time()
+        try:
+            tarefa.resultado = funcao(*args, **kwargs)
+        except TarefaCancelada:
+            tarefa._encerrar(CANCELADA)
+        except Exception as exc:  # o erro fica registrado na tarefa para a página exibir
+            tarefa.erro = f"{type(exc).__name__}: {exc}"
+            tarefa._encerrar(ERRO)
+        else:
+            tarefa.progresso = 1.0
+            tarefa._encerrar(CONCLUIDA)
+
+    def obter(self, identificador):
+        with self._trava:
+            return self._tarefas.get(identificador)
+
+    def listar(self):
+        """Tarefas da tabela, da mais recente para a mais antiga."""
+        with self._trava:
+            self._descartar_antigas()
+            return list(reversed(self._tarefas.values()))
+
+    def liberar(self, identificador, interessado):
+        """Retira ``interessado`` da tarefa e pede o cancelamento se ninguém mais a aguarda.
+
+        Devolve a tarefa, ou ``None`` se ela não está na tabela.
+        """
+        with self._trava:
+            tarefa = self._tarefas.get(identificador)
+            if tarefa is not None:
+                tarefa.interessados.discard(interessado)
+                if not tarefa.interessados:
+                    tarefa.cancelar()
+        return tarefa
+
+    def estatisticas(self):
+        with self._trava:
+            estados = [tarefa.estado for tarefa in self._tarefas.values()]
+        return {estado: estados.count(estado) for estado in ROTULOS}
+
+
+def informar(fracao=None, mensagem=None, parcial=None):
+    """Atualiza o andamento da tarefa atual, se houver, e a interrompe se foi cancelada.
+
+    ``fracao`` (0 a 1) e ``mensagem`` substituem os valores anteriores;
+    ``parcial`` é acrescentado aos resultados parciais da tarefa.
+    """
+    tarefa = _tarefa_atual.get()
+    if tarefa is None:
+        return
+    if tarefa.cancelamento_pedido:
+        raise TarefaCancelada(tarefa.descricao)
+    if fracao is not None:
+        tarefa.progresso = min(max(float(fracao), 0.0), 1.0)
+    if mensagem is not None:
+        tarefa.mensagem = mensagem
+    if parcial:
+        tarefa.parcial.update(parcial)
+
+
+# Instância única do processo, compartilhada pelas sessões do Streamlit
+executor_tarefas = ExecutorTarefas()
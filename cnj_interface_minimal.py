@@ -1,6 +1,16 @@
 import streamlit as st
-import pandas as pd
-from datetime import datetime
+
+from cnj_indicadores import perfil
+
+# Perfil de inicialização (CNJ_PERFIL=1): instalado antes das demais importações para medi-las
+medidor = perfil.iniciar()
+
+from datetime import date
+
+from cnj_indicadores import datajud, fontes, instrumentacao, interface_comum, registro
+
+# Importado só quando a tabela resumo é montada (painel aberto)
+pd = perfil.modulo_tardio("pandas")
 
 # Configuração da página
 st.set_page_config(
@@ -9,6 +19,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# Instrumentação desta execução (?instrumentar=1 ou CNJ_INSTRUMENTAR=1), com as marcas do perfil de inicialização
+execucao = instrumentacao.iniciar(st.query_params.get("instrumentar"), medidor)
+
 # CSS minimalista e profissional
 st.markdown("""
 <style>
@@ -95,6 +108,7 @@ st.markdown("""
 st.markdown('<h1 class="main-title">⚖️ Sistema de Indicadores - Prêmio CNJ de Qualidade</h1>', unsafe_allow_html=True)
 st.markdown('<p class="main-subtitle">Eixo Dados e Tecnologia • Módulo de Pessoal e Estrutura Judiciária Mensal (MPM)</p>', unsafe_allow_html=True)
 
+execucao.marcar("fontes")
 # Barra de seleção de fontes de dados (compacta)
 with st.container():
     col1, col2, col3 = st.columns([2, 2, 1])
@@ -102,14 +116,14 @@ with st.container():
     with col1:
         fonte_mag = st.selectbox(
             "📁 Fonte Magistrados",
-            ["MPM_Magistrados_2025_07.xlsx", "MPM_Magistrados_2025_06.xlsx", "MPM_Magistrados_2025_05.xlsx"],
+            fontes.listar_fontes("Magistrados") or ["MPM_Magistrados_2025_07.xlsx", "MPM_Magistrados_2025_06.xlsx", "MPM_Magistrados_2025_05.xlsx"],
             label_visibility="collapsed"
         )
     
     with col2:
         fonte_serv = st.selectbox(
             "📁 Fonte Servidores",
-            ["MPM_Servidores_2025_07.xlsx", "MPM_Servidores_2025_06.xlsx", "MPM_Servidores_2025_05.xlsx"],
+            fontes.listar_fontes("Servidores") or ["MPM_Servidores_2025_07.xlsx", "MPM_Servidores_2025_06.xlsx", "MPM_Servidores_2025_05.xlsx"],
             label_visibility="collapsed"
         )
     
@@ -117,177 +131,182 @@ with st.container():
         if st.button("⚙️ Configurações"):
             st.info("Módulo de configurações em desenvolvimento")
 
+# Fontes selecionadas (lidas do cache em Parquet apenas quando um cálculo precisa delas)
+caminhos = {
+    "magistrados": fontes.caminho_fonte(fonte_mag),
+    "servidores": fontes.caminho_fonte(fonte_serv),
+    "datajud": datajud.DIRETORIO_DATAJUD if datajud.listar_exportacoes() else None,
+}
+data_ref = fontes.data_referencia(fonte_mag) or date(2025, 7, 31)
+
 st.markdown(f"""
 <div class="data-source-bar">
-    📊 <strong>Fontes ativas:</strong> Magistrados: {fonte_mag} | Servidores: {fonte_serv} | Referência: 31/07/2025
+    📊 <strong>Fontes ativas:</strong> Magistrados: {fonte_mag} | Servidores: {fonte_serv} | Referência: {data_ref:%d/%m/%Y}
 </div>
 """, unsafe_allow_html=True)
+for nome_fonte, caminho in [(fonte_mag, caminhos["magistrados"]), (fonte_serv, caminhos["servidores"])]:
+    if caminho is None:
+        st.warning(f"Arquivo {nome_fonte} não encontrado em {fontes.DIRETORIO_DADOS}/. Informe os valores manualmente.")
 
-# Grid de indicadores
-st.markdown("### 📈 Indicadores Implementados")
+execucao.marcar("calculo")
+# Indicadores do registro e parâmetros dos cálculos (cada cartão calcula o seu indicador ao ser desenhado)
+indicadores = registro.indicadores()
+implementados = [indicador for indicador in indicadores if indicador.implementado]
+em_desenvolvimento = [indicador for indicador in indicadores if not indicador.implementado]
+parametros = {"data_referencia": data_ref}
 
-# Primeira linha de indicadores
-col1, col2 = st.columns(2)
+# Cálculos em segundo plano e valores manuais (usados também pelo resumo e pela exportação)
+interface_comum.iniciar_sessao()
 
-with col1:
+
+def calcular_em_segundo_plano(selecionados, local=None):
+    """Resultados dos ``selecionados`` calculados em segundo plano (ver ``interface_comum``)."""
+    return interface_comum.calcular_em_segundo_plano(selecionados, caminhos, parametros, local=local)
+
+
+@st.fragment
+def cartao_indicador(indicador):
+    """Cartão de um indicador, calculado ao ser desenhado; ao editar os valores manuais só o cartão é reexecutado."""
+    calculadora = indicador.calculadora
     with st.container():
         st.markdown('<div class="indicator-card">', unsafe_allow_html=True)
-        st.markdown('<div class="indicator-ref">Art. 12, II, b)</div>', unsafe_allow_html=True)
-        st.markdown('<div class="indicator-name">Cadastro de Magistrados(as)</div>', unsafe_allow_html=True)
-        st.markdown('<div class="indicator-meta">Meta: ≤ 5% inconsistências • 20 pontos</div>', unsafe_allow_html=True)
+        st.markdown(f'<div class="indicator-ref">{indicador.ref}</div>', unsafe_allow_html=True)
+        st.markdown(f'<div class="indicator-name">{indicador.nome}</div>', unsafe_allow_html=True)
+        st.markdown(f'<div class="indicator-meta">Meta: {indicador.texto_meta} • {indicador.pontos_max} pontos</div>', unsafe_allow_html=True)
         
-        # Inputs inline
-        col_a, col_b = st.columns(2)
-        with col_a:
-            total_mag = st.number_input("Total ativos", min_value=1, value=150, key="mag_total", label_visibility="visible")
-        with col_b:
-            incons_mag = st.number_input("Inconsistências", min_value=0, value=5, key="mag_incons", label_visibility="visible")
+        # Cálculo em segundo plano (progresso no lugar do resultado enquanto roda)
+        resultados = calcular_em_segundo_plano([indicador])
+        pendente = resultados is None
+        resultado = None if pendente else resultados.get(indicador.ref)
         
-        # Cálculo
-        perc_mag = (incons_mag / total_mag * 100) if total_mag > 0 else 0
-        aprovado_mag = perc_mag <= 5.0
-        pontos_mag = 20 if aprovado_mag else 0
+        # Inputs inline
+        if resultado is not None:
+            # Valores derivados das fontes carregadas
+            metricas = calculadora.metricas(resultado)
+            for coluna_metrica, (rotulo, valor) in zip(st.columns(len(metricas)), metricas):
+                with coluna_metrica:
+                    st.metric(rotulo, valor)
+        elif not pendente and getattr(calculadora, "aceita_entrada_manual", False):
+            padrao = interface_comum.valores_manuais([indicador], st.session_state.manuais)[indicador.ref]
+            prefixo = "mag" if indicador.tipo == "magistrados" else "serv"
+            col_a, col_b = st.columns(2)
+            with col_a:
+                total = st.number_input("Total ativos", min_value=1, value=padrao[0], key=f"{prefixo}_total", label_visibility="visible")
+            with col_b:
+                inconsistentes = st.number_input("Inconsistências", min_value=0, value=padrao[1], key=f"{prefixo}_incons", label_visibility="visible")
+            st.session_state.manuais[indicador.ref] = (total, inconsistentes)
+            resultado = calculadora.calcular_manual(indicador, total, inconsistentes)
         
         # Resultado
-        st.markdown(f"""
-        <div class="result-container">
-            <div>
-                <span class="result-percentage {'status-approved' if aprovado_mag else 'status-rejected'}">{perc_mag:.2f}%</span>
-                <span style="margin-left: 10px;">{'✅' if aprovado_mag else '❌'}</span>
+        if resultado is not None:
+            aprovado = resultado["aprovado"]
+            st.markdown(f"""
+            <div class="result-container">
+                <div>
+                    <span class="result-percentage {'status-approved' if aprovado else 'status-rejected'}">{resultado["percentual"]:.2f}%</span>
+                    <span style="margin-left: 10px;">{'✅' if aprovado else '❌'}</span>
+                </div>
+                <div class="result-points">{resultado["pontos"]}/{indicador.pontos_max} pts</div>
             </div>
-            <div class="result-points">{pontos_mag}/20 pts</div>
-        </div>
-        """, unsafe_allow_html=True)
+            """, unsafe_allow_html=True)
         st.markdown('</div>', unsafe_allow_html=True)
 
-with col2:
-    with st.container():
-        st.markdown('<div class="indicator-card">', unsafe_allow_html=True)
-        st.markdown('<div class="indicator-ref">Art. 12, II, c)</div>', unsafe_allow_html=True)
-        st.markdown('<div class="indicator-name">Cadastro de Servidores(as)</div>', unsafe_allow_html=True)
-        st.markdown('<div class="indicator-meta">Meta: ≤ 5% inconsistências • 20 pontos</div>', unsafe_allow_html=True)
-        
-        # Inputs inline
-        col_a, col_b = st.columns(2)
-        with col_a:
-            total_serv = st.number_input("Total ativos", min_value=1, value=800, key="serv_total", label_visibility="visible")
-        with col_b:
-            incons_serv = st.number_input("Inconsistências", min_value=0, value=30, key="serv_incons", label_visibility="visible")
-        
-        # Cálculo
-        perc_serv = (incons_serv / total_serv * 100) if total_serv > 0 else 0
-        aprovado_serv = perc_serv <= 5.0
-        pontos_serv = 20 if aprovado_serv else 0
+
+def resumo_geral():
+    """Métricas e tabela de todos os indicadores (calculados em segundo plano só com o painel aberto)."""
+    resultados = calcular_em_segundo_plano(indicadores, local="resumo")
+    if resultados is None:
+        return
+    resultados = interface_comum.completar_manuais(resultados, indicadores, st.session_state.manuais)
+    
+    # Métricas resumidas
+    pontos_possiveis = sum(indicador.pontos_max for indicador in implementados)
+    total_obtidos = sum(resultado["pontos"] for resultado in resultados.values())
+    
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        st.metric("Indicadores Ativos", f"{len(implementados)} de {registro.TOTAL_INDICADORES_EIXO}")
+    with col2:
+        st.metric("Pontos Possíveis", f"{pontos_possiveis}")
+    with col3:
+        st.metric("Pontos Obtidos", f"{total_obtidos}")
+    with col4:
+        aproveitamento = (total_obtidos / pontos_possiveis * 100) if pontos_possiveis > 0 else 0
+        st.metric("Aproveitamento", f"{aproveitamento:.0f}%")
+    
+    # Tabela resumo
+    with instrumentacao.etapa("tabela resumo"):
+        resumo_df = pd.DataFrame([
+            {
+                'Artigo': indicador.ref,
+                'Indicador': indicador.nome,
+                'Meta': indicador.texto_meta,
+                'Resultado': f'{resultados[indicador.ref]["percentual"]:.2f}%' if indicador.ref in resultados else '-',
+                'Pontos': f'{resultados[indicador.ref]["pontos"] if indicador.ref in resultados else 0}/{indicador.pontos_max}',
+                'Status': ('✅' if resultados[indicador.ref]["aprovado"] else '❌') if indicador.ref in resultados else '⏳'
+            }
+            for indicador in indicadores
+        ])
         
-        # Resultado
-        st.markdown(f"""
-        <div class="result-container">
-            <div>
-                <span class="result-percentage {'status-approved' if aprovado_serv else 'status-rejected'}">{perc_serv:.2f}%</span>
-                <span style="margin-left: 10px;">{'✅' if aprovado_serv else '❌'}</span>
-            </div>
-            <div class="result-points">{pontos_serv}/20 pts</div>
-        </div>
-        """, unsafe_allow_html=True)
-        st.markdown('</div>', unsafe_allow_html=True)
+        st.dataframe(
+            resumo_df,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                'Artigo': st.column_config.TextColumn('Referência', width='small'),
+                'Status': st.column_config.TextColumn('Status', width='small', help='✅ Aprovado | ❌ Reprovado | ⏳ Em desenvolvimento')
+            }
+        )
 
-# Segunda linha - Indicadores futuros (placeholder)
-st.markdown("### 🔄 Em Desenvolvimento")
 
-col3, col4 = st.columns(2)
+execucao.marcar("cartoes")
+# Progresso dos cálculos em segundo plano (preenchido ao final da página)
+area_progresso = st.container()
 
-with col3:
-    with st.container():
-        st.markdown("""
-        <div class="indicator-card" style="background: #f8f9fa; opacity: 0.7;">
-            <div class="indicator-ref">Art. 12, I</div>
-            <div class="indicator-name">Alimentar DataJud</div>
-            <div class="indicator-meta">174 pontos • Em implementação</div>
-        </div>
-        """, unsafe_allow_html=True)
-
-with col4:
-    with st.container():
-        st.markdown("""
-        <div class="indicator-card" style="background: #f8f9fa; opacity: 0.7;">
-            <div class="indicator-ref">Art. 12, III</div>
-            <div class="indicator-name">Saneamento DataJud por Unidade</div>
-            <div class="indicator-meta">30 pontos • Em implementação</div>
-        </div>
-        """, unsafe_allow_html=True)
-
-# Resumo Geral
-st.markdown("---")
-st.markdown("### 📊 Resumo Geral dos Indicadores")
+# Grid de indicadores
+st.markdown("### 📈 Indicadores Implementados")
 
-# Métricas resumidas
-col1, col2, col3, col4 = st.columns(4)
+# Indicadores em linhas de dois cartões
+for inicio in range(0, len(implementados), 2):
+    for coluna, indicador in zip(st.columns(2), implementados[inicio:inicio + 2]):
+        with coluna:
+            cartao_indicador(indicador)
 
-with col1:
-    st.metric("Indicadores Ativos", "2 de 11")
-with col2:
-    st.metric("Pontos Possíveis", "40")
-with col3:
-    total_obtidos = pontos_mag + pontos_serv
-    st.metric("Pontos Obtidos", f"{total_obtidos}")
-with col4:
-    aproveitamento = (total_obtidos / 40 * 100) if 40 > 0 else 0
-    st.metric("Aproveitamento", f"{aproveitamento:.0f}%")
-
-# Tabela resumo
-resumo_df = pd.DataFrame({
-    'Artigo': ['Art. 12, II, b)', 'Art. 12, II, c)', 'Art. 12, I', 'Art. 12, III', 'Art. 12, IV', 'Art. 12, V'],
-    'Indicador': [
-        'Cadastro de Magistrados(as)',
-        'Cadastro de Servidores(as)',
-        'Alimentar DataJud',
-        'Saneamento DataJud',
-        'Processos Eletrônicos',
-        'iGovTIC-JUD'
-    ],
-    'Meta': ['≤ 5%', '≤ 5%', '100%', '100%', '100%', 'Satisfatório'],
-    'Resultado': [
-        f'{perc_mag:.2f}%',
-        f'{perc_serv:.2f}%',
-        '-',
-        '-',
-        '-',
-        '-'
-    ],
-    'Pontos': [
-        f'{pontos_mag}/20',
-        f'{pontos_serv}/20',
-        '0/174',
-        '0/30',
-        '0/50',
-        '0/60'
-    ],
-    'Status': [
-        '✅' if aprovado_mag else '❌',
-        '✅' if aprovado_serv else '❌',
-        '⏳',
-        '⏳',
-        '⏳',
-        '⏳'
-    ]
-})
-
-st.dataframe(
-    resumo_df,
-    use_container_width=True,
-    hide_index=True,
-    column_config={
-        'Artigo': st.column_config.TextColumn('Referência', width='small'),
-        'Status': st.column_config.TextColumn('Status', width='small', help='✅ Aprovado | ❌ Reprovado | ⏳ Em desenvolvimento')
-    }
-)
+# Indicadores futuros (placeholder)
+st.markdown("### 🔄 Em Desenvolvimento")
+
+for inicio in range(0, len(em_desenvolvimento), 2):
+    for coluna, indicador in zip(st.columns(2), em_desenvolvimento[inicio:inicio + 2]):
+        with coluna:
+            with st.container():
+                st.markdown(f"""
+                <div class="indicator-card" style="background: #f8f9fa; opacity: 0.7;">
+                    <div class="indicator-ref">{indicador.ref}</div>
+                    <div class="indicator-name">{indicador.nome}</div>
+                    <div class="indicator-meta">{indicador.pontos_max} pontos • Em implementação</div>
+                </div>
+                """, unsafe_allow_html=True)
+
+execucao.marcar("resumo")
+# Resumo Geral (todos os indicadores calculados só com o painel aberto)
+st.markdown("---")
+painel_resumo = st.expander("📊 Resumo Geral dos Indicadores", key="painel_resumo", on_change="rerun")
+with painel_resumo:
+    if painel_resumo.open:
+        resumo_geral()
 
+execucao.marcar("rodape")
 # Rodapé com ações
 col1, col2, col3 = st.columns([1, 1, 1])
 
 with col1:
-    if st.button("📥 Exportar Relatório", use_container_width=True):
-        st.success("Relatório exportado!")
+    # Resultado do cálculo de todos os indicadores (agendado só com o popover aberto) e
+    # valores manuais da sessão no momento do download
+    popover_exportar = st.popover("📥 Exportar Relatório", use_container_width=True, key="popover_exportar", on_change="rerun")
+    with popover_exportar:
+        if popover_exportar.open:
+            interface_comum.exportar(indicadores, caminhos, parametros, horizontal=True)
 
 with col2:
     if st.button("📊 Ver Histórico", use_container_width=True):
@@ -296,3 +315,9 @@ with col2:
 with col3:
     if st.button("ℹ️ Sobre o Prêmio CNJ", use_container_width=True):
         st.info("Base Legal: Ato CNJ nº 5880/2024 • Portaria nº 411/2024")
+
+# Um único acompanhamento para os cálculos agendados pelos cartões, pelo resumo e pela exportação
+with area_progresso:
+    interface_comum.acompanhar_calculos()
+
+execucao.exibir()
@@ -1,7 +1,18 @@
 import streamlit as st
-import pandas as pd
+
+from cnj_indicadores import perfil
+
+# Perfil de inicialização (CNJ_PERFIL=1): instalado antes das demais importações para medi-las
+medidor = perfil.iniciar()
+
 from datetime import datetime
 
+from cnj_indicadores import datajud, fontes, ingestao, instrumentacao, interface_comum, registro
+
+# Importados só quando a página monta uma tabela
+pd = perfil.modulo_tardio("pandas")
+categorias = perfil.modulo_tardio("cnj_indicadores.categorias")
+
 # Configuração da página
 st.set_page_config(
     page_title="Prêmio CNJ - Indicadores",
@@ -9,6 +20,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# Instrumentação desta execução (?instrumentar=1 ou CNJ_INSTRUMENTAR=1), com as marcas do perfil de inicialização
+execucao = instrumentacao.iniciar(st.query_params.get("instrumentar"), medidor)
+
 # CSS clean e minimalista
 st.markdown("""
 <style>
@@ -84,7 +98,12 @@ if 'fonte_magistrados' not in st.session_state:
     st.session_state.fonte_magistrados = None
 if 'fonte_servidores' not in st.session_state:
     st.session_state.fonte_servidores = None
+if 'uploads' not in st.session_state:
+    st.session_state.uploads = {}
+# Cálculos em segundo plano e valores manuais (mantidos entre as abas)
+interface_comum.iniciar_sessao()
 
+execucao.marcar("barra_lateral")
 # Sidebar
 with st.sidebar:
     st.markdown("### ⚙️ Configurações")
@@ -94,27 +113,56 @@ with st.sidebar:
         st.markdown("##### Planilhas de Magistrados")
         fonte_mag = st.selectbox(
             "Selecione a planilha",
-            ["MPM_Magistrados_2025_07.xlsx", "MPM_Magistrados_2025_06.xlsx", 
-             "MPM_Magistrados_2025_05.xlsx", "Carregar nova..."],
+            (fontes.listar_fontes("Magistrados") or ["MPM_Magistrados_2025_07.xlsx", "MPM_Magistrados_2025_06.xlsx",
+             "MPM_Magistrados_2025_05.xlsx"]) + ["Carregar nova..."],
             key="sel_mag"
         )
         
         st.markdown("##### Planilhas de Servidores")
         fonte_serv = st.selectbox(
             "Selecione a planilha",
-            ["MPM_Servidores_2025_07.xlsx", "MPM_Servidores_2025_06.xlsx", 
-             "MPM_Servidores_2025_05.xlsx", "Carregar nova..."],
+            (fontes.listar_fontes("Servidores") or ["MPM_Servidores_2025_07.xlsx", "MPM_Servidores_2025_06.xlsx",
+             "MPM_Servidores_2025_05.xlsx"]) + ["Carregar nova..."],
             key="sel_serv"
         )
         
         if fonte_mag == "Carregar nova..." or fonte_serv == "Carregar nova...":
             uploaded_file = st.file_uploader("Carregar arquivo", type=['xlsx', 'csv'])
+            
+            # Processar o arquivo em blocos uma única vez por upload
+            if uploaded_file is not None and uploaded_file.file_id not in st.session_state.uploads:
+                barra = st.progress(0.0, text="Processando arquivo...")
+                
+                def atualizar_progresso(fracao, linhas):
+                    barra.progress(fracao or 0.0, text=f"Processando arquivo... {linhas:,} linhas lidas".replace(",", "."))
+                
+                referencia_upload = fontes.referencia_fonte(uploaded_file.name)
+                if referencia_upload:
+                    tipo_upload = referencia_upload[0]
+                else:
+                    tipo_upload = "magistrados" if fonte_mag == "Carregar nova..." else "servidores"
+                
+                st.session_state.uploads[uploaded_file.file_id] = {
+                    "tipo": tipo_upload,
+                    "id": uploaded_file.file_id,
+                    "nome": uploaded_file.name,
+                    "contagem": ingestao.processar_fluxo(uploaded_file, uploaded_file.name, progresso=atualizar_progresso),
+                }
+                barra.empty()
+            
+            if uploaded_file is not None:
+                upload = st.session_state.uploads[uploaded_file.file_id]
+                if fonte_mag == "Carregar nova..." and upload["tipo"] == "magistrados":
+                    st.session_state.fonte_magistrados = upload
+                if fonte_serv == "Carregar nova..." and upload["tipo"] == "servidores":
+                    st.session_state.fonte_servidores = upload
+                st.caption(f"{upload['nome']}: {upload['contagem'].linhas_lidas} linhas ({upload['tipo']})")
     
     st.markdown("---")
     
     # Filtros
     st.markdown("### 📊 Filtros")
-    periodo_ref = st.date_input("Período de Referência", value=datetime(2025, 7, 31))
+    periodo_ref = st.date_input("Período de Referência", value=fontes.data_referencia(fonte_mag) or datetime(2025, 7, 31))
     
     # Ações
     st.markdown("---")
@@ -123,13 +171,53 @@ with st.sidebar:
         if st.button("🔄 Atualizar", use_container_width=True):
             st.rerun()
     with col2:
-        if st.button("💾 Exportar", use_container_width=True):
-            st.success("Exportado!")
+        # Preenchido depois do cálculo dos indicadores
+        area_exportar = st.empty()
 
+execucao.marcar("fontes")
 # Área principal
 st.markdown('<h1 class="main-header">Sistema de Indicadores - Prêmio CNJ de Qualidade</h1>', unsafe_allow_html=True)
 st.markdown('<p class="subtitle">Eixo Dados e Tecnologia - Módulo de Pessoal e Estrutura Judiciária Mensal (MPM)</p>', unsafe_allow_html=True)
 
+# Fontes selecionadas (lidas do cache em Parquet apenas quando um cálculo precisa delas)
+caminhos = {
+    "magistrados": fontes.caminho_fonte(fonte_mag),
+    "servidores": fontes.caminho_fonte(fonte_serv),
+    "datajud": datajud.DIRETORIO_DATAJUD if datajud.listar_exportacoes() else None,
+}
+
+# Arquivos enviados pelo usuário substituem a planilha quando "Carregar nova..." está selecionado
+enviados = {}
+if fonte_mag == "Carregar nova..." and st.session_state.fonte_magistrados:
+    enviados["magistrados"] = (st.session_state.fonte_magistrados["id"], st.session_state.fonte_magistrados["contagem"])
+if fonte_serv == "Carregar nova..." and st.session_state.fonte_servidores:
+    enviados["servidores"] = (st.session_state.fonte_servidores["id"], st.session_state.fonte_servidores["contagem"])
+
+# Indicadores do registro e parâmetros dos cálculos
+indicadores = registro.indicadores()
+implementados = [indicador for indicador in indicadores if indicador.implementado]
+total_pontos_possiveis = sum(indicador.pontos_max for indicador in implementados)
+parametros = {"data_referencia": periodo_ref}
+
+
+def calcular_em_segundo_plano(selecionados, local=None):
+    """Resultados dos ``selecionados`` calculados em segundo plano (ver ``interface_comum``)."""
+    return interface_comum.calcular_em_segundo_plano(selecionados, caminhos, parametros, enviados, local=local)
+
+
+execucao.marcar("exportacao")
+# Exportação do relatório com o resultado do cálculo de todos os indicadores, agendado só com o
+# popover aberto, e os valores manuais da sessão no momento do download (editados nos cartões
+# sem refazer esta parte)
+with area_exportar.container():
+    popover_exportar = st.popover("💾 Exportar", use_container_width=True, key="popover_exportar", on_change="rerun")
+    with popover_exportar:
+        if popover_exportar.open:
+            interface_comum.exportar(indicadores, caminhos, parametros, enviados, rotulo="Baixar")
+
+# Progresso dos cálculos em segundo plano (preenchido ao final da página)
+area_progresso = st.container()
+
 # Alerta sobre fontes de dados selecionadas
 if fonte_mag and fonte_serv:
     st.markdown(f"""
@@ -137,101 +225,92 @@ if fonte_mag and fonte_serv:
     📁 <strong>Fontes ativas:</strong> Magistrados: {fonte_mag} | Servidores: {fonte_serv}
     </div>
     """, unsafe_allow_html=True)
+    for nome_fonte, caminho in [(fonte_mag, caminhos["magistrados"]), (fonte_serv, caminhos["servidores"])]:
+        if caminho is None and nome_fonte != "Carregar nova...":
+            st.warning(f"Arquivo {nome_fonte} não encontrado em {fontes.DIRETORIO_DADOS}/. Informe os valores manualmente.")
 
-# Tabs para organizar indicadores
-tab1, tab2, tab3 = st.tabs(["📊 Cálculo de Indicadores", "📋 Resumo Geral", "ℹ️ Informações"])
-
-with tab1:
-    # Indicador 1 - Magistrados
-    st.markdown('<div class="indicator-box">', unsafe_allow_html=True)
-    
-    col1, col2 = st.columns([2, 1])
-    
-    with col1:
-        st.markdown('<div class="indicator-title">Cadastro de Magistrados(as)</div>', unsafe_allow_html=True)
-        st.markdown('<span class="reference-badge">Art. 12, II, b) • 20 pontos</span>', unsafe_allow_html=True)
-        
-        st.markdown("""
-        <p class="info-text">
-        Até 5,00% de magistrados(as) ativos com registro de inconsistência ou com ausência 
-        de informação no sistema MPM. Campos preenchidos com "não informado" serão considerados inválidos.
-        </p>
-        """, unsafe_allow_html=True)
-        
-        # Inputs
-        col_input1, col_input2 = st.columns(2)
-        with col_input1:
-            total_mag = st.number_input("Total de magistrados(as) ativos", min_value=1, value=150, key="total_mag_v2")
-        with col_input2:
-            incons_mag = st.number_input("Com inconsistências", min_value=0, value=5, key="incons_mag_v2")
-    
-    with col2:
-        # Cálculo
-        perc_mag = (incons_mag / total_mag * 100) if total_mag > 0 else 0
-        aprovado_mag = perc_mag <= 5.0
-        pontos_mag = 20 if aprovado_mag else 0
-        
-        # Resultado
-        st.markdown('<div class="result-metric">', unsafe_allow_html=True)
-        st.markdown(f'<div class="metric-value" style="color: {"#28a745" if aprovado_mag else "#dc3545"};">{perc_mag:.2f}%</div>', unsafe_allow_html=True)
-        st.markdown(f'<div class="metric-label">{"✅ Aprovado" if aprovado_mag else "❌ Reprovado"} • {pontos_mag}/20 pts</div>', unsafe_allow_html=True)
-        st.markdown('</div>', unsafe_allow_html=True)
+@st.fragment
+def cartao_indicador(indicador):
+    """Cartão de um indicador; ao editar os valores manuais só o cartão é reexecutado."""
+    calculadora = indicador.calculadora
     
-    st.markdown('</div>', unsafe_allow_html=True)
-    
-    # Indicador 2 - Servidores
     st.markdown('<div class="indicator-box">', unsafe_allow_html=True)
     
     col1, col2 = st.columns([2, 1])
     
     with col1:
-        st.markdown('<div class="indicator-title">Cadastro de Servidores(as)</div>', unsafe_allow_html=True)
-        st.markdown('<span class="reference-badge">Art. 12, II, c) • 20 pontos</span>', unsafe_allow_html=True)
+        st.markdown(f'<div class="indicator-title">{indicador.nome}</div>', unsafe_allow_html=True)
+        st.markdown(f'<span class="reference-badge">{indicador.ref} • {indicador.pontos_max} pontos</span>', unsafe_allow_html=True)
         
-        st.markdown("""
+        st.markdown(f"""
         <p class="info-text">
-        Até 5,00% de servidores(as) ativos com registros inconsistentes ou com ausência de informação no sistema MPM.
-        Considera os cargos: efetivos/removidos, cedidos/requisitados de outro tribunal, 
-        cedidos/requisitados de fora do judiciário, e comissionados sem vínculo.
+        {indicador.descricao} {indicador.obs}
         </p>
         """, unsafe_allow_html=True)
         
+        # Cálculo em segundo plano (progresso no lugar do resultado enquanto roda)
+        resultados = calcular_em_segundo_plano([indicador])
+        pendente = resultados is None
+        resultado = None if pendente else resultados.get(indicador.ref)
+        
         # Inputs
-        col_input1, col_input2 = st.columns(2)
-        with col_input1:
-            total_serv = st.number_input("Total de servidores(as) ativos", min_value=1, value=800, key="total_serv_v2")
-        with col_input2:
-            incons_serv = st.number_input("Com inconsistências", min_value=0, value=30, key="incons_serv_v2")
+        if resultado is not None:
+            # Valores derivados das fontes carregadas
+            metricas = calculadora.metricas(resultado)
+            for coluna, (rotulo, valor) in zip(st.columns(len(metricas)), metricas):
+                with coluna:
+                    st.metric(rotulo, valor)
+            if resultado.get("categorias") is not None:
+                with st.expander("Por categoria de vínculo"):
+                    st.dataframe(categorias.para_exibicao(resultado["categorias"]), use_container_width=True, hide_index=True)
+        elif not pendente and getattr(calculadora, "aceita_entrada_manual", False):
+            padrao = interface_comum.valores_manuais([indicador], st.session_state.manuais)[indicador.ref]
+            sufixo = "mag" if indicador.tipo == "magistrados" else "serv"
+            col_input1, col_input2 = st.columns(2)
+            with col_input1:
+                total = st.number_input(
+                    f"Total de {indicador.tipo[:-1]}(as) ativos", min_value=1,
+                    value=padrao[0], key=f"total_{sufixo}_v2"
+                )
+            with col_input2:
+                inconsistentes = st.number_input(
+                    "Com inconsistências", min_value=0,
+                    value=padrao[1], key=f"incons_{sufixo}_v2"
+                )
+            st.session_state.manuais[indicador.ref] = (total, inconsistentes)
+            resultado = calculadora.calcular_manual(indicador, total, inconsistentes)
+        elif not pendente:
+            st.info("Fonte de dados não encontrada para este indicador.")
     
     with col2:
-        # Cálculo
-        perc_serv = (incons_serv / total_serv * 100) if total_serv > 0 else 0
-        aprovado_serv = perc_serv <= 5.0
-        pontos_serv = 20 if aprovado_serv else 0
-        
-        # Resultado
-        st.markdown('<div class="result-metric">', unsafe_allow_html=True)
-        st.markdown(f'<div class="metric-value" style="color: {"#28a745" if aprovado_serv else "#dc3545"};">{perc_serv:.2f}%</div>', unsafe_allow_html=True)
-        st.markdown(f'<div class="metric-label">{"✅ Aprovado" if aprovado_serv else "❌ Reprovado"} • {pontos_serv}/20 pts</div>', unsafe_allow_html=True)
-        st.markdown('</div>', unsafe_allow_html=True)
+        if resultado is not None:
+            # Resultado
+            aprovado = resultado["aprovado"]
+            st.markdown('<div class="result-metric">', unsafe_allow_html=True)
+            st.markdown(f'<div class="metric-value" style="color: {"#28a745" if aprovado else "#dc3545"};">{resultado["percentual"]:.2f}%</div>', unsafe_allow_html=True)
+            st.markdown(f'<div class="metric-label">{"✅ Aprovado" if aprovado else "❌ Reprovado"} • {resultado["pontos"]}/{indicador.pontos_max} pts</div>', unsafe_allow_html=True)
+            st.markdown('</div>', unsafe_allow_html=True)
     
     st.markdown('</div>', unsafe_allow_html=True)
-    
-    # Espaço para mais indicadores
-    st.info("🔄 Novos indicadores serão adicionados conforme implementação")
 
-with tab2:
+
+def resumo_geral():
+    """Métricas e tabela de todos os indicadores (calculados em segundo plano só com a aba aberta)."""
+    resultados = calcular_em_segundo_plano(indicadores, local="resumo")
+    if resultados is None:
+        return
+    resultados = interface_comum.completar_manuais(resultados, indicadores, st.session_state.manuais)
+    total_pontos_obtidos = sum(resultado["pontos"] for resultado in resultados.values())
+    
     st.markdown("### 📊 Resumo Geral dos Indicadores")
     
     # Métricas gerais
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        st.metric("Total de Indicadores", "4 ativos")
+        st.metric("Total de Indicadores", f"{len(implementados)} ativos")
     with col2:
-        total_pontos_possiveis = 40  # Soma dos dois indicadores implementados
         st.metric("Pontos Possíveis", f"{total_pontos_possiveis}")
     with col3:
-        total_pontos_obtidos = pontos_mag + pontos_serv
         st.metric("Pontos Obtidos", f"{total_pontos_obtidos}")
     with col4:
         percentual_aproveitamento = (total_pontos_obtidos / total_pontos_possiveis * 100) if total_pontos_possiveis > 0 else 0
@@ -240,44 +319,65 @@ with tab2:
     # Tabela resumo
     st.markdown("### Detalhamento por Indicador")
     
-    resumo_data = {
-        'Referência': ['Art. 12, II, b)', 'Art. 12, II, c)', 'Art. 12, I', 'Art. 12, III'],
-        'Indicador': [
-            'Cadastro de Magistrados(as)',
-            'Cadastro de Servidores(as)',
-            'Alimentar DataJud',
-            'Saneamento DataJud por Unidade'
-        ],
-        'Meta': ['≤ 5%', '≤ 5%', '174 pts', '30 pts'],
-        'Resultado': [f'{perc_mag:.2f}%', f'{perc_serv:.2f}%', '-', '-'],
-        'Pontos': [f'{pontos_mag}/20', f'{pontos_serv}/20', '0/174', '0/30'],
-        'Status': [
-            '✅' if aprovado_mag else '❌',
-            '✅' if aprovado_serv else '❌',
-            '⏳',
-            '⏳'
-        ]
-    }
+    resumo_data = []
+    for indicador in indicadores:
+        resultado = resultados.get(indicador.ref)
+        resumo_data.append({
+            'Referência': indicador.ref,
+            'Indicador': indicador.nome,
+            'Meta': indicador.texto_meta,
+            'Resultado': f'{resultado["percentual"]:.2f}%' if resultado else '-',
+            'Pontos': f'{resultado["pontos"] if resultado else 0}/{indicador.pontos_max}',
+            'Status': ('✅' if resultado["aprovado"] else '❌') if resultado else '⏳'
+        })
     
-    df_resumo = pd.DataFrame(resumo_data)
-    st.dataframe(
-        df_resumo,
-        use_container_width=True,
-        hide_index=True,
-        column_config={
-            'Status': st.column_config.TextColumn('Status', width='small'),
-            'Referência': st.column_config.TextColumn('Referência', width='medium'),
-        }
-    )
+    with instrumentacao.etapa("tabela resumo"):
+        df_resumo = pd.DataFrame(resumo_data)
+        st.dataframe(
+            df_resumo,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                'Status': st.column_config.TextColumn('Status', width='small'),
+                'Referência': st.column_config.TextColumn('Referência', width='medium'),
+            }
+        )
+    
+    # Detalhamento por categoria de vínculo (Art. 12, II, c)
+    for ref, resultado in resultados.items():
+        if resultado.get("categorias") is not None:
+            st.markdown(f"##### {ref} por categoria de vínculo")
+            st.dataframe(categorias.para_exibicao(resultado["categorias"]), use_container_width=True, hide_index=True)
     
     # Observações
     st.markdown("##### Legenda")
     st.markdown("✅ Aprovado | ❌ Reprovado | ⏳ Em implementação")
 
+
+execucao.marcar("abas")
+# Tabs para organizar indicadores
+# (só a aba aberta é calculada e desenhada a cada execução)
+tab1, tab2, tab3 = st.tabs(
+    ["📊 Cálculo de Indicadores", "📋 Resumo Geral", "ℹ️ Informações"], key="aba_principal", on_change="rerun"
+)
+
+
+with tab1:
+    if tab1.open:
+        for indicador in implementados:
+            cartao_indicador(indicador)
+        
+        # Espaço para mais indicadores
+        st.info("🔄 Novos indicadores serão adicionados conforme implementação")
+
+with tab2:
+    if tab2.open:
+        resumo_geral()
+
 with tab3:
     st.markdown("### 📚 Informações sobre os Indicadores")
     
-    st.markdown("""
+    st.markdown(f"""
     #### Base Legal
     - **Ato CNJ nº 5880/2024** - Institui o Regulamento do Prêmio CNJ de Qualidade
     - **Portaria Presidência Nº 411/2024** - Define os critérios de avaliação
@@ -285,11 +385,16 @@ with tab3:
     
     #### Forma de Comprovação
     - Dados extraídos do sistema MPM (Módulo de Pessoal e Estrutura Judiciária Mensal)
-    - Período de referência: situação em 31/07/2025
+    - Período de referência: situação em {periodo_ref:%d/%m/%Y}
     - Campos com "não informado" são considerados inconsistências
     
     #### Pontuação do Eixo Dados e Tecnologia
-    - Total de pontos possíveis no eixo: 589 pontos
-    - Indicadores implementados neste sistema: 2 (40 pontos)
-    - Em desenvolvimento: DataJud, Processos Eletrônicos, iGovTIC-JUD, entre outros
+    - Total de pontos possíveis no eixo: {registro.PONTOS_EIXO} pontos
+    - Indicadores implementados neste sistema: {len(implementados)} ({total_pontos_possiveis} pontos)
+    - Em desenvolvimento: {", ".join(indicador.nome for indicador in indicadores if not indicador.implementado)}, entre outros
     """)
+# Um único acompanhamento para os cálculos agendados pelos cartões, pelo resumo e pela exportação
+with area_progresso:
+    interface_comum.acompanhar_calculos()
+
+execucao.exibir()
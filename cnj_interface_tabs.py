@@ -1,6 +1,266 @@
+import os
+
 import streamlit as st
-import pandas as pd
-from datetime import datetime
+
+from cnj_indicadores import perfil
+
+# Perfil de inicialização (CNJ_PERFIL=1): instalado antes das demais importações para medi-las
+medidor = perfil.iniciar()
+
+from datetime import date
+from functools import partial
+
+from cnj_indicadores import datajud, exportacao, fontes, graficos, instrumentacao, interface_comum, persistencia, registro, tarefas
+
+# Módulos pesados, importados só quando a página precisa deles (tabelas, exploração e evolução)
+pd = perfil.modulo_tardio("pandas")
+categorias = perfil.modulo_tardio("cnj_indicadores.categorias")
+comparacao = perfil.modulo_tardio("cnj_indicadores.comparacao")
+evolucao = perfil.modulo_tardio("cnj_indicadores.evolucao")
+explorador = perfil.modulo_tardio("cnj_indicadores.explorador")
+simulacao = perfil.modulo_tardio("cnj_indicadores.simulacao")
+
+
+def explorar_registros(caminho, chave):
+    """Filtros e tabela paginada dos registros inconsistentes de uma planilha."""
+    # Mantém a planilha no armazém compartilhado enquanto a sessão a explora
+    # (a referência é liberada quando a sessão termina)
+    referencias = st.session_state.setdefault("referencias", {})
+    referencia = fontes.abrir_tabela(caminho)
+    anterior = referencias.get(caminho)
+    if anterior is not None and anterior.chave == referencia.chave:
+        referencia.fechar()
+    else:
+        if anterior is not None:
+            anterior.fechar()
+        referencias[caminho] = referencia
+    
+    indice = explorador.indexar_fonte(caminho)
+    por_campo = indice.analise.por_campo
+    
+    filtro_col1, filtro_col2, filtro_col3 = st.columns(3)
+    with filtro_col1:
+        campos = st.multiselect(
+            "Campos", por_campo[por_campo > 0].sort_values(ascending=False).index.tolist(), key=f"campos_{chave}"
+        )
+    with filtro_col2:
+        categorias_selecionadas = st.multiselect(
+            "Categoria do cargo", list(categorias.CATEGORIAS),
+            format_func=categorias.CATEGORIAS.get, key=f"categorias_{chave}"
+        )
+    with filtro_col3:
+        lotacoes = st.multiselect("Lotação", indice.lotacoes, key=f"lotacoes_{chave}")
+    
+    posicoes = explorador.filtrar(indice, campos, categorias_selecionadas, lotacoes)
+    paginas = explorador.total_paginas(len(posicoes))
+    
+    pagina_col1, pagina_col2 = st.columns([1, 3])
+    with pagina_col1:
+        numero = st.number_input("Página", min_value=1, max_value=paginas, value=1, key=f"pagina_{chave}")
+    with pagina_col2:
+        st.caption(f"{len(posicoes):,} registros inconsistentes • página {numero} de {paginas}".replace(",", "."))
+    st.dataframe(explorador.pagina(caminho, indice, posicoes, numero), use_container_width=True, hide_index=True)
+
+
+@st.fragment
+def simular_meta(caminho, indicador):
+    """Correções necessárias para a meta e percentual simulado (só o simulador é refeito ao mover o controle)."""
+    simulada = simulacao.simular_fonte(caminho, getattr(indicador.calculadora, "categorias", None))
+    minimo = simulada.minimo_para_meta(indicador.meta)
+    chave = indicador.ref
+    
+    if minimo["registros"] == 0:
+        st.success(f"Já dentro da meta ({simulada.percentual():.2f}% ≤ {indicador.meta:.0f}%).")
+        if simulada.inconsistentes == 0:
+            return
+    else:
+        st.markdown(f"**Para chegar a {indicador.texto_meta}, é preciso corrigir no mínimo:**")
+        minimo_col1, minimo_col2, minimo_col3, minimo_col4 = st.columns(4)
+        with minimo_col1:
+            st.metric("Registros", minimo["registros"])
+        with minimo_col2:
+            st.metric("Edições de campo", minimo["edicoes"])
+        with minimo_col3:
+            st.metric("Campos (por impacto)", minimo["campos"])
+        with minimo_col4:
+            st.metric("Lotações (por impacto)", minimo["lotacoes"])
+    
+    estrategia = st.radio(
+        "Simular correção de", ["Registros", "Campos", "Lotações"], horizontal=True, key=f"estrategia_{chave}"
+    )
+    if estrategia == "Registros":
+        quantidade = st.slider("Registros corrigidos", 0, simulada.inconsistentes, minimo["registros"], key=f"sim_registros_{chave}")
+        corrigidos = quantidade
+        st.caption(f"{simulada.edicoes(quantidade)} edições de campo, começando pelos registros com menos campos inválidos")
+    elif estrategia == "Campos":
+        quantidade = st.slider("Campos corrigidos", 0, len(simulada.campos), minimo["campos"], key=f"sim_campos_{chave}")
+        corrigidos = int(simulada.acumulado_campos[quantidade])
+        st.caption("Campos corrigidos: " + (", ".join(simulada.campos[:quantidade]) or "nenhum"))
+    else:
+        quantidade = st.slider("Lotações corrigidas", 0, len(simulada.lotacoes), minimo["lotacoes"], key=f"sim_lotacoes_{chave}")
+        corrigidos = int(simulada.acumulado_lotacoes[quantidade])
+    
+    percentual = simulada.percentual(corrigidos)
+    st.metric(
+        "Percentual simulado",
+        f"{percentual:.2f}%",
+        delta=f"{percentual - simulada.percentual():.2f} p.p.",
+        delta_color="inverse"
+    )
+    if percentual <= indicador.meta:
+        st.success(f"✅ Dentro da meta com {corrigidos} registros corrigidos")
+    else:
+        st.error(f"❌ Fora da meta: faltam {simulada.necessarios(indicador.meta) - corrigidos} registros")
+    
+    with st.expander("Ordem de correção"):
+        if estrategia == "Lotações":
+            st.dataframe(simulada.tabela_lotacoes(), use_container_width=True, hide_index=True)
+        else:
+            st.dataframe(simulada.tabela_campos(), use_container_width=True, hide_index=True)
+
+
+@st.fragment(run_every=2)
+def tarefas_em_segundo_plano():
+    """Tabela de tarefas do servidor, compartilhada entre as sessões (cada sessão só cancela as que aguarda)."""
+    lista = tarefas.executor_tarefas.listar()
+    if not lista:
+        st.info("Nenhuma tarefa em segundo plano.")
+        return
+    sessao = st.session_state.id_sessao
+    st.dataframe(pd.DataFrame([{
+        "Tarefa": tarefa.identificador,
+        "Descrição": tarefa.descricao,
+        "Estado": tarefas.ROTULOS[tarefa.estado],
+        "Progresso": tarefa.progresso,
+        "Andamento": tarefa.erro or ("" if tarefa.encerrada else tarefa.mensagem),
+        "Duração (s)": round(tarefa.duracao, 1),
+        "Sessões": len(tarefa.interessados),
+        "Desta sessão": "✅" if sessao in tarefa.interessados else "",
+    } for tarefa in lista]), use_container_width=True, hide_index=True, column_config={
+        "Progresso": st.column_config.ProgressColumn("Progresso", min_value=0.0, max_value=1.0),
+    })
+
+    ativas = {tarefa.identificador: tarefa for tarefa in lista if not tarefa.encerrada and sessao in tarefa.interessados}
+    if ativas:
+        tarefa_col1, tarefa_col2 = st.columns([3, 1])
+        with tarefa_col1:
+            escolhida = st.selectbox(
+                "Tarefa", list(ativas), format_func=lambda identificador: f"{identificador}: {ativas[identificador].descricao}",
+                key="tarefa_cancelar", label_visibility="collapsed",
+            )
+        with tarefa_col2:
+            if st.button("⛔ Cancelar tarefa", use_container_width=True):
+                tarefas.executor_tarefas.liberar(escolhida, sessao)
+                st.session_state.calculos_cancelados.add(ativas[escolhida].chave)
+                st.rerun()
+
+
+def salvar_resultados(refs):
+    """Grava no banco compartilhado os resultados da sessão, em uma única transação."""
+    linhas = []
+    for ref in refs:
+        indicador = registro.obter(ref)
+        usadas = [registro.caminho_entrada(caminhos, entrada) for entrada in indicador.entradas]
+        linhas.append(persistencia.linha_resultado(
+            tribunal, data_ref, indicador, st.session_state.resultados[ref],
+            registro.assinatura_fontes(indicador, caminhos) or "manual",
+            {os.path.basename(caminho) for caminho in usadas if caminho},
+        ))
+    persistencia.repositorio_resultados.salvar(linhas)
+    for ref, linha in zip(refs, linhas):
+        st.session_state.resultados[ref]["salvo_em"] = linha["salvo_em"]
+
+
+def evolucao_mensal():
+    """Tendência e comparação entre os meses disponíveis (comparação incremental entre instantâneos)."""
+    tipo_evolucao = st.radio("Base", ["Servidores", "Magistrados"], horizontal=True, key="tipo_evolucao")
+    meses_disponiveis = fontes.listar_fontes(tipo_evolucao)
+    if len(meses_disponiveis) < 2:
+        st.info("São necessários ao menos dois arquivos mensais para comparar.")
+    else:
+        caminhos_meses = [fontes.caminho_fonte(nome) for nome in reversed(meses_disponiveis)]
+        try:
+            with instrumentacao.etapa("tendência mensal"):
+                tendencia = evolucao.tendencia(caminhos_meses)
+        except ValueError as erro:
+            st.warning(str(erro))
+        else:
+            tendencia["fonte"] = tendencia["fonte"].map(os.path.basename)
+            meses = [f"{mes:02d}/{ano}" for _, ano, mes in map(fontes.referencia_fonte, tendencia["fonte"])]
+            meta_cadastro = next(i.meta for i in indicadores.values() if i.tipo == tipo_evolucao.lower())
+            st.vega_lite_chart(graficos.especificacao_tendencia(
+                meses, tendencia["percentual"], titulo=f"Registros inconsistentes - {tipo_evolucao}", meta=meta_cadastro
+            ), use_container_width=True)
+            st.dataframe(tendencia, use_container_width=True, hide_index=True)
+
+            col1, col2 = st.columns(2)
+            with col1:
+                mes_anterior = st.selectbox("De", meses_disponiveis, index=1, key="mes_anterior")
+            with col2:
+                mes_atual = st.selectbox("Para", meses_disponiveis, index=0, key="mes_atual")
+            if mes_anterior != mes_atual:
+                with instrumentacao.etapa("comparação entre meses"):
+                    delta = evolucao.comparar_fontes(fontes.caminho_fonte(mes_anterior), fontes.caminho_fonte(mes_atual))
+                resumo = delta.resumo
+                for coluna, (rotulo, chave) in zip(st.columns(5), [
+                    ("Incluídos", "incluidos"), ("Excluídos", "excluidos"), ("Alterados", "alterados"),
+                    ("Campos corrigidos", "campos_corrigidos"), ("Campos quebrados", "campos_quebrados"),
+                ]):
+                    with coluna:
+                        st.metric(rotulo, resumo[chave])
+                st.metric(
+                    "Registros inconsistentes",
+                    delta.inconsistentes_atual,
+                    delta.inconsistentes_atual - delta.inconsistentes_anterior,
+                    delta_color="inverse"
+                )
+                tabela_campos = delta.tabela_campos()
+                if not tabela_campos.empty:
+                    st.dataframe(tabela_campos, use_container_width=True)
+
+
+def comparacao_tribunais():
+    """Ranking e mapa de calor entre tribunais e meses, fatiados do cubo de resultados salvos."""
+    desatualizado = comparacao.desatualizado()
+    cubo = comparacao.abrir_cubo()
+    
+    col1, col2 = st.columns([3, 1])
+    with col2:
+        if st.button("🔄 Atualizar cubo", disabled=not desatualizado, use_container_width=True):
+            with instrumentacao.etapa("montagem do cubo"):
+                comparacao.construir_cubo()
+            cubo = comparacao.abrir_cubo()
+            desatualizado = False
+    with col1:
+        if cubo is None:
+            st.info("Cubo ainda não montado: salve resultados de um ou mais tribunais e clique em Atualizar cubo.")
+            return
+        st.caption(
+            f"{len(cubo)} resultados de {len(cubo.tribunais)} tribunais em {len(cubo.meses)} meses"
+            + (" • há resultados salvos depois da última montagem" if desatualizado else "")
+        )
+    if not cubo.refs:
+        return
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        ref_comparacao = st.selectbox(
+            "Indicador", cubo.refs, format_func=lambda ref: registro.obter(ref).rotulo, key="ref_comparacao"
+        )
+    with col2:
+        mes_comparacao = st.selectbox("Mês", list(reversed(cubo.meses)), key="mes_comparacao")
+    
+    aba_ranking, aba_mapa, aba_pontos = st.tabs(["🏆 Ranking", "🗺️ Mapa de calor", "🎯 Pontuação geral"])
+    with aba_ranking:
+        with instrumentacao.etapa("ranking entre tribunais"):
+            ranking = cubo.ranking(ref_comparacao, mes_comparacao)
+        st.dataframe(ranking, use_container_width=True, hide_index=True)
+    with aba_mapa:
+        with instrumentacao.etapa("mapa de calor"):
+            st.vega_lite_chart(cubo.especificacao_mapa_calor(ref_comparacao), use_container_width=True)
+    with aba_pontos:
+        st.dataframe(cubo.pontuacao(mes_comparacao), use_container_width=True, hide_index=True)
+
 
 # Configuração da página
 st.set_page_config(
@@ -9,30 +269,59 @@ st.set_page_config(
     layout="wide"
 )
 
+# Instrumentação desta execução (?instrumentar=1 ou CNJ_INSTRUMENTAR=1), com as marcas do perfil de inicialização
+execucao = instrumentacao.iniciar(st.query_params.get("instrumentar"), medidor)
+
 # Inicializar session state para armazenar resultados
 if 'resultados' not in st.session_state:
     st.session_state.resultados = {}
+# Cálculos em segundo plano (sessão interessada, cancelamentos e instrumentação)
+interface_comum.iniciar_sessao()
 
 # Título principal
 st.title("⚖️ Sistema de Indicadores - Prêmio CNJ de Qualidade")
 st.markdown("**Eixo Dados e Tecnologia** • Módulo de Pessoal e Estrutura Judiciária Mensal (MPM)")
 
+execucao.marcar("fontes")
 # Configuração de fontes de dados
 with st.expander("⚙️ Configuração de Fontes de Dados", expanded=False):
     col1, col2 = st.columns(2)
     with col1:
         fonte_mag = st.selectbox(
             "Magistrados",
-            ["MPM_Magistrados_2025_07.xlsx", "MPM_Magistrados_2025_06.xlsx", "MPM_Magistrados_2025_05.xlsx"]
+            fontes.listar_fontes("Magistrados") or ["MPM_Magistrados_2025_07.xlsx", "MPM_Magistrados_2025_06.xlsx", "MPM_Magistrados_2025_05.xlsx"]
         )
     with col2:
         fonte_serv = st.selectbox(
             "Servidores",
-            ["MPM_Servidores_2025_07.xlsx", "MPM_Servidores_2025_06.xlsx", "MPM_Servidores_2025_05.xlsx"]
+            fontes.listar_fontes("Servidores") or ["MPM_Servidores_2025_07.xlsx", "MPM_Servidores_2025_06.xlsx", "MPM_Servidores_2025_05.xlsx"]
         )
+    tribunal = st.text_input(
+        "Tribunal",
+        value=persistencia.TRIBUNAL_PADRAO,
+        help="Identifica os resultados salvos no banco compartilhado (variável de ambiente CNJ_TRIBUNAL)"
+    )
+    st.caption(f"Planilhas lidas de `{fontes.DIRETORIO_DADOS}/` (variável de ambiente CNJ_DADOS_DIR)")
+
+# Planilhas disponíveis (lidas do cache em Parquet apenas quando um cálculo precisa delas)
+caminhos = {
+    "magistrados": fontes.caminho_fonte(fonte_mag),
+    "servidores": fontes.caminho_fonte(fonte_serv),
+    "datajud": datajud.DIRETORIO_DATAJUD if datajud.listar_exportacoes() else None,
+}
+data_ref = fontes.data_referencia(fonte_mag) or date(2025, 7, 31)
+
+# Resultados já salvos para o tribunal e a data de referência (consulta indexada, sem recalcular)
+if st.session_state.get("salvos_carregados") != (tribunal, data_ref):
+    st.session_state.salvos_carregados = (tribunal, data_ref)
+    for ref, resultado in persistencia.repositorio_resultados.consultar(tribunal, data_ref).items():
+        st.session_state.resultados.setdefault(ref, resultado)
 
 # Barra informativa de fontes ativas
-st.info(f"📊 **Dados ativos:** {fonte_mag} | {fonte_serv} | **Referência:** 31/07/2025")
+st.info(f"📊 **Dados ativos:** {fonte_mag} | {fonte_serv} | **Referência:** {data_ref:%d/%m/%Y}")
+for nome_fonte, caminho in [(fonte_mag, caminhos["magistrados"]), (fonte_serv, caminhos["servidores"])]:
+    if caminho is None:
+        st.warning(f"Arquivo {nome_fonte} não encontrado. Informe os valores manualmente.")
 
 # Separador
 st.markdown("---")
@@ -40,49 +329,8 @@ st.markdown("---")
 # Título da seção
 st.markdown("## 📈 Cálculo de Indicador")
 
-# Dicionário com todos os indicadores disponíveis
-indicadores = {
-    "Art. 12, II, b) - Cadastro de Magistrados(as)": {
-        "ref": "Art. 12, II, b)",
-        "pontos_max": 20,
-        "meta": 5.0,
-        "tipo": "magistrados",
-        "descricao": "Verifica se há até 5% de magistrados(as) ativos com registro de inconsistência ou ausência de informação no sistema MPM.",
-        "obs": "Campos com 'não informado' são considerados inválidos."
-    },
-    "Art. 12, II, c) - Cadastro de Servidores(as)": {
-        "ref": "Art. 12, II, c)",
-        "pontos_max": 20,
-        "meta": 5.0,
-        "tipo": "servidores",
-        "descricao": "Verifica se há até 5% de servidores(as) ativos com registros inconsistentes no MPM.",
-        "obs": "Considera: efetivos, removidos, cedidos, requisitados e comissionados sem vínculo."
-    },
-    "Art. 12, I - Alimentar DataJud": {
-        "ref": "Art. 12, I",
-        "pontos_max": 174,
-        "meta": 100.0,
-        "tipo": "datajud",
-        "descricao": "Alimentação da Base Nacional de Dados do Poder Judiciário (DataJud).",
-        "obs": "Em desenvolvimento"
-    },
-    "Art. 12, III - Saneamento DataJud por Unidade": {
-        "ref": "Art. 12, III",
-        "pontos_max": 30,
-        "meta": 100.0,
-        "tipo": "saneamento",
-        "descricao": "Saneamento do DataJud por Unidade Judiciária.",
-        "obs": "Em desenvolvimento"
-    },
-    "Art. 12, IV - Processos Eletrônicos": {
-        "ref": "Art. 12, IV",
-        "pontos_max": 50,
-        "meta": 100.0,
-        "tipo": "eletronicos",
-        "descricao": "Tramitar as ações judiciais de forma eletrônica.",
-        "obs": "Em desenvolvimento"
-    }
-}
+# Indicadores disponíveis, na ordem do registro
+indicadores = {indicador.rotulo: indicador for indicador in registro.indicadores()}
 
 # Seleção do indicador
 col1, col2 = st.columns([3, 1])
@@ -110,116 +358,181 @@ if modo_multiplo:
 else:
     indicadores_para_calcular = [indicador_selecionado]
 
+execucao.marcar("calculo")
+# Calcular de uma vez todos os indicadores selecionados (cada planilha é carregada uma única vez)
+selecionados = [indicadores[nome] for nome in indicadores_para_calcular]
+# O cálculo roda em segundo plano: se não terminar logo, a página segue com os
+# resultados parciais e acompanha o andamento sem travar os demais controles
+resultados_lote = interface_comum.calcular_em_segundo_plano(
+    selecionados, caminhos, {"data_referencia": data_ref}, parciais=True, local="selecao"
+) or {}
+em_calculo = set()
+if st.session_state.calculos_pendentes:
+    em_calculo = {indicador.ref for indicador in selecionados} - set(resultados_lote)
+interface_comum.acompanhar_calculos()
+
+execucao.marcar("cartoes")
 # Container para os indicadores
-for indicador_nome in indicadores_para_calcular:
-    indicador_info = indicadores[indicador_nome]
-    
+for indicador in selecionados:
     st.markdown("---")
     
     # Container do indicador
     with st.container():
         # Verificar se o indicador está implementado
-        if indicador_info["tipo"] in ["magistrados", "servidores"]:
+        if indicador.implementado:
+            calculadora = indicador.calculadora
+            resultado = resultados_lote.get(indicador.ref)
             col1, col2 = st.columns([3, 2])
             
             with col1:
                 # Cabeçalho
-                st.markdown(f"### {indicador_nome.split(' - ')[1]}")
-                st.markdown(f"**{indicador_info['ref']}** • {indicador_info['pontos_max']} pontos")
+                st.markdown(f"### {indicador.nome}")
+                st.markdown(f"**{indicador.ref}** • {indicador.pontos_max} pontos")
                 
                 # Descrição
-                st.markdown(indicador_info["descricao"])
-                if indicador_info["obs"]:
-                    st.caption(indicador_info["obs"])
+                st.markdown(indicador.descricao)
+                if indicador.obs:
+                    st.caption(indicador.obs)
                 
                 # Container para inputs
                 st.markdown("##### 📝 Dados para cálculo:")
                 
-                input_col1, input_col2 = st.columns(2)
-                
-                with input_col1:
-                    if indicador_info["tipo"] == "magistrados":
-                        label_total = "Total de magistrados(as) ativos"
-                        key_total = "total_mag"
-                        default_total = 150
-                    else:
-                        label_total = "Total de servidores(as) ativos"
-                        key_total = "total_serv"
-                        default_total = 800
+                if resultado is not None:
+                    # Valores derivados das fontes carregadas
+                    metricas = calculadora.metricas(resultado)
+                    for coluna, (rotulo, valor) in zip(st.columns(len(metricas)), metricas):
+                        with coluna:
+                            st.metric(rotulo, valor)
+                    st.caption("Calculado a partir de " + ", ".join(
+                        os.path.basename(registro.caminho_entrada(caminhos, entrada)) for entrada in indicador.entradas
+                    ))
+                elif indicador.ref in em_calculo:
+                    st.info("⏳ Calculando em segundo plano...")
+                elif getattr(calculadora, "aceita_entrada_manual", False):
+                    input_col1, input_col2 = st.columns(2)
                     
-                    st.markdown(f"**{label_total}**")
-                    total = st.number_input(
-                        label_total,
-                        min_value=1,
-                        value=default_total,
-                        key=f"{key_total}_{indicador_info['ref']}",
-                        label_visibility="collapsed"
-                    )
-                    st.caption("Total no sistema MPM")
-                
-                with input_col2:
-                    st.markdown("**Registros com 'não informado'**")
-                    inconsistentes = st.number_input(
-                        "Inconsistências",
-                        min_value=0,
-                        value=5 if indicador_info["tipo"] == "magistrados" else 30,
-                        key=f"incons_{indicador_info['ref']}",
-                        label_visibility="collapsed"
-                    )
-                    st.caption("Campos inconsistentes")
-            
-            with col2:
-                # Cálculo
-                percentual = (inconsistentes / total * 100) if total > 0 else 0
-                aprovado = percentual <= indicador_info["meta"]
-                pontos = indicador_info["pontos_max"] if aprovado else 0
-                
-                # Armazenar resultado
-                st.session_state.resultados[indicador_info["ref"]] = {
-                    "nome": indicador_nome.split(' - ')[1],
-                    "percentual": percentual,
-                    "pontos": pontos,
-                    "pontos_max": indicador_info["pontos_max"],
-                    "aprovado": aprovado,
-                    "total": total,
-                    "inconsistentes": inconsistentes
-                }
-                
-                # Box de resultado
-                st.markdown("### Resultado")
-                
-                if aprovado:
-                    st.success(f"### {percentual:.2f}%")
-                    st.markdown("✅ **APROVADO**")
+                    with input_col1:
+                        if indicador.tipo == "magistrados":
+                            label_total = "Total de magistrados(as) ativos"
+                            key_total = "total_mag"
+                            default_total = 150
+                        else:
+                            label_total = "Total de servidores(as) ativos"
+                            key_total = "total_serv"
+                            default_total = 800
+                        
+                        st.markdown(f"**{label_total}**")
+                        total = st.number_input(
+                            label_total,
+                            min_value=1,
+                            value=default_total,
+                            key=f"{key_total}_{indicador.ref}",
+                            label_visibility="collapsed"
+                        )
+                        st.caption("Total no sistema MPM")
+                    
+                    with input_col2:
+                        st.markdown("**Registros com 'não informado'**")
+                        inconsistentes = st.number_input(
+                            "Inconsistências",
+                            min_value=0,
+                            value=5 if indicador.tipo == "magistrados" else 30,
+                            key=f"incons_{indicador.ref}",
+                            label_visibility="collapsed"
+                        )
+                        st.caption("Campos inconsistentes")
+                    resultado = calculadora.calcular_manual(indicador, total, inconsistentes)
                 else:
-                    st.error(f"### {percentual:.2f}%")
-                    st.markdown("❌ **REPROVADO**")
-                
-                st.markdown(f"**{pontos} de {indicador_info['pontos_max']} pontos**")
-                
-                # Botão para salvar
-                if st.button(f"💾 Salvar resultado", key=f"save_{indicador_info['ref']}"):
-                    st.success("Resultado salvo!")
-                
-                # Detalhes
-                with st.expander("Ver detalhes"):
-                    st.markdown(f"""
-                    **Cálculo:** ({inconsistentes} ÷ {total}) × 100 = {percentual:.2f}%
+                    st.info("Fonte de dados não encontrada para este indicador.")
+            
+            if resultado is not None:
+                with col2:
+                    # Cálculo
+                    percentual = resultado["percentual"]
+                    aprovado = resultado["aprovado"]
+                    pontos = resultado["pontos"]
+                    
+                    # Armazenar resultado (mantém a data de gravação enquanto o valor salvo não muda)
+                    anterior = st.session_state.resultados.get(indicador.ref, {})
+                    st.session_state.resultados[indicador.ref] = {
+                        "nome": indicador.nome,
+                        "percentual": percentual,
+                        "pontos": pontos,
+                        "pontos_max": indicador.pontos_max,
+                        "aprovado": aprovado,
+                        "total": resultado.get("total"),
+                        "inconsistentes": resultado.get("inconsistentes"),
+                        "categorias": resultado.get("categorias"),
+                        "salvo_em": anterior.get("salvo_em") if anterior.get("percentual") == percentual else None
+                    }
+                    
+                    # Box de resultado
+                    st.markdown("### Resultado")
+                    
+                    if aprovado:
+                        st.success(f"### {percentual:.2f}%")
+                        st.markdown("✅ **APROVADO**")
+                    else:
+                        st.error(f"### {percentual:.2f}%")
+                        st.markdown("❌ **REPROVADO**")
                     
-                    **Meta:** ≤ {indicador_info['meta']:.0f}%
+                    st.markdown(f"**{pontos} de {indicador.pontos_max} pontos**")
                     
-                    **Status:** {"Dentro da meta ✅" if aprovado else "Fora da meta ❌"}
-                    """)
+                    # Botão para salvar
+                    if st.button(f"💾 Salvar resultado", key=f"save_{indicador.ref}"):
+                        salvar_resultados([indicador.ref])
+                        st.success("Resultado salvo!")
+                    
+                    # Detalhes
+                    with st.expander("Ver detalhes"):
+                        st.markdown(f"""
+                        **Cálculo:** {resultado["formula"]}
+                        
+                        **Meta:** {indicador.texto_meta}
+                        
+                        **Status:** {"Dentro da meta ✅" if aprovado else "Fora da meta ❌"}
+                        """)
+                        if resultado.get("faltantes"):
+                            st.markdown("**Remessas ausentes (grau, mês):** " + ", ".join(
+                                f"{grau} {mes}" for grau, mes in resultado["faltantes"]
+                            ))
+                        if resultado.get("ranking") is not None:
+                            st.markdown("**Unidades com maior taxa de erro:**")
+                            st.dataframe(resultado["ranking"].head(20), use_container_width=True, hide_index=True)
+                        analise = resultado.get("analise")
+                        if analise is not None:
+                            por_campo = analise.por_campo
+                            st.markdown("**Inconsistências por campo:**")
+                            st.dataframe(
+                                por_campo[por_campo > 0].sort_values(ascending=False).rename("Registros"),
+                                use_container_width=True
+                            )
+                        if resultado.get("categorias") is not None:
+                            st.markdown("**Por categoria de vínculo:**")
+                            st.dataframe(
+                                categorias.para_exibicao(resultado["categorias"]),
+                                use_container_width=True,
+                                hide_index=True
+                            )
+            
+            # Explorador dos registros inconsistentes (só a página visível é lida e enviada ao navegador)
+            if resultado is not None and resultado.get("analise") is not None:
+                caminho_registros = registro.caminho_entrada(caminhos, indicador.entradas[0])
+                if caminho_registros and st.toggle("🔎 Explorar registros inconsistentes", key=f"explorar_{indicador.ref}"):
+                    explorar_registros(caminho_registros, indicador.ref)
+                if caminho_registros and st.toggle("🎯 Simular correções para a meta", key=f"simular_{indicador.ref}"):
+                    simular_meta(caminho_registros, indicador)
         
         else:
             # Indicador não implementado
-            st.markdown(f"### {indicador_nome.split(' - ')[1]}")
-            st.markdown(f"**{indicador_info['ref']}** • {indicador_info['pontos_max']} pontos")
+            st.markdown(f"### {indicador.nome}")
+            st.markdown(f"**{indicador.ref}** • {indicador.pontos_max} pontos")
             st.warning("🚧 Este indicador está em desenvolvimento e será implementado em breve.")
 
 # Separador antes do resumo
 st.markdown("---")
 
+execucao.marcar("resumo")
 # Resumo dos Indicadores Calculados
 st.markdown("## 📊 Resumo dos Indicadores")
 
@@ -250,66 +563,103 @@ if st.session_state.resultados:
         dados_tabela.append({
             'Referência': ref,
             'Indicador': resultado['nome'],
-            'Total': resultado['total'],
-            'Inconsistências': resultado['inconsistentes'],
+            'Total': resultado.get('total'),
+            'Inconsistências': resultado.get('inconsistentes'),
             'Percentual': f"{resultado['percentual']:.2f}%",
             'Pontos': f"{resultado['pontos']}/{resultado['pontos_max']}",
-            'Status': '✅' if resultado['aprovado'] else '❌'
+            'Status': '✅' if resultado['aprovado'] else '❌',
+            'Salvo em': resultado.get('salvo_em')
         })
     
-    df = pd.DataFrame(dados_tabela)
-    st.dataframe(df, use_container_width=True, hide_index=True)
+    with instrumentacao.etapa("tabela resumo"):
+        df = pd.DataFrame(dados_tabela)
+        st.dataframe(df, use_container_width=True, hide_index=True)
+    
+    # Detalhamento por categoria de vínculo (Art. 12, II, c)
+    for ref, resultado in st.session_state.resultados.items():
+        if resultado.get("categorias") is not None:
+            st.markdown(f"**{ref} por categoria de vínculo**")
+            st.dataframe(categorias.para_exibicao(resultado["categorias"]), use_container_width=True, hide_index=True)
     
     # Botões de ação
-    col1, col2, col3 = st.columns(3)
+    col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        if st.button("📥 Exportar Todos", use_container_width=True, type="primary"):
-            st.success("Relatório exportado!")
+        with st.popover("📥 Exportar Todos", use_container_width=True):
+            formato_exportacao = st.radio("Formato", list(exportacao.FORMATOS), horizontal=True, key="formato_exportacao")
+            # O relatório só é gerado quando o download é solicitado, com os resultados da sessão
+            # naquele momento (o próprio dicionário da sessão é repassado, não uma cópia)
+            st.download_button(
+                "Baixar relatório",
+                partial(exportacao.conteudo_relatorio, st.session_state.resultados, caminhos, formato_exportacao),
+                file_name=exportacao.nome_relatorio(formato_exportacao, data_ref),
+                mime=exportacao.FORMATOS[formato_exportacao][1],
+                type="primary",
+                use_container_width=True
+            )
+            st.caption("Resumo dos indicadores e registros inconsistentes das planilhas usadas.")
     
     with col2:
         if st.button("📊 Gerar Gráfico", use_container_width=True):
-            # Criar um gráfico simples de barras
-            import matplotlib.pyplot as plt
-            
-            fig, ax = plt.subplots(figsize=(10, 4))
-            nomes = [r['nome'] for r in st.session_state.resultados.values()]
-            pontos = [r['pontos'] for r in st.session_state.resultados.values()]
-            pontos_max = [r['pontos_max'] for r in st.session_state.resultados.values()]
-            
-            x = range(len(nomes))
-            ax.bar(x, pontos_max, label='Pontos Máximos', alpha=0.3, color='gray')
-            ax.bar(x, pontos, label='Pontos Obtidos', color='green')
-            ax.set_xticks(x)
-            ax.set_xticklabels(nomes, rotation=45, ha='right')
-            ax.set_ylabel('Pontos')
-            ax.legend()
-            ax.set_title('Pontuação por Indicador')
-            plt.tight_layout()
-            st.pyplot(fig)
+            # Gráfico desenhado no navegador a partir da especificação em cache
+            with instrumentacao.etapa("gráfico de pontos"):
+                st.vega_lite_chart(graficos.especificacao_pontos(st.session_state.resultados), use_container_width=True)
     
     with col3:
+        if st.button("💾 Salvar Todos", use_container_width=True):
+            # Só os calculados nesta sessão; os lidos do banco já estão salvos
+            pendentes = [ref for ref, resultado in st.session_state.resultados.items() if not resultado.get("salvo_em")]
+            salvar_resultados(pendentes)
+            st.toast(f"{len(pendentes)} resultados salvos para {tribunal or 'o tribunal padrão'}.")
+    
+    with col4:
         if st.button("🗑️ Limpar Resultados", use_container_width=True):
-            st.session_state.resultados = {}
+            st.session_state.resultados.clear()
             st.rerun()
 
 else:
     st.info("Nenhum indicador foi calculado ainda. Selecione um indicador acima e insira os dados para começar.")
 
+execucao.marcar("evolucao")
+# Evolução entre os meses disponíveis (calculada só com o painel aberto)
+painel_evolucao = st.expander("📈 Evolução mensal das inconsistências", key="painel_evolucao", on_change="rerun")
+with painel_evolucao:
+    if painel_evolucao.open:
+        evolucao_mensal()
+
+execucao.marcar("comparacao")
+# Comparação entre tribunais (fatias do cubo de resultados, só com o painel aberto)
+painel_comparacao = st.expander("🏛️ Comparação entre tribunais", key="painel_comparacao", on_change="rerun")
+with painel_comparacao:
+    if painel_comparacao.open:
+        comparacao_tribunais()
+
+execucao.marcar("tarefas")
+# Cálculos em segundo plano do servidor (atualizada periodicamente só com o painel aberto)
+painel_tarefas = st.expander("🧵 Tarefas em segundo plano", key="painel_tarefas", on_change="rerun")
+with painel_tarefas:
+    if painel_tarefas.open:
+        tarefas_em_segundo_plano()
+
+execucao.marcar("todos_indicadores")
 # Tabela com todos os indicadores disponíveis
-with st.expander("📋 Ver todos os indicadores do sistema"):
-    todos_dados = []
-    for nome, info in indicadores.items():
-        todos_dados.append({
-            'Referência': info['ref'],
-            'Indicador': nome.split(' - ')[1],
-            'Pontos Máximos': info['pontos_max'],
-            'Meta': f"≤ {info['meta']:.0f}%" if info['meta'] <= 100 else f"{info['meta']:.0f}%",
-            'Status': '✅ Implementado' if info['tipo'] in ['magistrados', 'servidores'] else '🚧 Em desenvolvimento'
-        })
-    
-    df_todos = pd.DataFrame(todos_dados)
-    st.dataframe(df_todos, use_container_width=True, hide_index=True)
+painel_todos = st.expander("📋 Ver todos os indicadores do sistema", key="painel_todos", on_change="rerun")
+with painel_todos:
+    if painel_todos.open:
+        todos_dados = []
+        for indicador in indicadores.values():
+            todos_dados.append({
+                'Referência': indicador.ref,
+                'Indicador': indicador.nome,
+                'Pontos Máximos': indicador.pontos_max,
+                'Meta': indicador.texto_meta,
+                'Status': '✅ Implementado' if indicador.implementado else '🚧 Em desenvolvimento'
+            })
+        
+        df_todos = pd.DataFrame(todos_dados)
+        st.dataframe(df_todos, use_container_width=True, hide_index=True)
 
 # Informações legais
 st.caption("**Base Legal:** Ato CNJ nº 5880/2024 • Portaria Presidência Nº 411/2024 • Resolução CNJ nº 587/2024")
+
+execucao.exibir()
@@ -0,0 +1,165 @@
+import contextvars
+import gc
+import threading
+
+import pyarrow as pa
+import pytest
+
+from cnj_indicadores import instrumentacao
+from cnj_indicadores.armazem import ArmazemDados
+
+
+def tabela(linhas=1000):
+    return pa.table({"valor": pa.array(range(linhas), pa.int64())})
+
+
+def carregador(tabelas):
+    """Devolve ``carregar`` que conta as chamadas em ``tabelas``."""
+    def carregar():
+        tabelas.append(tabela())
+        return tabelas[-1]
+    return carregar
+
+
+def test_carrega_uma_vez_e_compartilha_a_tabela():
+    armazem = ArmazemDados()
+    tabelas = []
+    with armazem.abrir("a", carregador(tabelas)) as primeira, armazem.abrir("a", carregador(tabelas)) as segunda:
+        assert len(tabelas) == 1
+        assert primeira.tabela is segunda.tabela
+        assert armazem.estatisticas()["referencias"] == 2
+    estatisticas = armazem.estatisticas()
+    assert estatisticas["referencias"] == 0
+    assert (estatisticas["acertos"], estatisticas["carregamentos"]) == (1, 1)
+
+
+def test_fatia_e_colunas_sem_copia():
+    armazem = ArmazemDados()
+    with armazem.abrir("a", tabela) as referencia:
+        fatia = referencia.fatia(10, 5)
+        assert fatia.column("valor").to_pylist() == [10, 11, 12, 13, 14]
+        assert referencia.colunas(["valor"]).column(0).chunk(0).buffers()[1].address == \
+            referencia.tabela.column(0).chunk(0).buffers()[1].address
+
+
+def test_descarta_por_lru_apenas_sem_referencias():
+    tamanho = tabela().nbytes
+    armazem = ArmazemDados(limite_bytes=2 * tamanho)
+    aberta = armazem.abrir("a", tabela)
+    armazem.abrir("b", tabela).fechar()
+    armazem.abrir("c", tabela).fechar()
+
+    # "a" é a menos usada, mas está aberta: sai "b"
+    assert "a" in armazem and "b" not in armazem and "c" in armazem
+    assert armazem.estatisticas()["uso_bytes"] == 2 * tamanho
+
+    # Um acerto move a entrada para o fim da fila
+    aberta.fechar()
+    armazem.abrir("a", tabela).fechar()
+    armazem.abrir("d", tabela).fechar()
+    assert "a" in armazem and "c" not in armazem and "d" in armazem
+
+
+def test_excedente_sai_quando_a_ultima_referencia_fecha():
+    tamanho = tabela().nbytes
+    armazem = ArmazemDados(limite_bytes=tamanho)
+    primeira = armazem.abrir("a", tabela)
+    segunda = armazem.abrir("b", tabela)
+    assert armazem.estatisticas()["uso_bytes"] == 2 * tamanho
+
+    primeira.fechar()
+    assert "a" not in armazem and "b" in armazem
+    # Fechar de novo não altera a contagem
+    primeira.fechar()
+    assert armazem.estatisticas()["referencias"] == 1
+    segunda.fechar()
+    assert "b" in armazem
+
+
+def test_referencia_coletada_e_liberada():
+    armazem = ArmazemDados()
+    referencia = armazem.abrir("a", tabela)
+    assert referencia.aberta
+    del referencia
+    gc.collect()
+    assert armazem.estatisticas()["referencias"] == 0
+
+
+def test_para_pandas_mantem_a_referencia_ate_o_dataframe_ser_coletado():
+    armazem = ArmazemDados(limite_bytes=0)
+    referencia = armazem.abrir("a", tabela)
+    df = referencia.para_pandas()
+    del referencia
+    gc.collect()
+    assert "a" in armazem
+    assert df["valor"].sum() == sum(range(1000))
+
+    del df
+    gc.collect()
+    assert "a" not in armazem
+    assert armazem.estatisticas()["uso_bytes"] == 0
+
+
+def test_limpar_preserva_entradas_abertas():
+    armazem = ArmazemDados()
+    aberta = armazem.abrir("a", tabela)
+    armazem.abrir("b", tabela).fechar()
+    armazem.limpar()
+    assert "a" in armazem and "b" not in armazem
+    aberta.fechar()
+
+
+def test_carregamentos_simultaneos_da_mesma_chave():
+    armazem = ArmazemDados()
+    tabelas = []
+    liberar = threading.Event()
+
+    def carregar():
+        liberar.wait(5)
+        return carregador(tabelas)()
+
+    referencias = []
+    threads = [threading.Thread(target=lambda: referencias.append(armazem.abrir("a", carregar))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    liberar.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(tabelas) == 1
+    assert armazem.estatisticas()["referencias"] == 4
+    assert all(referencia.tabela is tabelas[0] for referencia in referencias)
+
+
+def test_falha_no_carregamento_nao_deixa_entrada():
+    armazem = ArmazemDados()
+
+    def carregar():
+        raise OSError("planilha ilegível")
+
+    with pytest.raises(OSError):
+        armazem.abrir("a", carregar)
+    assert "a" not in armazem
+    with armazem.abrir("a", tabela):
+        assert "a" in armazem
+
+
+def test_acessos_contados_na_execucao_em_que_ocorrem():
+    armazem = ArmazemDados()
+
+    def abrir_e_fechar():
+        armazem.abrir("a", tabela).fechar()
+
+    def executar():
+        execucao = instrumentacao.iniciar("1")
+        abrir_e_fechar()
+        abrir_e_fechar()
+        # Outra sessão no mesmo intervalo (thread sem esta execução no contexto)
+        outra = threading.Thread(target=abrir_e_fechar)
+        outra.start()
+        outra.join()
+        return execucao.relatorio()["armazem"]
+
+    relatorio = contextvars.copy_context().run(executar)
+    assert (relatorio["acertos"], relatorio["carregamentos"]) == (1, 1)
+    assert armazem.estatisticas()["acertos"] == 2
@@ -0,0 +1,129 @@
+import contextvars
+import threading
+
+import numpy as np
+
+from cnj_indicadores import instrumentacao
+from cnj_indicadores.cache import CacheLRU, chave_indicador, tamanho_estimado
+
+
+def valor(tamanho):
+    # O tamanho estimado de um array é exatamente nbytes
+    return np.zeros(tamanho, dtype=np.uint8)
+
+
+def test_descarta_as_entradas_usadas_ha_mais_tempo():
+    cache = CacheLRU(limite_bytes=300)
+    for chave in "abc":
+        cache.guardar(chave, valor(100))
+    assert cache.uso_bytes == 300
+
+    # Usar "a" a torna a mais recente: a próxima entrada descarta "b"
+    cache.obter("a")
+    cache.guardar("d", valor(100))
+    assert "b" not in cache
+    assert [chave in cache for chave in "acd"] == [True, True, True]
+    assert cache.uso_bytes == 300
+
+
+def test_descarta_quantas_entradas_forem_necessarias():
+    cache = CacheLRU(limite_bytes=300)
+    for chave in "abc":
+        cache.guardar(chave, valor(100))
+    cache.guardar("grande", valor(250))
+    assert len(cache) == 1
+    assert cache.uso_bytes == 250
+
+
+def test_valor_maior_que_o_limite_nao_e_guardado():
+    cache = CacheLRU(limite_bytes=100)
+    cache.guardar("a", valor(50))
+    cache.guardar("b", valor(500))
+    assert "b" not in cache
+    assert "a" in cache
+    assert cache.uso_bytes == 50
+
+
+def test_substituir_entrada_atualiza_o_uso():
+    cache = CacheLRU(limite_bytes=1000)
+    cache.guardar("a", valor(100))
+    cache.guardar("a", valor(40))
+    assert len(cache) == 1
+    assert cache.uso_bytes == 40
+
+
+def test_obter_ou_calcular_conta_acertos_e_falhas():
+    cache = CacheLRU()
+    chamadas = []
+
+    def calcular():
+        chamadas.append(1)
+        return 42
+
+    assert cache.obter_ou_calcular("x", calcular) == 42
+    assert cache.obter_ou_calcular("x", calcular) == 42
+    assert len(chamadas) == 1
+    estatisticas = cache.estatisticas()
+    assert (estatisticas["acertos"], estatisticas["falhas"], estatisticas["entradas"]) == (1, 1, 1)
+
+
+def test_obter_ou_calcular_calcula_uma_vez_entre_threads():
+    cache = CacheLRU()
+    liberar = threading.Event()
+    chamadas = []
+
+    def calcular():
+        chamadas.append(1)
+        liberar.wait(5)
+        return "valor"
+
+    resultados = []
+    threads = [
+        threading.Thread(target=lambda: resultados.append(cache.obter_ou_calcular("x", calcular)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    liberar.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert chamadas == [1]
+    assert resultados == ["valor"] * 4
+
+
+def test_limpar():
+    cache = CacheLRU()
+    cache.guardar("a", valor(10))
+    cache.limpar()
+    assert len(cache) == 0
+    assert cache.uso_bytes == 0
+
+
+def test_tamanho_estimado_soma_conteudo():
+    assert tamanho_estimado({"a": valor(1000)}) > 1000
+    assert tamanho_estimado([valor(10), valor(20)]) > 30
+
+
+def test_chave_indicador_independe_da_ordem_dos_parametros():
+    assert chave_indicador("h", "ref", meta=5, pontos=20) == chave_indicador("h", "ref", pontos=20, meta=5)
+
+
+def test_acertos_contados_na_execucao_em_que_ocorrem():
+    cache = CacheLRU()
+    cache.guardar("x", 1)
+
+    def executar():
+        execucao = instrumentacao.iniciar("1")
+        cache.obter_ou_calcular("x", lambda: 1)
+        cache.obter_ou_calcular("y", lambda: 2)
+        # Acesso de outra sessão no mesmo intervalo (thread sem esta execução no contexto)
+        outra = threading.Thread(target=cache.obter_ou_calcular, args=("x", lambda: 1))
+        outra.start()
+        outra.join()
+        return execucao.relatorio()
+
+    relatorio = contextvars.copy_context().run(executar)
+    assert (relatorio["cache"]["acertos"], relatorio["cache"]["falhas"]) == (1, 1)
+    assert relatorio["contadores"] == {}
+    assert cache.estatisticas()["acertos"] == 2
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cnj_indicadores import categorias
+
+
+@pytest.mark.parametrize("texto, categoria", [
+    ("Efetivo", "efetivos_removidos"),
+    ("Servidor efetivo removido", "efetivos_removidos"),
+    ("REMOVIDO", "efetivos_removidos"),
+    ("Cedido de outro tribunal", "cedidos_outro_tribunal"),
+    ("Requisitado do TRT2", "cedidos_outro_tribunal"),
+    ("Requisitada - TJSP", "cedidos_outro_tribunal"),
+    ("Cedido pelo Conselho Nacional de Justiça", "cedidos_outro_tribunal"),
+    ("Cedido de fora do Judiciário", "cedidos_fora_judiciario"),
+    ("Requisitado da Prefeitura Municipal", "cedidos_fora_judiciario"),
+    ("Cedido pelo Poder Executivo", "cedidos_fora_judiciario"),
+    ("Cedido", "cedidos_origem_nao_informada"),
+    ("Requisitado", "cedidos_origem_nao_informada"),
+    ("Comissionado sem vínculo", "comissionados_sem_vinculo"),
+    ("Sem vínculo efetivo", "comissionados_sem_vinculo"),
+    ("Efetivo cedido para o TRE", "outros"),
+    ("Cedido a outro órgão", "outros"),
+    ("Requisitado por outro tribunal", "outros"),
+    ("Em exercício em outro órgão", "outros"),
+    ("Estagiário", "outros"),
+    ("Não informado", "nao_informado"),
+    (" N/I ", "nao_informado"),
+    ("", "nao_informado"),
+])
+def test_classificar_texto(texto, categoria):
+    assert categorias.classificar_texto(texto) == categoria
+
+
+def test_sigla_dentro_de_palavra_nao_e_tribunal():
+    # "stj" em "estjudicial" ou "tre" em "entre" não identificam a origem
+    assert categorias.classificar_texto("Cedido entre órgãos") == "cedidos_origem_nao_informada"
+
+
+def test_classificar_usa_a_primeira_coluna_de_vinculo():
+    df = pd.DataFrame({
+        "cargo": ["Analista", "Técnico", "Analista", "Técnico"],
+        "vinculo": ["Efetivo", None, "Cedido de outro tribunal", "Efetivo"],
+    })
+    resultado = categorias.classificar(df)
+    assert list(resultado.categories) == list(categorias.CATEGORIAS)
+    assert list(resultado) == ["efetivos_removidos", "nao_informado", "cedidos_outro_tribunal", "efetivos_removidos"]
+
+
+def test_codigos_sem_vinculo_informado():
+    assert categorias.codigos(pd.DataFrame({"nome": ["Ana"]})) is None
+    # Só o nome do cargo: nenhum registro com vínculo identificado
+    assert categorias.codigos(pd.DataFrame({"cargo": ["Analista", "Técnico"]})) is None
+    codigos = categorias.codigos(pd.DataFrame({"vinculo": ["Removido", "Estagiário"]}))
+    assert codigos.dtype == np.int8
+    assert [list(categorias.CATEGORIAS)[codigo] for codigo in codigos] == ["efetivos_removidos", "outros"]
+
+
+def test_contar_em_uma_passada():
+    indice = {categoria: i for i, categoria in enumerate(categorias.CATEGORIAS)}
+    codigos = [indice["efetivos_removidos"]] * 3 + [indice["cedidos_fora_judiciario"]] * 2 + [indice["outros"]]
+    inconsistentes = [True, False, False, True, True, False]
+    contagem = categorias.contar(codigos, inconsistentes)
+
+    assert contagem.shape == (len(categorias.CATEGORIAS), 2)
+    assert contagem[indice["efetivos_removidos"]].tolist() == [3, 1]
+    assert contagem[indice["cedidos_fora_judiciario"]].tolist() == [2, 2]
+    assert contagem[indice["outros"]].tolist() == [1, 0]
+    assert contagem.sum(axis=0).tolist() == [6, 3]
+    assert categorias.informa_vinculo(contagem)
+    assert not categorias.informa_vinculo(categorias.contar([indice["outros"]], [False]))
+
+
+def test_resumir():
+    indice = {categoria: i for i, categoria in enumerate(categorias.CATEGORIAS)}
+    contagem = categorias.contar([indice["efetivos_removidos"], indice["outros"]], [True, True])
+    tabela = categorias.resumir(contagem)
+    assert tabela.loc["efetivos_removidos", "percentual"] == 100.0
+    assert tabela.loc["cedidos_outro_tribunal", "percentual"] == 0.0
+    assert tabela["considerada"].sum() == len(categorias.CATEGORIAS_SERVIDORES)
+    assert not tabela.loc["outros", "considerada"]
+    exibicao = categorias.para_exibicao(tabela)
+    assert exibicao.loc[0].tolist() == ["Efetivos/removidos", 1, 1, "100.00%", "✅"]
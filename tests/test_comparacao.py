@@ -0,0 +1,112 @@
+import gc
+from datetime import date
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from cnj_indicadores import comparacao, persistencia, registro
+from cnj_indicadores.armazem import armazem_dados
+
+B = "Art. 12, II, b)"
+IV = "Art. 12, IV"
+
+
+def linha(ref, tribunal, mes, percentual, salvo_em="2025-08-01T10:00:00", pontos=10):
+    indicador = registro.obter(ref)
+    resultado = {"percentual": percentual, "aprovado": True, "pontos": pontos, "total": 100, "inconsistentes": 1}
+    ano, numero = map(int, mes.split("-"))
+    dados = persistencia.linha_resultado(tribunal, date(ano, numero, 28), indicador, resultado, "h", ())
+    dados["salvo_em"] = salvo_em
+    return dados
+
+
+def linhas():
+    return [
+        linha(IV, "TJB", "2025-07", 90.0, pontos=50),
+        linha(B, "TJB", "2025-07", 2.0),
+        linha(B, "TJA", "2025-07", 4.0),
+        linha(B, "TJA", "2025-06", 7.0),
+        linha(IV, "TJA", "2025-07", 95.0, pontos=40),
+        # Regravação do mesmo mês: vale a mais recente
+        linha(B, "TJA", "2025-07", 1.0, salvo_em="2025-08-05T10:00:00"),
+    ]
+
+
+@pytest.fixture
+def cubo():
+    return comparacao.Cubo(comparacao.montar_cubo(linhas()))
+
+
+def test_indice_das_fatias(cubo):
+    assert cubo.indice == {B: {"2025-06": [0, 1], "2025-07": [1, 3]}, IV: {"2025-07": [3, 5]}}
+    assert cubo.meses == ["2025-06", "2025-07"]
+    assert cubo.tribunais == ["TJA", "TJB"]
+    assert cubo.refs == [B, IV]
+    assert len(cubo) == 5
+
+
+def test_fatia(cubo):
+    fatia = cubo.fatia(B, "2025-07")
+    assert fatia["tribunal"].astype(str).tolist() == ["TJA", "TJB"]
+    assert fatia["percentual"].tolist() == [1.0, 2.0]
+    assert len(cubo.fatia(B)) == 3
+    assert cubo.fatia(B, "2024-01").empty
+    assert cubo.fatia("Art. 12, V").empty
+
+
+def test_ranking_respeita_o_sentido_do_indicador(cubo):
+    # II, b): quanto menor o percentual, melhor; IV: quanto maior, melhor
+    assert cubo.ranking(B, "2025-07")["tribunal"].astype(str).tolist() == ["TJA", "TJB"]
+    assert cubo.ranking(IV, "2025-07")["tribunal"].astype(str).tolist() == ["TJA", "TJB"]
+    assert cubo.ranking(IV, "2025-07")["posicao"].tolist() == [1, 2]
+
+
+def test_mapa_calor_e_pontuacao(cubo):
+    mapa = cubo.mapa_calor(B)
+    assert list(mapa.columns) == ["2025-06", "2025-07"]
+    assert mapa.loc["TJA"].tolist() == [7.0, 1.0]
+    assert pd.isna(mapa.loc["TJB", "2025-06"])
+    pontuacao = cubo.pontuacao("2025-07")
+    assert pontuacao["tribunal"].tolist() == ["TJB", "TJA"]
+    assert pontuacao["pontos"].tolist() == [60, 50]
+    assert cubo.pontuacao("2020-01").empty
+
+
+def test_gravar_e_abrir(tmp_path):
+    destino = str(tmp_path / "cubo.parquet")
+    comparacao.gravar_cubo(comparacao.montar_cubo(linhas()), destino)
+
+    # Um grupo de linhas por indicador
+    assert pq.ParquetFile(destino).num_row_groups == 2
+    cubo = comparacao.abrir_cubo(destino)
+    assert cubo.indice == comparacao.Cubo(comparacao.montar_cubo(linhas())).indice
+    assert cubo.fatia(B, "2025-07")["percentual"].tolist() == [1.0, 2.0]
+    assert comparacao.abrir_cubo(destino).tabela is cubo.tabela
+
+
+def test_abrir_cubo_ausente_ou_de_outra_versao(tmp_path, monkeypatch):
+    assert comparacao.abrir_cubo(str(tmp_path / "nada.parquet")) is None
+    destino = str(tmp_path / "cubo.parquet")
+    comparacao.gravar_cubo(comparacao.montar_cubo(linhas()), destino)
+    monkeypatch.setattr(comparacao, "VERSAO_CUBO", comparacao.VERSAO_CUBO + 1)
+    assert comparacao.abrir_cubo(destino) is None
+
+
+def test_cubo_mantem_a_tabela_no_armazem(tmp_path):
+    destino = str(tmp_path / "cubo.parquet")
+    comparacao.gravar_cubo(comparacao.montar_cubo(linhas()), destino)
+    cubo = comparacao.abrir_cubo(destino)
+    referencias = armazem_dados.estatisticas()["referencias"]
+    del cubo
+    gc.collect()
+    assert armazem_dados.estatisticas()["referencias"] == referencias - 1
+
+
+def test_construir_cubo_a_partir_do_banco(tmp_path):
+    repositorio = persistencia.RepositorioResultados(str(tmp_path / "resultados.sqlite"))
+    repositorio.salvar(linhas())
+    destino = str(tmp_path / "cubo.parquet")
+    tabela = comparacao.construir_cubo(destino, repositorio)
+    assert tabela.num_rows == 5
+    assert not comparacao.desatualizado(destino, repositorio.caminho)
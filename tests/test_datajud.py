@@ -0,0 +1,244 @@
+import gzip
+import json
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from cnj_indicadores import datajud
+
+NUMERO_VALIDO = "00000010520258260100"
+
+
+def processo(numero=NUMERO_VALIDO, **campos):
+    registro = {
+        "numeroProcesso": numero,
+        "tribunal": "TJXX",
+        "grau": "G1",
+        "dataAjuizamento": "2025-03-10T00:00:00.000Z",
+        "dataHoraUltimaAtualizacao": "2025-07-15T12:00:00.000Z",
+        "classe": {"codigo": 7, "nome": "Procedimento Comum Cível"},
+        "assuntos": [{"codigo": 10431}],
+        "orgaoJulgador": {"codigo": 100, "nome": "1ª Vara"},
+        "formato": {"codigo": 1},
+        "movimentos": [{"codigo": 26}],
+    }
+    registro.update(campos)
+    return registro
+
+
+def gravar(caminho, texto, compactado=False):
+    abrir = gzip.open if compactado else open
+    with abrir(caminho, "wt", encoding="utf-8") as arquivo:
+        arquivo.write(texto)
+    return str(caminho)
+
+
+@pytest.fixture(params=[False, True], ids=["bloco_grande", "bloco_pequeno"])
+def blocos(request, monkeypatch):
+    # Blocos de poucos bytes obrigam elementos e linhas a atravessar várias leituras
+    if request.param:
+        monkeypatch.setattr(datajud, "_TAMANHO_LEITURA", 7)
+
+
+def test_numero_cnj_valido():
+    assert datajud.numero_cnj_valido(NUMERO_VALIDO)
+    assert datajud.numero_cnj_valido("0000001-05.2025.8.26.0100")
+    assert not datajud.numero_cnj_valido("00000010620258260100")
+    assert not datajud.numero_cnj_valido("123")
+    assert not datajud.numero_cnj_valido(None)
+
+
+def test_ano_mes():
+    assert datajud.ano_mes("2025-07-31T10:00:00Z") == "2025-07"
+    assert datajud.ano_mes("20250731000000") == "2025-07"
+    assert datajud.ano_mes("") is None
+
+
+def test_erros_processo():
+    assert datajud.erros_processo(processo()) == 0
+    assert datajud.erros_processo(None) == datajud.ERRO_ILEGIVEL
+    erros = datajud.erros_processo(processo(numeroProcesso="1", assuntos=[], formato={}, movimentos=None))
+    assert erros == datajud.ERRO_NUMERO | datajud.ERRO_ASSUNTO | datajud.ERRO_FORMATO | datajud.ERRO_MOVIMENTOS
+
+
+def test_jsonl(tmp_path, blocos):
+    linhas = [json.dumps(processo(grau=f"G{i}")) for i in range(5)]
+    caminho = gravar(tmp_path / "tjxx.jsonl", "\n".join(linhas) + "\n")
+    assert [registro["grau"] for registro in datajud.iterar_registros(caminho)] == [f"G{i}" for i in range(5)]
+
+
+def test_jsonl_compactado_sem_quebra_final(tmp_path, blocos):
+    linhas = [json.dumps(processo(grau=f"G{i}")) for i in range(3)]
+    caminho = gravar(tmp_path / "tjxx.jsonl.gz", "\n".join(linhas), compactado=True)
+    assert len(list(datajud.iterar_registros(caminho))) == 3
+
+
+@pytest.mark.parametrize("compactado", [False, True], ids=["json", "gz"])
+@pytest.mark.parametrize("texto", [
+    json.dumps(processo()) + "\n" + json.dumps(processo()),
+    json.dumps([processo(), processo()]),
+], ids=["jsonl", "array"])
+def test_arquivo_com_bom(tmp_path, texto, compactado):
+    # Exportações gravadas por ferramentas do Windows começam com a marca de ordem de bytes
+    caminho = gravar(tmp_path / ("tjxx.json.gz" if compactado else "tjxx.json"), "\ufeff" + texto, compactado)
+    registros = list(datajud.iterar_registros(caminho))
+    assert len(registros) == 2
+    assert all(datajud.erros_processo(registro) == 0 for registro in registros)
+
+
+def test_linhas_malformadas_sao_contadas(tmp_path, blocos):
+    texto = "\n".join([json.dumps(processo()), '{"numeroProcesso": "1", ', "", json.dumps(processo())])
+    caminho = gravar(tmp_path / "tjxx.jsonl", texto)
+    registros = list(datajud.iterar_registros(caminho))
+    assert [registro is None for registro in registros] == [False, True, False]
+
+
+def test_array_com_texto_e_chaves_dentro_de_strings(tmp_path, blocos):
+    estranho = processo(orgaoJulgador={"codigo": 100, "nome": 'Vara "[1]" {a}, b\\'})
+    caminho = gravar(tmp_path / "tjxx.json", " [\n" + ",\n".join(json.dumps(p) for p in [processo(), estranho]) + "\n]\n")
+    registros = list(datajud.iterar_registros(caminho))
+    assert len(registros) == 2
+    assert registros[1]["orgaoJulgador"]["nome"] == 'Vara "[1]" {a}, b\\'
+
+
+def test_array_com_elemento_malformado(tmp_path, blocos):
+    texto = "[" + json.dumps(processo()) + ', {"a": [1, 2,]}, ' + json.dumps(processo(grau="G2")) + "]"
+    caminho = gravar(tmp_path / "tjxx.json", texto)
+    registros = list(datajud.iterar_registros(caminho))
+    assert registros[0]["grau"] == "G1"
+    assert registros[1] is None
+    assert registros[2]["grau"] == "G2"
+
+
+def test_array_truncado(tmp_path, blocos):
+    texto = "[" + json.dumps(processo()) + "," + json.dumps(processo())[:40]
+    caminho = gravar(tmp_path / "tjxx.json", texto)
+    registros = list(datajud.iterar_registros(caminho))
+    assert registros[0] is not None
+    assert registros[-1] is None
+
+
+def test_elemento_longo_e_varrido_uma_unica_vez(tmp_path, monkeypatch):
+    # Um elemento de muitos blocos: cada leitura retoma a varredura de onde ela parou
+    monkeypatch.setattr(datajud, "_TAMANHO_LEITURA", 64)
+    varridos = []
+    fim_original = datajud._Varredura.fim
+
+    def fim(varredura, buffer):
+        varridos.append(len(buffer) - varredura.posicao)
+        return fim_original(varredura, buffer)
+
+    monkeypatch.setattr(datajud._Varredura, "fim", fim)
+    longo = processo(movimentos=[{"codigo": i, "nome": "x}]\\\"" * 3} for i in range(500)])
+    texto = "[" + json.dumps(longo) + ', {"a": [1, 2,]' + " " * 5000 + "}, " + json.dumps(processo()) + "]"
+    registros = list(datajud.iterar_registros(gravar(tmp_path / "tjxx.json", texto)))
+    assert [registro is None for registro in registros] == [False, True, False]
+    assert len(registros[0]["movimentos"]) == 500
+    assert sum(varridos) < 2 * len(texto)
+
+
+@pytest.mark.parametrize("tamanho", [1024 * 1024, 100])
+def test_resposta_da_api_com_hits(tmp_path, monkeypatch, tamanho):
+    # O início da resposta, até o array de processos, precisa estar no primeiro bloco
+    monkeypatch.setattr(datajud, "_TAMANHO_LEITURA", tamanho)
+    resposta = {
+        "took": 5,
+        "hits": {"total": {"value": 2}, "hits": [{"_id": "1", "_source": processo()}, {"_id": "2", "_source": processo(grau="G2")}]},
+    }
+    caminho = gravar(tmp_path / "api.json", json.dumps(resposta, indent=2))
+    assert [registro["grau"] for registro in datajud.iterar_registros(caminho)] == ["G1", "G2"]
+
+
+def test_documento_unico_em_varias_linhas(tmp_path):
+    caminho = gravar(tmp_path / "um.json", json.dumps(processo(), indent=2))
+    assert list(datajud.iterar_registros(caminho)) == [processo()]
+
+
+def test_arquivo_vazio(tmp_path):
+    assert list(datajud.iterar_registros(gravar(tmp_path / "vazio.json", "  \n"))) == []
+
+
+def test_resumir_arquivo(tmp_path):
+    linhas = [
+        json.dumps(processo()),
+        json.dumps(processo(formato={"codigo": 2}, movimentos=[{"codigo": 1}, {"codigo": 2}])),
+        json.dumps(processo(assuntos=[])),
+        "não é json",
+    ]
+    caminho = gravar(tmp_path / "tjxx.jsonl", "\n".join(linhas))
+    resumo = datajud.resumir_arquivo(caminho)
+    assert resumo[("TJXX", "G1", "2025-07")] == [3, 4, 1, 2, 1, 0]
+    assert resumo[("", "", "")] == [1, 0, 1, 0, 0, 1]
+
+
+def test_resumir_exportacoes_soma_os_arquivos(tmp_path):
+    primeiro = gravar(tmp_path / "a.jsonl", json.dumps(processo()))
+    segundo = gravar(tmp_path / "b.jsonl", json.dumps(processo()) + "\n" + json.dumps(processo(grau="G2")))
+    resumo = datajud.resumir_exportacoes([primeiro, segundo], processos=1)
+    assert list(resumo.columns) == datajud.COLUNAS_RESUMO
+    assert resumo.set_index("grau")["processos"].to_dict() == {"G1": 2, "G2": 1}
+
+
+def test_executar_em_paralelo_em_processos(tmp_path):
+    caminhos = [
+        gravar(tmp_path / f"{grau}.jsonl", "\n".join(json.dumps(processo(grau=grau)) for _ in range(quantidade)))
+        for grau, quantidade in [("G1", 1), ("G2", 3)]
+    ]
+    sequencial = datajud.executar_em_paralelo(datajud.resumir_arquivo, caminhos, processos=1)
+    paralelo = datajud.executar_em_paralelo(datajud.resumir_arquivo, caminhos, processos=2)
+    assert paralelo == sequencial
+    # Maiores arquivos primeiro
+    assert list(paralelo[0]) == [("TJXX", "G2", "2025-07")]
+
+
+def test_extrair_arquivo(tmp_path):
+    linhas = [json.dumps(processo()), json.dumps(processo(orgaoJulgador={})), "{"]
+    tabela = datajud.extrair_arquivo(gravar(tmp_path / "tjxx.jsonl", "\n".join(linhas)))
+    assert list(tabela.columns) == datajud.COLUNAS_PROCESSOS
+    assert tabela["orgao_codigo"].tolist() == [100, -1, -1]
+    assert tabela["erros"].tolist() == [0, datajud.ERRO_ORGAO, datajud.ERRO_ILEGIVEL]
+
+
+def test_cobertura_remessas():
+    resumo = pd.DataFrame(
+        [("TRT9", "G1", "2025-07", 10), ("TRT9", "G1", "2025-06", 5), ("TRT9", "G2", "2025-07", 3), ("TRT9", "G2", "2025-05", 0)],
+        columns=["tribunal", "grau", "ano_mes", "processos"],
+    )
+    esperados, faltantes = datajud.cobertura_remessas(resumo, date(2025, 7, 31), quantidade=3)
+    assert len(esperados) == 6
+    assert sorted(faltantes) == [("G1", "2025-05"), ("G2", "2025-05"), ("G2", "2025-06")]
+
+
+def test_cobertura_remessas_conta_os_graus_sem_remessa():
+    # Tribunal estadual sem nenhuma remessa dos juizados e das turmas recursais
+    resumo = pd.DataFrame(
+        [("TJXX", "G1", "2025-07", 10), ("TJXX", "G2", "2025-07", 3)],
+        columns=["tribunal", "grau", "ano_mes", "processos"],
+    )
+    esperados, faltantes = datajud.cobertura_remessas(resumo, date(2025, 7, 31), quantidade=1)
+    assert esperados == [("G1", "2025-07"), ("G2", "2025-07"), ("JE", "2025-07"), ("TR", "2025-07")]
+    assert faltantes == [("JE", "2025-07"), ("TR", "2025-07")]
+
+    _, faltantes = datajud.cobertura_remessas(resumo, date(2025, 7, 31), quantidade=1, graus=["G1", "SUP"])
+    assert faltantes == [("SUP", "2025-07")]
+
+
+def test_graus_esperados():
+    assert datajud.graus_esperados("TJMSP") == ("G1", "G2")
+    assert datajud.graus_esperados("tjsp") == ("G1", "G2", "JE", "TR")
+    assert datajud.graus_esperados("TRF3") == ("G1", "G2", "JE", "TR", "TRU")
+    assert datajud.graus_esperados("XYZ") is None
+
+
+def test_cobertura_remessas_ramo_desconhecido_usa_os_graus_dos_dados():
+    resumo = pd.DataFrame(
+        [("XYZ", "G1", "2025-07", 1), ("XYZ", "", "2025-07", 1)],
+        columns=["tribunal", "grau", "ano_mes", "processos"],
+    )
+    esperados, faltantes = datajud.cobertura_remessas(resumo, date(2025, 7, 31), quantidade=1)
+    assert (esperados, faltantes) == ([("G1", "2025-07")], [])
+
+
+def test_meses_janela_atravessa_o_ano():
+    assert datajud.meses_janela(date(2025, 2, 28), 3) == ["2024-12", "2025-01", "2025-02"]
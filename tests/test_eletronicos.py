@@ -0,0 +1,95 @@
+import gzip
+import json
+import os
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from cnj_indicadores import datajud, eletronicos, fontes
+
+
+def processos():
+    meses = ["2025-07", "2025-07", "2025-07", "2025-06", "", "2024-07"]
+    return pd.DataFrame({
+        "tribunal": pd.Categorical(["TJXX"] * len(meses)),
+        "grau": pd.Categorical(["G1"] * len(meses)),
+        "ano_mes": pd.Categorical(meses),
+        "orgao_codigo": np.arange(len(meses), dtype=np.int64),
+        "orgao_nome": pd.Categorical([f"Vara {i}" for i in range(len(meses))]),
+        "formato": np.array([1, 2, 0, 1, 1, 2], dtype=np.int8),
+        "erros": np.zeros(len(meses), dtype=np.uint16),
+    })
+
+
+def corromper_dados(caminho):
+    """Sobrescreve as páginas de dados do Parquet, mantendo o rodapé legível."""
+    with open(caminho, "rb") as arquivo:
+        dados = bytearray(arquivo.read())
+    fim = len(dados) - int.from_bytes(dados[-8:-4], "little") - 8
+    dados[4:fim] = b"\xff" * (fim - 4)
+    with open(caminho, "wb") as arquivo:
+        arquivo.write(dados)
+
+
+def test_particiona_por_ano_e_mes(tmp_path):
+    destino = str(tmp_path / "historico")
+    eletronicos.gravar_historico(processos(), destino)
+    particoes = sorted(os.path.relpath(raiz, destino) for raiz, _, nomes in os.walk(destino) if nomes)
+    # Processos sem mês de referência ficam fora do histórico
+    assert particoes == ["ano=2024/mes=7", "ano=2025/mes=6", "ano=2025/mes=7"]
+
+
+def test_contar_formatos(tmp_path):
+    destino = str(tmp_path / "historico")
+    eletronicos.gravar_historico(processos(), destino)
+    assert eletronicos.contar_formatos(destino, date(2025, 7, 31)) == {"eletronicos": 1, "fisicos": 1, "sem_formato": 1}
+    assert eletronicos.contar_formatos(destino, date(2024, 7, 31)) == {"eletronicos": 0, "fisicos": 1, "sem_formato": 0}
+    assert eletronicos.contar_formatos(destino, date(2023, 1, 31)) == {"eletronicos": 0, "fisicos": 0, "sem_formato": 0}
+
+
+def test_so_a_particao_do_mes_e_lida(tmp_path):
+    destino = str(tmp_path / "historico")
+    eletronicos.gravar_historico(processos(), destino)
+    for particao in ("ano=2025/mes=6", "ano=2024/mes=7"):
+        arquivo = os.path.join(destino, particao, os.listdir(os.path.join(destino, particao))[0])
+        corromper_dados(arquivo)
+        with pytest.raises(OSError):
+            pq.read_table(arquivo)
+    assert eletronicos.contar_formatos(destino, date(2025, 7, 31))["eletronicos"] == 1
+
+
+def test_atualizar_historico_reaproveita_o_publicado(tmp_path, monkeypatch):
+    monkeypatch.setattr(fontes, "DIRETORIO_CACHE", str(tmp_path / "cache"))
+    exportacoes = tmp_path / "datajud"
+    exportacoes.mkdir()
+    with gzip.open(exportacoes / "tjxx.jsonl.gz", "wt", encoding="utf-8") as arquivo:
+        for mes, formato in [("07", 1), ("07", 2), ("06", 1)]:
+            arquivo.write(json.dumps({
+                "tribunal": "TJXX", "grau": "G1", "formato": {"codigo": formato},
+                "dataHoraUltimaAtualizacao": f"2025-{mes}-10T00:00:00Z",
+            }) + "\n")
+
+    raiz = str(tmp_path / "historicos")
+    destino = eletronicos.atualizar_historico(str(exportacoes), raiz)
+    assert os.path.isfile(os.path.join(destino, "_assinatura"))
+    assert eletronicos.contar_formatos(destino, date(2025, 7, 31)) == {"eletronicos": 1, "fisicos": 1, "sem_formato": 0}
+
+    chamadas = []
+    monkeypatch.setattr(datajud, "carregar_processos", lambda *args: chamadas.append(args))
+    assert eletronicos.atualizar_historico(str(exportacoes), raiz) == destino
+    assert chamadas == []
+
+
+@pytest.mark.parametrize("meses", [[], [""]], ids=["sem_processos", "sem_mes_valido"])
+def test_atualizar_historico_sem_processos(tmp_path, monkeypatch, meses):
+    vazio = processos().iloc[:len(meses)].assign(ano_mes=pd.Categorical(meses))
+    monkeypatch.setattr(datajud, "carregar_processos", lambda *args: vazio)
+    exportacoes = tmp_path / "datajud"
+    exportacoes.mkdir()
+
+    destino = eletronicos.atualizar_historico(str(exportacoes), str(tmp_path / "historicos"))
+    assert os.path.isfile(os.path.join(destino, "_assinatura"))
+    assert eletronicos.contar_formatos(destino, date(2025, 7, 31)) == {"eletronicos": 0, "fisicos": 0, "sem_formato": 0}
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+from cnj_indicadores import evolucao
+
+
+def mes_anterior():
+    return pd.DataFrame({
+        "matricula": ["1", "2", "3", "4", "5"],
+        "nome": ["Ana", "Bia", "Caio", "Davi", "Eva"],
+        "sexo": ["F", "não informado", "M", "M", "F"],
+        "uf": ["SP", "RJ", "XX", "MG", "SP"],
+    })
+
+
+def mes_atual():
+    # 1 e 4 iguais; 2 corrige o sexo; 3 corrige a UF e quebra o sexo; 5 sai; 6 e 7 entram
+    return pd.DataFrame({
+        "matricula": ["7", "4", "3", "2", "1", "6"],
+        "nome": ["Gil", "Davi", "Caio", "Bia", "Ana", "Fabi"],
+        "sexo": ["M", "M", "N/I", "F", "F", "F"],
+        "uf": ["SP", "MG", "RJ", "RJ", "SP", "XX"],
+    })
+
+
+def test_comparar():
+    anterior = evolucao.indexar(mes_anterior())
+    atual = evolucao.indexar(mes_atual())
+    delta = evolucao.comparar(anterior, atual)
+
+    assert sorted(delta.incluidos) == ["6", "7"]
+    assert list(delta.excluidos) == ["5"]
+    assert sorted(delta.alterados) == ["2", "3"]
+    assert delta.corrigidos.to_dict() == {"matricula": 0, "nome": 0, "sexo": 1, "uf": 1}
+    assert delta.quebrados.to_dict() == {"matricula": 0, "nome": 0, "sexo": 1, "uf": 0}
+    assert (delta.inconsistentes_anterior, delta.inconsistentes_atual) == (2, 2)
+    assert (delta.total_anterior, delta.total_atual) == (5, 6)
+    assert delta.resumo == {
+        "incluidos": 2, "excluidos": 1, "alterados": 2, "campos_corrigidos": 2, "campos_quebrados": 1,
+    }
+    assert delta.tabela_campos()["saldo"].to_dict() == {"sexo": 0, "uf": 1}
+
+
+def test_parear_usa_a_primeira_ocorrencia_da_chave():
+    anterior = evolucao.indexar(mes_anterior())
+    duplicado = pd.concat([mes_atual(), mes_atual().iloc[[4]].assign(nome="Outra Ana")], ignore_index=True)
+    atual = evolucao.indexar(duplicado)
+    no_anterior, no_atual = evolucao.parear(anterior, atual)
+    pares = dict(zip(anterior.chaves[no_anterior], no_atual))
+    assert pares == {"1": 4, "2": 3, "3": 2, "4": 1}
+
+
+def test_numeros_lidos_como_float_ou_texto_tem_o_mesmo_hash():
+    como_texto = pd.Series(["12", "7", None], dtype=object)
+    como_numero = pd.Series([12.0, 7.0, np.nan])
+    hashes_texto, nulos_texto = evolucao.hash_coluna(como_texto)
+    hashes_numero, nulos_numero = evolucao.hash_coluna(como_numero)
+    np.testing.assert_array_equal(hashes_texto, hashes_numero)
+    np.testing.assert_array_equal(nulos_texto, [False, False, True])
+    np.testing.assert_array_equal(nulos_numero, nulos_texto)
+
+
+def test_nulo_e_valor_com_hash_zero_sao_diferentes(monkeypatch):
+    # hash_array pode devolver 0 para um texto: o nulo não é identificado pelo hash
+    monkeypatch.setattr(pd.util, "hash_array", lambda valores: np.zeros(len(valores), dtype=np.uint64))
+    anterior = evolucao.indexar(mes_anterior().assign(uf=["SP", None, "XX", "MG", "SP"]))
+    atual = evolucao.indexar(mes_anterior().assign(uf=["SP", "RJ", "XX", "MG", None]))
+    assert sorted(evolucao.comparar(anterior, atual).alterados) == ["2", "5"]
+
+
+def test_chaves_numericas_e_de_texto_se_pareiam():
+    anterior = mes_anterior().assign(matricula=[1.0, 2.0, 3.0, 4.0, 5.0])
+    delta = evolucao.comparar(evolucao.indexar(anterior), evolucao.indexar(mes_anterior()))
+    assert delta.resumo == {"incluidos": 0, "excluidos": 0, "alterados": 0, "campos_corrigidos": 0, "campos_quebrados": 0}
+
+
+def test_campos_de_um_so_mes_nao_sao_comparados():
+    anterior = evolucao.indexar(mes_anterior().drop(columns=["uf"]))
+    atual = evolucao.indexar(mes_atual())
+    delta = evolucao.comparar(anterior, atual)
+    assert list(delta.corrigidos.index) == ["matricula", "nome", "sexo"]
+    assert sorted(delta.alterados) == ["2", "3"]
+
+
+def test_valor_apagado_conta_como_alteracao():
+    anterior = mes_anterior()
+    atual = anterior.copy()
+    atual.loc[0, "nome"] = None
+    delta = evolucao.comparar(evolucao.indexar(anterior), evolucao.indexar(atual))
+    assert list(delta.alterados) == ["1"]
+    assert delta.quebrados["nome"] == 1
@@ -0,0 +1,20 @@
+import io
+import zipfile
+
+from streamlit.elements.widgets.button import convert_data_to_bytes_and_infer_mime
+
+from cnj_indicadores import exportacao
+
+RESULTADOS = {
+    "Art. 12, IV": {"total": 10, "inconsistentes": 1, "percentual": 10.0, "pontos": 0, "pontos_max": 20, "aprovado": False},
+}
+
+
+def test_conteudo_relatorio_e_aceito_pelo_download():
+    conteudo = exportacao.conteudo_relatorio(RESULTADOS, {}, "csv")
+    # O download do Streamlit aceita bytes, mas não o arquivo temporário devolvido por gerar_relatorio
+    assert convert_data_to_bytes_and_infer_mime(conteudo, ValueError())[0] == conteudo
+    with zipfile.ZipFile(io.BytesIO(conteudo)) as pacote:
+        assert pacote.namelist() == ["resumo.csv"]
+        texto = pacote.read("resumo.csv").decode("utf-8-sig")
+    assert texto.splitlines()[1].startswith("Art. 12, IV;")
@@ -0,0 +1,98 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from benchmarks import gerador
+from cnj_indicadores import fontes
+
+
+@pytest.fixture(autouse=True)
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(fontes, "DIRETORIO_CACHE", str(tmp_path / "cache"))
+
+
+def test_compactar_tipos():
+    df = pd.DataFrame({
+        "matricula": pd.Series(["1", "2", "300"], dtype="string"),
+        "codigo": pd.Series(["007", "8", "9"], dtype="string"),
+        "negativo": pd.Series(["-1", "2", "3"], dtype="string"),
+        "admissao": pd.Series(["2020-01-31", "Não informado", "2021-12-01"], dtype="string"),
+        "uf": pd.Series(["SP", "SP", "RJ"], dtype="string"),
+        "nome": pd.Series(["Ana", "Bia", "Caio"], dtype="string"),
+        "idade": np.array([30, 40, 50], dtype=np.int64),
+    })
+    compacto = fontes.compactar(df)
+    assert compacto["matricula"].dtype == np.uint16
+    # Zeros à esquerda não são a forma canônica de um inteiro
+    assert compacto["codigo"].dtype == pd.ArrowDtype(pa.string())
+    assert compacto["negativo"].dtype == np.int8
+    assert compacto["admissao"].dtype == pd.ArrowDtype(pa.date32())
+    assert compacto["admissao"].isna().tolist() == [False, True, False]
+    assert compacto["uf"].dtype == "category"
+    assert compacto["nome"].dtype == pd.ArrowDtype(pa.string())
+    assert compacto["idade"].dtype == np.uint8
+
+
+def test_texto_qualquer_mantem_a_coluna_de_datas_como_texto():
+    serie = pd.Series(["2020-01-31", "ontem", "2021-12-01"], dtype="string")
+    assert fontes._datas(serie) is None
+
+
+def test_datas_com_hora_continuam_datetime():
+    serie = pd.Series(pd.to_datetime(["2020-01-31 10:00", "2021-12-01 00:00"]))
+    assert fontes.compactar(pd.DataFrame({"momento": serie}))["momento"].dtype == serie.dtype
+
+
+def test_planilha_compacta_ocupa_um_quinto_do_quadro_padrao(tmp_path):
+    caminho = str(tmp_path / "MPM_Servidores_2025_07.xlsx")
+    gerador.gerar_mpm(5_000, "servidores", 0.05).to_excel(caminho, index=False)
+
+    padrao = pd.read_excel(caminho, engine="openpyxl")
+    compacto = fontes.carregar_planilha(caminho)
+
+    assert fontes.uso_memoria(padrao) >= 5 * fontes.uso_memoria(compacto)
+    # Mesmos valores, só em tipos menores
+    assert len(compacto) == len(padrao)
+    assert compacto["matricula"].astype("int64").tolist() == padrao["Matrícula"].tolist()
+    assert compacto["nome"].astype(str).tolist() == padrao["Nome"].astype(str).tolist()
+
+
+def test_indice_registra_cada_arquivo_sem_perder_os_demais(tmp_path, monkeypatch):
+    monkeypatch.setattr(fontes, "DIRETORIO_CACHE", str(tmp_path / "cache"))
+    caminhos = []
+    for i in range(16):
+        caminho = tmp_path / f"fonte_{i}.csv"
+        caminho.write_text(f"a;b\n{i};x\n", encoding="utf-8")
+        caminhos.append(str(caminho))
+
+    threads = [threading.Thread(target=fontes.hash_arquivo, args=(caminho,)) for caminho in caminhos]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Registros gravados ao mesmo tempo por threads diferentes continuam todos no índice
+    for caminho in caminhos:
+        registro = fontes._ler_registro(caminho)
+        assert registro["hash"] == fontes.hash_arquivo(caminho)
+    assert not [nome for nome in (tmp_path / "cache" / "indice").iterdir() if nome.suffix != ".json"]
+
+
+def test_abrir_tabela_calcula_o_hash_uma_vez(tmp_path, monkeypatch):
+    monkeypatch.setattr(fontes, "DIRETORIO_CACHE", str(tmp_path / "cache"))
+    caminho = tmp_path / "MPM_Servidores_2025_07.csv"
+    caminho.write_text("Nome;Cargo\nAna;Analista\n", encoding="utf-8")
+    chamadas = []
+    hash_original = fontes.hash_arquivo
+
+    def hash_arquivo(caminho):
+        chamadas.append(caminho)
+        return hash_original(caminho)
+
+    monkeypatch.setattr(fontes, "hash_arquivo", hash_arquivo)
+    with fontes.abrir_tabela(str(caminho)) as referencia:
+        assert referencia.tabela.num_rows == 1
+    assert len(chamadas) == 1
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cnj_indicadores import inconsistencias
+from cnj_indicadores.inconsistencias import ResultadoInconsistencias
+
+
+def planilha():
+    return pd.DataFrame({
+        "matricula": ["1", "2", "3", "4", "5"],
+        "nome": ["Ana", "Não Informado", "Carlos", None, "Eva"],
+        "sexo": ["F", "M", "X", "F", "masculino"],
+        "uf": ["SP", "rj", "SP", "zz", "MG"],
+        "observacao": ["", "", "", "", "não informado"],
+        "situacao": ["Ativo", "Ativo", "Inativo", "Ativo", "Em exercício"],
+    })
+
+
+def test_mascara_coluna_ausentes_e_nao_informado():
+    serie = pd.Series(["ok", " N/I ", None, "nao consta", "ok", "-"])
+    assert inconsistencias.mascara_coluna(serie).tolist() == [False, True, True, True, False, True]
+
+
+def test_mascara_coluna_fora_do_dominio():
+    serie = pd.Series(["SP", "sp", "XX", "Não informado"])
+    assert inconsistencias.mascara_coluna(serie, {"sp"}).tolist() == [False, False, True, True]
+
+
+def test_mascara_coluna_inteiros_lidos_como_float():
+    serie = pd.Series([12.0, 7.0, np.nan])
+    assert inconsistencias.mascara_coluna(serie, {"12"}).tolist() == [False, True, True]
+
+
+def test_detectar_inconsistencias_por_campo():
+    df = planilha()
+    resultado = inconsistencias.detectar_inconsistencias(df)
+
+    # Observações (texto livre) não entram na verificação
+    assert resultado.campos == ["matricula", "nome", "sexo", "uf", "situacao"]
+    assert resultado.total == 5
+    assert resultado.por_campo.to_dict() == {"matricula": 0, "nome": 2, "sexo": 1, "uf": 1, "situacao": 0}
+    assert resultado.mascara_linhas.tolist() == [False, True, True, True, False]
+    assert resultado.inconsistentes == 3
+
+
+def test_filtrar_ativos():
+    ativos = inconsistencias.filtrar_ativos(planilha())
+    assert ativos["matricula"].tolist() == ["1", "2", "4", "5"]
+    assert ativos.index.tolist() == [0, 1, 2, 3]
+
+
+@pytest.mark.parametrize("registros", [1, 7, 8, 9, 100])
+def test_mascara_compactada_ida_e_volta(registros):
+    rng = np.random.default_rng(registros)
+    mascara = rng.random((registros, 3)) < 0.3
+    resultado = ResultadoInconsistencias.de_mascara(["a", "b", "c"], mascara)
+
+    # Um bit por registro, em bytes completos
+    assert resultado.bits.shape == (3, (registros + 7) // 8)
+    assert resultado.bits.dtype == np.uint8
+    np.testing.assert_array_equal(resultado.mascara, mascara)
+    np.testing.assert_array_equal(resultado.mascara_campo("b"), mascara[:, 1])
+    np.testing.assert_array_equal(resultado.mascara_campos([0, 2]), mascara[:, 0] | mascara[:, 2])
+    np.testing.assert_array_equal(resultado.mascara_linhas, mascara.any(axis=1))
+    assert resultado.por_campo.tolist() == mascara.sum(axis=0).tolist()
+    assert resultado.inconsistentes == int(mascara.any(axis=1).sum())
+
+
+def test_linhas_seleciona_registros():
+    mascara = np.zeros((20, 2), dtype=bool)
+    mascara[[0, 9, 17], 0] = True
+    mascara[[9, 19], 1] = True
+    resultado = ResultadoInconsistencias.de_mascara(["a", "b"], mascara)
+
+    posicoes = [19, 0, 9, 3]
+    np.testing.assert_array_equal(resultado.linhas(posicoes), mascara[posicoes])
+
+
+def test_mascara_campos_sem_campos():
+    resultado = ResultadoInconsistencias.de_mascara(["a"], np.ones((5, 1), dtype=bool))
+    assert resultado.mascara_campos([]).tolist() == [False] * 5
@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cnj_indicadores import fontes, incremental, inconsistencias
+
+
+def mes(linhas=40, semente=0):
+    rng = np.random.default_rng(semente)
+    return pd.DataFrame({
+        "matricula": [str(i) for i in range(1, linhas + 1)],
+        "nome": [f"Pessoa {i}" for i in range(linhas)],
+        "sexo": rng.choice(["M", "F", "não informado"], linhas, p=[0.45, 0.45, 0.1]),
+        "uf": rng.choice(["SP", "RJ", "XX"], linhas, p=[0.5, 0.4, 0.1]),
+    })
+
+
+def completo(df):
+    return inconsistencias.detectar_inconsistencias(df).mascara
+
+
+@pytest.fixture
+def deteccoes(monkeypatch):
+    """Tamanho de cada conjunto de linhas que passou pela detecção."""
+    tamanhos = []
+    original = inconsistencias.detectar_inconsistencias
+
+    def detectar(df, *args, **kwargs):
+        tamanhos.append(len(df))
+        return original(df, *args, **kwargs)
+
+    monkeypatch.setattr(inconsistencias, "detectar_inconsistencias", detectar)
+    return tamanhos
+
+
+def test_sem_estado_avalia_tudo():
+    df = mes()
+    resultado, estado, reavaliadas = incremental.reavaliar(df)
+    assert reavaliadas == len(df)
+    np.testing.assert_array_equal(resultado.mascara, completo(df))
+    assert estado.campos == ["matricula", "nome", "sexo", "uf"]
+
+
+def test_reaproveita_linhas_inalteradas(deteccoes):
+    anterior = mes()
+    _, estado, _ = incremental.reavaliar(anterior)
+
+    atual = anterior.copy()
+    atual.loc[3, "sexo"] = "N/I"
+    atual.loc[7, "uf"] = "MG"
+    # Registros novos e excluídos, e linhas fora da ordem anterior
+    atual = pd.concat([atual.drop(index=[10, 11]), pd.DataFrame({
+        "matricula": ["100", "101"], "nome": ["Nova", "Outra"], "sexo": ["F", ""], "uf": ["SP", "SP"],
+    })]).sample(frac=1, random_state=1).reset_index(drop=True)
+
+    deteccoes.clear()
+    resultado, _, reavaliadas = incremental.reavaliar(atual, estado)
+
+    assert reavaliadas == 4
+    assert deteccoes == [4]
+    np.testing.assert_array_equal(resultado.mascara, completo(atual))
+
+
+def test_mes_identico_nao_reavalia(deteccoes):
+    df = mes()
+    _, estado, _ = incremental.reavaliar(df)
+    deteccoes.clear()
+    resultado, _, reavaliadas = incremental.reavaliar(df.copy(), estado)
+    assert reavaliadas == 0
+    assert deteccoes == []
+    np.testing.assert_array_equal(resultado.mascara, completo(df))
+
+
+def test_acima_do_limite_faz_a_deteccao_completa(deteccoes):
+    anterior = mes()
+    _, estado, _ = incremental.reavaliar(anterior)
+
+    atual = anterior.copy()
+    alteradas = np.arange(int(len(atual) * 0.6))
+    atual.loc[alteradas, "nome"] = "Renomeado"
+
+    deteccoes.clear()
+    resultado, _, reavaliadas = incremental.reavaliar(atual, estado)
+
+    assert reavaliadas == len(alteradas)
+    assert len(alteradas) > incremental.FRACAO_MAXIMA_ALTERADAS * len(atual)
+    assert deteccoes == [len(atual)]
+    np.testing.assert_array_equal(resultado.mascara, completo(atual))
+
+
+def test_outros_campos_descartam_o_estado():
+    anterior = mes()
+    _, estado, _ = incremental.reavaliar(anterior)
+    atual = anterior.drop(columns=["uf"])
+    resultado, _, reavaliadas = incremental.reavaliar(atual, estado)
+    assert reavaliadas == len(atual)
+    np.testing.assert_array_equal(resultado.mascara, completo(atual))
+
+
+def test_chaves_duplicadas_usam_a_primeira_ocorrencia():
+    anterior = mes(10)
+    anterior.loc[5, "matricula"] = "1"
+    _, estado, _ = incremental.reavaliar(anterior)
+    resultado, _, _ = incremental.reavaliar(anterior.copy(), estado)
+    np.testing.assert_array_equal(resultado.mascara, completo(anterior))
+
+
+def test_sem_coluna_de_chave_nao_gera_estado():
+    df = mes().drop(columns=["matricula"])
+    resultado, estado, reavaliadas = incremental.reavaliar(df)
+    assert estado is None
+    assert reavaliadas == len(df)
+    np.testing.assert_array_equal(resultado.mascara, completo(df))
+
+
+def test_estado_gravado_ida_e_volta(tmp_path, monkeypatch):
+    _, estado, _ = incremental.reavaliar(mes())
+    destino = str(tmp_path / "estado.parquet")
+    incremental.gravar_estado(estado, destino)
+
+    lido = incremental.ler_estado(destino)
+    assert lido.campos == estado.campos
+    np.testing.assert_array_equal(lido.chaves, estado.chaves)
+    np.testing.assert_array_equal(lido.hashes, estado.hashes)
+    np.testing.assert_array_equal(lido.mascara, estado.mascara)
+
+    # Estado gravado com outras regras de detecção é descartado
+    monkeypatch.setattr(incremental, "assinatura_regras", lambda: "outras")
+    assert incremental.ler_estado(destino) is None
+
+
+def test_ler_estado_ausente(tmp_path):
+    assert incremental.ler_estado(str(tmp_path / "nada.parquet")) is None
+
+
+def test_analisar_incremental_grava_o_estado(tmp_path, monkeypatch, deteccoes):
+    monkeypatch.setattr(fontes, "DIRETORIO_CACHE", str(tmp_path))
+    caminho = str(tmp_path / "MPM_Servidores_2025_07.xlsx")
+    anterior = mes()
+    incremental.analisar_incremental(caminho, anterior)
+    assert incremental.ler_estado(incremental.caminho_estado(caminho)) is not None
+
+    atual = anterior.copy()
+    atual.loc[0, "uf"] = "XX"
+    deteccoes.clear()
+    resultado = incremental.analisar_incremental(caminho.replace("_07", "_08"), atual)
+
+    assert deteccoes == [1]
+    np.testing.assert_array_equal(resultado.mascara, completo(atual))
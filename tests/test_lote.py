@@ -0,0 +1,24 @@
+import os
+
+from cnj_indicadores import lote, registro
+
+
+def test_fonte_ilegivel_fica_no_erro_da_linha(tmp_path):
+    # Exportação do DataJud que some entre a listagem e a leitura (link quebrado)
+    datajud = tmp_path / "TJXX" / "datajud"
+    datajud.mkdir(parents=True)
+    os.symlink(tmp_path / "inexistente.json", datajud / "tjxx.json")
+
+    linhas = lote.calcular_tribunal(str(tmp_path), "TJXX", refs=["Art. 12, I"])
+
+    assert [linha["ref"] for linha in linhas] == ["Art. 12, I"]
+    assert linhas[0]["hash_fontes"] is None
+    assert linhas[0]["erro"].startswith("FileNotFoundError")
+
+
+def test_tribunal_sem_fontes(tmp_path):
+    (tmp_path / "TJXX").mkdir()
+    linhas = lote.calcular_tribunal(str(tmp_path), "TJXX")
+    assert len(linhas) == len([indicador for indicador in registro.indicadores() if indicador.implementado])
+    assert {linha["erro"] for linha in linhas} == {"fonte ausente"}
+    assert {linha["hash_fontes"] for linha in linhas} == {None}
@@ -0,0 +1,94 @@
+import threading
+from datetime import date
+
+import pytest
+
+from cnj_indicadores import persistencia, registro
+
+JULHO = date(2025, 7, 31)
+
+
+@pytest.fixture
+def repositorio(tmp_path):
+    return persistencia.RepositorioResultados(str(tmp_path / "resultados.sqlite"))
+
+
+def linha(ref="Art. 12, II, b)", tribunal="TJXX", data=JULHO, hash_fontes="h1", percentual=3.0, salvo_em=None):
+    resultado = {"percentual": percentual, "aprovado": percentual <= 5, "pontos": 20, "total": 100, "inconsistentes": 3}
+    dados = persistencia.linha_resultado(tribunal, data, registro.obter(ref), resultado, hash_fontes, ["MPM_Servidores_2025_07.xlsx"])
+    if salvo_em is not None:
+        dados["salvo_em"] = salvo_em
+    return dados
+
+
+def contar(repositorio):
+    return repositorio._conexao().execute("SELECT COUNT(*) FROM resultados").fetchone()[0]
+
+
+def test_linha_resultado():
+    dados = linha()
+    assert set(dados) == set(persistencia.COLUNAS)
+    assert dados["data_referencia"] == "2025-07-31"
+    assert dados["aprovado"] == 1
+    assert dados["pontos_max"] == 20
+
+
+def test_mesma_chave_substitui_a_linha(repositorio):
+    repositorio.salvar([linha(percentual=3.0, salvo_em="2025-08-01T10:00:00")])
+    repositorio.salvar([linha(percentual=8.0, salvo_em="2025-08-02T10:00:00")])
+    assert contar(repositorio) == 1
+    resultado = repositorio.consultar("TJXX", JULHO)["Art. 12, II, b)"]
+    assert resultado["percentual"] == 8.0
+    assert resultado["aprovado"] is False
+
+
+def test_outras_fontes_acrescentam_linha_e_a_mais_recente_prevalece(repositorio):
+    repositorio.salvar([
+        linha(hash_fontes="h2", percentual=4.0, salvo_em="2025-08-02T10:00:00"),
+        linha(hash_fontes="h1", percentual=3.0, salvo_em="2025-08-01T10:00:00"),
+    ])
+    assert contar(repositorio) == 2
+    assert repositorio.consultar("TJXX", JULHO)["Art. 12, II, b)"]["percentual"] == 4.0
+    ultimos = repositorio.listar_ultimos()
+    assert [(linha["hash_fontes"], linha["percentual"]) for linha in ultimos] == [("h2", 4.0)]
+
+
+def test_consulta_por_tribunal_e_data(repositorio):
+    repositorio.salvar([
+        linha(),
+        linha(ref="Art. 12, II, c)"),
+        linha(tribunal="TRT2"),
+        linha(data=date(2025, 6, 30)),
+    ])
+    assert set(repositorio.consultar("TJXX", JULHO)) == {"Art. 12, II, b)", "Art. 12, II, c)"}
+    assert set(repositorio.consultar("TRT2", JULHO)) == {"Art. 12, II, b)"}
+    assert repositorio.consultar("TRT2", date(2025, 6, 30)) == {}
+    assert len(repositorio.listar_ultimos()) == 4
+
+
+def test_gravacao_em_lotes(tmp_path):
+    repositorio = persistencia.RepositorioResultados(str(tmp_path / "resultados.sqlite"), tamanho_lote=3)
+    repositorio.adicionar(linha(hash_fontes="a"))
+    repositorio.adicionar(linha(hash_fontes="b"))
+    assert contar(repositorio) == 0
+    repositorio.adicionar(linha(hash_fontes="c"))
+    assert contar(repositorio) == 3
+    repositorio.adicionar(linha(hash_fontes="d"))
+    assert repositorio.gravar_pendentes() == 1
+    assert repositorio.gravar_pendentes() == 0
+    assert contar(repositorio) == 4
+
+
+def test_uma_conexao_por_thread(repositorio):
+    repositorio.salvar([linha()])
+    conexoes, consultas = [], []
+
+    def consultar():
+        conexoes.append(repositorio._conexao())
+        consultas.append(repositorio.consultar("TJXX", JULHO))
+
+    thread = threading.Thread(target=consultar)
+    thread.start()
+    thread.join()
+    assert list(consultas[0]) == ["Art. 12, II, b)"]
+    assert conexoes[0] is not repositorio._conexao()
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cnj_indicadores import datajud, saneamento
+
+
+def processos(nomes_categoricos=True):
+    df = pd.DataFrame({
+        "orgao_codigo": np.array([30, 10, 30, -1, 20, 10, 30, 20], dtype=np.int64),
+        "orgao_nome": ["Vara C", "Vara A", "Vara C (antiga)", "", "Vara B", "Vara A2", "Vara C", "Vara B"],
+        "erros": np.array([0, datajud.ERRO_CLASSE, datajud.ERRO_CLASSE | datajud.ERRO_ASSUNTO, datajud.ERRO_ORGAO, 0, 0, 0, 0], dtype=np.uint16),
+    })
+    if nomes_categoricos:
+        df["orgao_nome"] = df["orgao_nome"].astype("category")
+    return df
+
+
+@pytest.mark.parametrize("nomes_categoricos", [True, False])
+def test_taxas_por_unidade(nomes_categoricos):
+    ranking = saneamento.taxas_por_unidade(processos(nomes_categoricos))
+
+    # Sem órgão identificado não entra; maior taxa primeiro
+    assert ranking["orgao_codigo"].tolist() == [10, 30, 20]
+    # Nome da primeira ocorrência de cada código
+    assert ranking["orgao_nome"].tolist() == ["Vara A", "Vara C", "Vara B"]
+    assert ranking["processos"].tolist() == [2, 3, 2]
+    assert ranking["com_erro"].tolist() == [1, 1, 0]
+    assert ranking["taxa_erro"].tolist() == pytest.approx([50.0, 100 / 3, 0.0])
+    assert ranking[datajud.DESCRICAO_ERROS[datajud.ERRO_CLASSE]].tolist() == [1, 1, 0]
+    assert ranking[datajud.DESCRICAO_ERROS[datajud.ERRO_ASSUNTO]].tolist() == [0, 1, 0]
+    assert ranking[datajud.DESCRICAO_ERROS[datajud.ERRO_ORGAO]].sum() == 0
+
+
+def test_nome_da_primeira_ocorrencia_com_codigos_fora_de_ordem():
+    # Códigos que reaparecem entre códigos novos não mudam o nome já escolhido
+    df = pd.DataFrame({
+        "orgao_codigo": np.array([5, 7, 5, 9, 7, 9], dtype=np.int64),
+        "orgao_nome": pd.Categorical(["E1", "S1", "E2", "N1", "S2", "N2"]),
+        "erros": np.zeros(6, dtype=np.uint16),
+    })
+    ranking = saneamento.taxas_por_unidade(df).sort_values("orgao_codigo")
+    assert ranking["orgao_nome"].tolist() == ["E1", "S1", "N1"]
+
+
+def test_nome_categorico_ausente():
+    df = pd.DataFrame({
+        "orgao_codigo": np.array([1, 1], dtype=np.int64),
+        "orgao_nome": pd.Categorical([None, "Vara"]),
+        "erros": np.zeros(2, dtype=np.uint16),
+    })
+    assert saneamento.taxas_por_unidade(df)["orgao_nome"].tolist() == [""]
+
+
+def test_sem_processos_atribuidos():
+    df = processos().iloc[[3]]
+    ranking = saneamento.taxas_por_unidade(df)
+    assert ranking.empty
+    assert saneamento.percentual_saneadas(ranking) == 0.0
+
+
+def test_percentual_saneadas():
+    ranking = saneamento.taxas_por_unidade(processos())
+    assert saneamento.percentual_saneadas(ranking) == pytest.approx(100 / 3)
+    assert saneamento.percentual_saneadas(ranking, tolerancia=50) == 100.0
@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+
+from cnj_indicadores import simulacao
+from cnj_indicadores.inconsistencias import ResultadoInconsistencias
+
+CAMPOS = ["nome", "sexo", "uf", "cargo"]
+
+# Registros x campos: 10 registros, 7 inconsistentes
+MASCARA = np.array([
+    [1, 0, 0, 0],
+    [1, 0, 0, 0],
+    [1, 0, 0, 0],
+    [0, 1, 0, 0],
+    [0, 1, 1, 0],
+    [0, 0, 1, 1],
+    [1, 1, 1, 1],
+    [0, 0, 0, 0],
+    [0, 0, 0, 0],
+    [0, 0, 0, 0],
+], dtype=bool)
+LOTACOES = ["Vara 1", "Vara 2", "Não informado"]
+LOTACAO = np.array([0, 0, 1, 1, 1, 2, -1, 0, 1, 0])
+
+
+@pytest.fixture
+def simulada():
+    analise = ResultadoInconsistencias.de_mascara(CAMPOS, MASCARA)
+    return simulacao.preparar(analise, LOTACAO, LOTACOES)
+
+
+def validados_por_campos(campos):
+    corrigidos = [CAMPOS.index(campo) for campo in campos]
+    restantes = MASCARA.copy()
+    restantes[:, corrigidos] = False
+    return int(MASCARA.any(axis=1).sum() - restantes.any(axis=1).sum())
+
+
+def test_percentual_e_necessarios(simulada):
+    assert (simulada.total, simulada.inconsistentes) == (10, 7)
+    assert simulada.percentual() == pytest.approx(70)
+    assert simulada.percentual(3) == pytest.approx(40)
+    assert simulada.percentual(20) == 0
+    assert simulada.necessarios(70) == 0
+    assert simulada.necessarios(50) == 2
+    assert simulada.necessarios(0) == 7
+
+
+def test_meta_fracionaria_sem_erro_de_arredondamento():
+    mascara = np.zeros((300, 1), dtype=bool)
+    mascara[:20] = True
+    simulada = simulacao.preparar(ResultadoInconsistencias.de_mascara(["nome"], mascara))
+    # 5% de 300 são 15 registros, não 14
+    assert simulada.necessarios(5) == 5
+
+
+def test_edicoes_corrigem_primeiro_os_registros_mais_baratos(simulada):
+    custos = np.sort(MASCARA.sum(axis=1)[MASCARA.any(axis=1)])
+    assert list(custos) == [1, 1, 1, 1, 2, 2, 4]
+    for registros in range(0, 9):
+        assert simulada.edicoes(registros) == int(custos[:registros].sum())
+
+
+def test_campos_em_ordem_decrescente_de_impacto(simulada):
+    # nome valida 3 registros sozinho, sexo 1; uf e cargo nenhum, uf com mais inválidos
+    assert simulada.campos == ["nome", "sexo", "uf", "cargo"]
+    assert list(simulada.impacto_campos) == [3, 1, 0, 0]
+    assert list(simulada.invalidos_campos) == [4, 3, 3, 2]
+    for quantidade in range(len(CAMPOS) + 1):
+        assert simulada.acumulado_campos[quantidade] == validados_por_campos(simulada.campos[:quantidade])
+
+
+def test_desempate_pelo_total_de_invalidos():
+    mascara = np.array([[1, 0, 0], [0, 1, 0], [0, 1, 1], [0, 1, 1]], dtype=bool)
+    simulada = simulacao.preparar(ResultadoInconsistencias.de_mascara(["b", "a", "c"], mascara))
+    assert list(simulada.impacto_campos) == [1, 1, 0]
+    assert simulada.campos == ["a", "b", "c"]
+
+
+def test_lotacoes_em_ordem_decrescente_e_nao_informado_agrupado(simulada):
+    # "Não informado" e o registro sem lotação ficam juntos
+    assert simulada.lotacoes == ["Vara 2", "Vara 1", simulacao.SEM_LOTACAO]
+    assert list(simulada.impacto_lotacoes) == [3, 2, 2]
+    assert list(simulada.acumulado_lotacoes) == [0, 3, 5, 7]
+
+
+@pytest.mark.parametrize("meta", [70, 60, 50, 40, 30, 20, 10, 0])
+def test_minimo_para_meta(simulada, meta):
+    minimo = simulada.minimo_para_meta(meta)
+    registros = simulada.necessarios(meta)
+    assert minimo["registros"] == registros
+    assert minimo["edicoes"] == simulada.edicoes(registros)
+    assert simulada.percentual(registros) <= meta
+
+    # O prefixo indicado basta e o anterior não
+    campos = minimo["campos"]
+    assert validados_por_campos(simulada.campos[:campos]) >= registros
+    if campos > 0:
+        assert validados_por_campos(simulada.campos[:campos - 1]) < registros
+    lotacoes = minimo["lotacoes"]
+    assert simulada.acumulado_lotacoes[lotacoes] >= registros
+    if lotacoes > 0:
+        assert simulada.acumulado_lotacoes[lotacoes - 1] < registros
+
+
+def test_meta_ja_atingida(simulada):
+    assert simulada.minimo_para_meta(100) == {"registros": 0, "edicoes": 0, "campos": 0, "lotacoes": 0}
+
+
+def test_elegiveis_restringem_a_populacao():
+    elegiveis = np.array([True] * 5 + [False] * 5)
+    analise = ResultadoInconsistencias.de_mascara(CAMPOS, MASCARA)
+    simulada = simulacao.preparar(analise, LOTACAO, LOTACOES, elegiveis)
+    assert (simulada.total, simulada.inconsistentes) == (5, 5)
+    assert simulada.lotacoes == ["Vara 2", "Vara 1"]
+    assert simulada.minimo_para_meta(0)["lotacoes"] == 2
+
+
+def test_tabelas(simulada):
+    campos = simulada.tabela_campos()
+    assert list(campos["campo"]) == simulada.campos
+    assert list(campos["validados_acumulado"]) == [3, 4, 5, 7]
+    assert campos["percentual_apos"].iloc[-1] == 0
+    lotacoes = simulada.tabela_lotacoes()
+    assert list(lotacoes["lotacao"]) == simulada.lotacoes
+    assert list(lotacoes["percentual_apos"]) == pytest.approx([40, 20, 0])
@@ -0,0 +1,180 @@
+import threading
+
+import pytest
+
+from cnj_indicadores import instrumentacao, tarefas
+from cnj_indicadores.tarefas import ExecutorTarefas, informar
+
+ESPERA = 5
+
+
+@pytest.fixture
+def executor():
+    executor = ExecutorTarefas(trabalhadores=2)
+    yield executor
+    if executor._executor is not None:
+        executor._executor.shutdown(wait=True, cancel_futures=True)
+
+
+def aguardando(liberar, iniciou=None):
+    """Função de tarefa que informa o andamento até ``liberar`` ser sinalizado."""
+    def funcao():
+        if iniciou is not None:
+            iniciou.set()
+        while not liberar.wait(0.01):
+            informar(0.5, "aguardando")
+        informar(1.0)
+        return "pronto"
+    return funcao
+
+
+def test_conclui_com_resultado_e_progresso(executor):
+    def somar(a, b, fator=1):
+        informar(0.5, "metade", parcial={"a": a})
+        return (a + b) * fator
+
+    tarefa = executor.submeter("soma", somar, 2, 3, fator=10)
+    assert tarefa.aguardar(ESPERA)
+    assert tarefa.estado == tarefas.CONCLUIDA
+    assert tarefa.resultado == 50
+    assert tarefa.progresso == 1.0
+    assert tarefa.mensagem == "metade"
+    assert tarefa.parcial == {"a": 2}
+    assert tarefa.duracao > 0
+
+
+def test_erro_fica_registrado(executor):
+    def falhar():
+        raise ValueError("planilha inválida")
+
+    tarefa = executor.submeter("falha", falhar)
+    assert tarefa.aguardar(ESPERA)
+    assert tarefa.estado == tarefas.ERRO
+    assert tarefa.erro == "ValueError: planilha inválida"
+
+
+def test_informar_fora_de_tarefa_nao_faz_nada():
+    informar(0.5, "sem tarefa")
+
+
+def test_mesma_chave_executa_uma_vez(executor):
+    liberar = threading.Event()
+    chamadas = []
+
+    def calcular():
+        chamadas.append(1)
+        liberar.wait(ESPERA)
+        return len(chamadas)
+
+    primeira = executor.submeter("cálculo", calcular, chave="tj", interessado="s1")
+    segunda = executor.submeter("cálculo", calcular, chave="tj", interessado="s2")
+    outra = executor.submeter("cálculo", calcular, chave="tre", interessado="s1")
+    assert segunda is primeira
+    assert outra is not primeira
+    assert primeira.interessados == {"s1", "s2"}
+
+    liberar.set()
+    assert primeira.aguardar(ESPERA) and outra.aguardar(ESPERA)
+    assert len(chamadas) == 2
+    # Concluída com sucesso continua sendo reaproveitada
+    assert executor.submeter("cálculo", calcular, chave="tj", interessado="s3") is primeira
+    assert primeira.interessados == {"s1", "s2", "s3"}
+
+
+def test_sem_chave_nao_reaproveita(executor):
+    primeira = executor.submeter("a", lambda: 1)
+    segunda = executor.submeter("a", lambda: 1)
+    assert primeira is not segunda
+
+
+def test_cancelamento_interrompe_no_proximo_informar(executor):
+    liberar, iniciou = threading.Event(), threading.Event()
+    tarefa = executor.submeter("longa", aguardando(liberar, iniciou))
+    assert iniciou.wait(ESPERA)
+    tarefa.cancelar()
+    assert tarefa.aguardar(ESPERA)
+    assert tarefa.estado == tarefas.CANCELADA
+    assert tarefa.resultado is None
+
+
+def test_cancelada_antes_de_comecar_nao_executa():
+    executor = ExecutorTarefas(trabalhadores=1)
+    liberar, iniciou = threading.Event(), threading.Event()
+    chamadas = []
+    ocupando = executor.submeter("ocupa", aguardando(liberar, iniciou))
+    assert iniciou.wait(ESPERA)
+    na_fila = executor.submeter("na fila", lambda: chamadas.append(1))
+    assert na_fila.estado == tarefas.NA_FILA
+
+    na_fila.cancelar()
+    liberar.set()
+    assert ocupando.aguardar(ESPERA) and na_fila.aguardar(ESPERA)
+    assert na_fila.estado == tarefas.CANCELADA
+    assert chamadas == []
+    executor._executor.shutdown(wait=True)
+
+
+def test_liberar_cancela_so_sem_outros_interessados(executor):
+    liberar, iniciou = threading.Event(), threading.Event()
+    tarefa = executor.submeter("compartilhada", aguardando(liberar, iniciou), chave="tj", interessado="s1")
+    executor.submeter("compartilhada", aguardando(liberar), chave="tj", interessado="s2")
+    assert iniciou.wait(ESPERA)
+
+    assert executor.liberar(tarefa.identificador, "s1") is tarefa
+    assert not tarefa.cancelamento_pedido
+    assert tarefa.interessados == {"s2"}
+
+    executor.liberar(tarefa.identificador, "s2")
+    assert tarefa.cancelamento_pedido
+    assert tarefa.aguardar(ESPERA)
+    assert tarefa.estado == tarefas.CANCELADA
+
+
+def test_liberar_tarefa_desconhecida(executor):
+    assert executor.liberar(999, "s1") is None
+
+
+def test_nova_tarefa_depois_do_cancelamento(executor):
+    liberar, iniciou = threading.Event(), threading.Event()
+    cancelada = executor.submeter("cálculo", aguardando(liberar, iniciou), chave="tj", interessado="s1")
+    assert iniciou.wait(ESPERA)
+    executor.liberar(cancelada.identificador, "s1")
+
+    # Com o cancelamento pedido (mesmo antes de encerrar) a chave agenda uma tarefa nova
+    nova = executor.submeter("cálculo", aguardando(liberar), chave="tj", interessado="s2")
+    assert nova is not cancelada
+    assert nova.interessados == {"s2"}
+    liberar.set()
+    assert cancelada.aguardar(ESPERA) and nova.aguardar(ESPERA)
+    assert cancelada.estado == tarefas.CANCELADA
+    assert nova.estado == tarefas.CONCLUIDA
+    assert executor.submeter("cálculo", aguardando(liberar), chave="tj") is nova
+
+
+def test_listar_e_descartar_encerradas():
+    executor = ExecutorTarefas(trabalhadores=1, retencao=0)
+    primeira = executor.submeter("a", lambda: 1)
+    assert primeira.aguardar(ESPERA)
+    executor.submeter("b", lambda: 2).aguardar(ESPERA)
+    assert executor.listar() == []
+    assert executor.obter(primeira.identificador) is None
+    executor._executor.shutdown(wait=True)
+
+
+def test_estatisticas(executor):
+    executor.submeter("a", lambda: 1).aguardar(ESPERA)
+    estatisticas = executor.estatisticas()
+    assert estatisticas[tarefas.CONCLUIDA] == 1
+    assert set(estatisticas) == set(tarefas.ROTULOS)
+
+
+def test_instrumentacao_da_tarefa_nao_vaza_para_o_contexto(executor):
+    def medir():
+        with instrumentacao.etapa("detecção"):
+            instrumentacao.contar("planilhas")
+
+    tarefa = executor.submeter("medida", medir)
+    assert tarefa.aguardar(ESPERA)
+    assert [etapa[0] for etapa in tarefa.instrumentacao.etapas] == ["detecção"]
+    assert tarefa.instrumentacao.contadores["planilhas"] == 1
+    assert instrumentacao._execucao_atual.get() is None